@@ -1,14 +1,46 @@
 from flask import Flask
 from flask_cors import CORS
-from app.dify_client import DifyClient
-from app.storage import storage
+from app.dify_client import (DifyClient, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, DEFAULT_PYTHON_READ_TIMEOUT,
+                             DEFAULT_POOL_SIZE, DEFAULT_MAX_RETRIES, PROMPT_VERSION)
+from app.generation_cache import GenerationCache
+from app.storage import get_storage, create_storage, start_garbage_collector
+from app.search_index import SearchIndex
+from app.facet_index import FacetIndex
+from app.generation_jobs import GenerationJobQueue
 import json
 import os
 
-def create_app():
+def create_app(config=None):
+    """
+    创建Flask应用
+    
+    Args:
+        config: 额外的配置字典（可选），支持:
+            - STORAGE_BACKEND: 存储后端 json/sqlite（默认读取环境变量 STORAGE_BACKEND，否则为 json）
+            - STORAGE_DIR: 存储目录（默认读取环境变量 STORAGE_DIR，否则为 data）
+            - SQLITE_DB_PATH: SQLite数据库路径（默认 <STORAGE_DIR>/storage.db）
+            - STORAGE_WRITE_BEHIND: JSON存储延迟写入窗口秒数（默认读取环境变量 STORAGE_WRITE_BEHIND，否则为0即立即写入）
+            - STORAGE_TESTCASE_JOURNAL: JSON存储是否以追加日志方式保存测试用例修改（默认读取环境变量 STORAGE_TESTCASE_JOURNAL，否则关闭）
+            - STORAGE_FORMAT: JSON存储数据文件的落盘格式 json/compact/msgpack（默认读取环境变量 STORAGE_FORMAT，否则为 json）
+            - STORAGE_CACHE_MAX_MB: JSON存储内存缓存上限（MB，默认读取环境变量 STORAGE_CACHE_MAX_MB，否则为256，0为不限制）
+            - STORAGE_GC_ON_STARTUP: 启动后是否在后台清理一次孤立的测试用例和Python脚本（默认读取环境变量 STORAGE_GC_ON_STARTUP，否则关闭）
+            - STORAGE_GC_INTERVAL: 定时清理孤立数据的间隔秒数（默认读取环境变量 STORAGE_GC_INTERVAL，否则为0即不定时清理）
+            - GENERATION_WORKERS: 同时调用Dify生成测试用例的任务数（默认读取环境变量 GENERATION_WORKERS，否则为4）
+            - DIFY_CONNECT_TIMEOUT: 连接Dify的超时秒数（默认读取环境变量 DIFY_CONNECT_TIMEOUT，否则为10）
+            - DIFY_READ_TIMEOUT: 等待Dify响应数据的超时秒数（默认读取环境变量 DIFY_READ_TIMEOUT，否则为60）
+            - DIFY_PYTHON_READ_TIMEOUT: 生成Python脚本时等待响应数据的超时秒数（默认读取环境变量 DIFY_PYTHON_READ_TIMEOUT，否则为120）
+            - DIFY_POOL_SIZE: 与Dify保持的最大连接数（默认读取环境变量 DIFY_POOL_SIZE，否则为10与 GENERATION_WORKERS 中的较大值）
+            - DIFY_MAX_RETRIES: 连接失败或Dify返回 429/503 时的最大重试次数（默认读取环境变量 DIFY_MAX_RETRIES，否则为3）
+            - DIFY_PROMPT_VERSION: 提示词版本，修改Dify工作流的提示词后更换可使缓存的生成结果失效（默认读取环境变量 DIFY_PROMPT_VERSION）
+            - GENERATION_CACHE_SIZE: 最多缓存的生成结果数（默认读取环境变量 GENERATION_CACHE_SIZE，否则为1000，0为不缓存）
+            - GENERATION_CACHE_TTL: 生成结果缓存有效期秒数（默认读取环境变量 GENERATION_CACHE_TTL，否则为86400，0为不过期）
+    """
     app = Flask(__name__)
     CORS(app)
     
+    if config:
+        app.config.update(config)
+    
     # JSON 配置 - 中文不转义
     app.config['JSON_AS_ASCII'] = False
     app.config['JSONIFY_MIMETYPE'] = 'application/json; charset=utf-8'
@@ -17,7 +49,38 @@ def create_app():
     app.json.ensure_ascii = False
     
     # 持久化存储配置
-    app.config['STORAGE'] = storage
+    storage_backend = app.config.get('STORAGE_BACKEND') or os.getenv('STORAGE_BACKEND', 'json')
+    storage_dir = app.config.get('STORAGE_DIR') or os.getenv('STORAGE_DIR', 'data')
+    write_behind_delay = float(app.config.get('STORAGE_WRITE_BEHIND') or os.getenv('STORAGE_WRITE_BEHIND', 0))
+    testcase_journal = str(app.config.get('STORAGE_TESTCASE_JOURNAL') or os.getenv('STORAGE_TESTCASE_JOURNAL', '')).lower() in ('1', 'true', 'yes')
+    storage_format = app.config.get('STORAGE_FORMAT') or os.getenv('STORAGE_FORMAT', 'json')
+    cache_max_mb = app.config.get('STORAGE_CACHE_MAX_MB', os.getenv('STORAGE_CACHE_MAX_MB'))
+    cache_max_bytes = int(float(cache_max_mb) * 1024 * 1024) if cache_max_mb not in (None, '') else None
+    # 默认配置共用同一个存储实例；其他配置只创建（并迁移）配置的目录，不会触碰默认的 data 目录
+    if (storage_backend == 'json' and storage_dir == 'data' and not write_behind_delay
+            and not testcase_journal and storage_format == 'json' and cache_max_bytes is None):
+        app.config['STORAGE'] = get_storage()
+    else:
+        app.config['STORAGE'] = create_storage(
+            storage_backend,
+            storage_dir,
+            app.config.get('SQLITE_DB_PATH') or os.getenv('SQLITE_DB_PATH'),
+            write_behind_delay,
+            testcase_journal,
+            storage_format,
+            cache_max_bytes
+        )
+    app.logger.info(f"存储后端: {storage_backend} ({storage_dir})")
+    
+    # 接口搜索倒排索引（首次搜索时建立，之后按集合版本增量更新）
+    app.config['SEARCH_INDEX'] = SearchIndex(app.config['STORAGE'])
+    # 接口列表分面筛选索引（按集合预先计算的位图）
+    app.config['FACET_INDEX'] = FacetIndex(app.config['STORAGE'])
+    
+    # 孤立数据清理（启动时 / 定时），也可通过 POST /api/admin/gc 手动触发
+    gc_on_startup = str(app.config.get('STORAGE_GC_ON_STARTUP') or os.getenv('STORAGE_GC_ON_STARTUP', '')).lower() in ('1', 'true', 'yes')
+    gc_interval = float(app.config.get('STORAGE_GC_INTERVAL') or os.getenv('STORAGE_GC_INTERVAL', 0))
+    start_garbage_collector(app.config['STORAGE'], gc_interval, gc_on_startup)
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB 最大文件大小
     
     # Dify配置
@@ -26,18 +89,36 @@ def create_app():
     dify_api_key_python = os.getenv('DIFY_API_KEY_PYTHON', '')
     dify_workflow_python_url = os.getenv('DIFY_WORKFLOW_PYTHON_URL', '')
     
+    generation_workers = int(app.config.get('GENERATION_WORKERS') or os.getenv('GENERATION_WORKERS', 4))
+    
+    # 生成结果缓存（接口定义或YAML没有变化时不重复调用Dify）
+    app.config['GENERATION_CACHE'] = GenerationCache(
+        max_entries=int(app.config.get('GENERATION_CACHE_SIZE', os.getenv('GENERATION_CACHE_SIZE', 1000))),
+        ttl_seconds=float(app.config.get('GENERATION_CACHE_TTL', os.getenv('GENERATION_CACHE_TTL', 86400)))
+    )
+    
     if dify_api_key_yaml and dify_workflow_yaml_url and dify_api_key_python and dify_workflow_python_url:
         app.config['DIFY_CLIENT'] = DifyClient(
             api_key_yaml=dify_api_key_yaml,
             workflow_yaml_url=dify_workflow_yaml_url,
             api_key_python=dify_api_key_python,
-            workflow_python_url=dify_workflow_python_url
+            workflow_python_url=dify_workflow_python_url,
+            connect_timeout=float(app.config.get('DIFY_CONNECT_TIMEOUT') or os.getenv('DIFY_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT)),
+            read_timeout=float(app.config.get('DIFY_READ_TIMEOUT') or os.getenv('DIFY_READ_TIMEOUT', DEFAULT_READ_TIMEOUT)),
+            python_read_timeout=float(app.config.get('DIFY_PYTHON_READ_TIMEOUT') or os.getenv('DIFY_PYTHON_READ_TIMEOUT', DEFAULT_PYTHON_READ_TIMEOUT)),
+            pool_size=int(app.config.get('DIFY_POOL_SIZE') or os.getenv('DIFY_POOL_SIZE', max(DEFAULT_POOL_SIZE, generation_workers))),
+            max_retries=int(app.config.get('DIFY_MAX_RETRIES', os.getenv('DIFY_MAX_RETRIES', DEFAULT_MAX_RETRIES))),
+            cache=app.config['GENERATION_CACHE'],
+            prompt_version=app.config.get('DIFY_PROMPT_VERSION') or os.getenv('DIFY_PROMPT_VERSION', PROMPT_VERSION)
         )
         app.logger.info("Dify客户端已初始化")
     else:
         app.config['DIFY_CLIENT'] = None
         app.logger.warning("Dify配置不完整，相关功能将不可用")
     
+    # 测试用例生成任务队列（线程数即对Dify的最大并发数）
+    app.config['GENERATION_JOBS'] = GenerationJobQueue(app.config['STORAGE'], generation_workers)
+    
     # 注册蓝图
     from app.routes import api_bp, web_bp
     app.register_blueprint(api_bp)
@@ -0,0 +1,176 @@
+"""
+存储序列化编解码
+JSON存储的分片、清单等数据文件统一通过这里编码/解码，支持三种落盘格式:
+    json     缩进2格的JSON（默认，便于人工查看）
+    compact  无缩进的紧凑JSON
+    msgpack  MessagePack二进制格式（需要安装 msgspec 或 msgpack）
+
+安装了 orjson 或 msgspec 时使用其JSON编解码，否则回退到标准库 json
+（注意 orjson 会把超过64位的整数解码为浮点数，这类数值在接口文档中极少出现）；
+读取时根据文件内容自动识别格式，切换格式后旧文件仍可读取，下次保存时转换为新格式
+"""
+import json
+from typing import Any, Optional
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# 支持的落盘格式
+FORMATS = ("json", "compact", "msgpack")
+
+# JSON文本开头可能出现的空白字符（含UTF-8 BOM）
+_JSON_LEADING = frozenset(b" \t\r\n\xef\xbb\xbf")
+
+
+def json_backend() -> str:
+    """当前使用的JSON编解码实现：orjson / msgspec / json"""
+    if orjson is not None:
+        return "orjson"
+    if msgspec is not None:
+        return "msgspec"
+    return "json"
+
+
+def msgpack_backend() -> Optional[str]:
+    """当前可用的MessagePack实现：msgspec / msgpack，均未安装时返回None"""
+    if msgspec is not None:
+        return "msgspec"
+    if msgpack is not None:
+        return "msgpack"
+    return None
+
+
+def check_format(fmt: str):
+    """
+    检查落盘格式是否可用
+    
+    Raises:
+        ValueError: 格式不支持，或选择 msgpack 但未安装 msgspec/msgpack
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的存储格式: {fmt}")
+    if fmt == "msgpack" and msgpack_backend() is None:
+        raise ValueError("msgpack 存储格式需要安装 msgspec 或 msgpack")
+
+
+def dumps(data: Any, fmt: str = "json") -> bytes:
+    """
+    按指定格式编码数据
+    
+    Args:
+        data: 待编码的数据（JSON兼容类型）
+        fmt: 落盘格式（json / compact / msgpack）
+    
+    Returns:
+        编码后的字节串
+    """
+    if fmt == "msgpack":
+        try:
+            return _dumps_msgpack(data)
+        except (TypeError, ValueError, OverflowError) as e:
+            # 超过64位的整数等无法用MessagePack表示，改存紧凑JSON，读取时自动识别
+            logger.warning(f"MessagePack编码失败，改用JSON格式: {e}")
+            return _dumps_json(data, indent=False)
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的存储格式: {fmt}")
+    return _dumps_json(data, indent=fmt == "json")
+
+
+def loads(content: bytes) -> Any:
+    """
+    解码数据，自动识别JSON与MessagePack
+    
+    Args:
+        content: 文件内容
+    
+    Returns:
+        解码后的数据
+    """
+    if detect_format(content) == "msgpack":
+        return _loads_msgpack(content)
+    return _loads_json(content)
+
+
+def detect_format(content: bytes) -> str:
+    """
+    根据内容识别格式：JSON数据文件以 { 或 [ 开头（允许前导空白），其余按MessagePack处理
+    
+    Returns:
+        "json"（含 compact）或 "msgpack"
+    """
+    for byte in content[:64]:
+        if byte in _JSON_LEADING:
+            continue
+        return "json" if byte in b"{[" else "msgpack"
+    return "json"
+
+
+def _dumps_json(data: Any, indent: bool) -> bytes:
+    """编码为JSON（UTF-8，不转义中文）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+        except TypeError:
+            # orjson 不支持超过64位的整数等，交给标准库处理
+            pass
+    elif msgspec is not None:
+        try:
+            content = msgspec.json.encode(data)
+            return msgspec.json.format(content, indent=2) if indent else content
+        except (TypeError, OverflowError, msgspec.EncodeError):
+            pass
+    if indent:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _loads_json(content: bytes) -> Any:
+    """解码JSON"""
+    if orjson is not None:
+        try:
+            return orjson.loads(content)
+        except ValueError:
+            # 超过64位的整数等由标准库重新解析，内容确实有误时标准库同样会抛出异常
+            pass
+    elif msgspec is not None:
+        try:
+            return msgspec.json.decode(content)
+        except msgspec.DecodeError:
+            pass
+    return json.loads(content.decode('utf-8-sig'))
+
+
+def _dumps_msgpack(data: Any) -> bytes:
+    """编码为MessagePack"""
+    if msgspec is not None:
+        try:
+            return msgspec.msgpack.encode(data)
+        except msgspec.EncodeError as e:
+            raise ValueError(str(e)) from e
+    if msgpack is not None:
+        return msgpack.packb(data, use_bin_type=True)
+    raise ValueError("未安装 msgspec 或 msgpack，无法使用 msgpack 格式")
+
+
+def _loads_msgpack(content: bytes) -> Any:
+    """解码MessagePack"""
+    if msgspec is not None:
+        return msgspec.msgpack.decode(content)
+    if msgpack is not None:
+        return msgpack.unpackb(content, raw=False, strict_map_key=False)
+    raise ValueError("未安装 msgspec 或 msgpack，无法读取 msgpack 格式的数据文件")
@@ -0,0 +1,178 @@
+"""
+集合概要信息
+集合列表等高频页面只需要概要信息（接口数、模块/标签、请求方法分布、废弃接口数、更新时间），
+由存储层在写入时维护：整体保存集合时重新计算，增删改单个接口时按差量更新，读取时无需遍历接口
+
+接口列表页批量展示的测试用例状态（是否有用例/Python脚本、用例数、更新时间）和新保存的测试用例记录也在这里统一生成
+"""
+import json
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from app.versioning import record_version
+
+
+def build_summary(collection_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    根据集合完整数据计算概要信息
+    
+    Args:
+        collection_data: 集合完整数据
+    
+    Returns:
+        概要信息字典
+    """
+    summary = {
+        "title": collection_data.get("title"),
+        "description": collection_data.get("description"),
+        "version": collection_data.get("version"),
+        "base_url": collection_data.get("base_url"),
+        "interface_count": 0,
+        "module_count": 0,
+        "tag_counts": {},
+        "method_counts": {},
+        "deprecated_count": 0,
+        "_created_at": collection_data.get("_created_at"),
+        "_updated_at": collection_data.get("_updated_at"),
+        "_version": record_version(collection_data)
+    }
+    for interface in collection_data.get("interfaces", []):
+        apply_interface(summary, interface, 1)
+    return summary
+
+
+def apply_interface(summary: Dict[str, Any], interface: Dict[str, Any], sign: int):
+    """
+    将单个接口的增加（sign=1）或移除（sign=-1）计入概要信息（原地修改）
+    
+    Args:
+        summary: 概要信息字典
+        interface: 接口数据
+        sign: 1 表示增加，-1 表示移除
+    """
+    summary["interface_count"] += sign
+    
+    # 模块数 = 至少被一个接口使用的标签数
+    tag_counts = summary["tag_counts"]
+    for tag in set(interface.get("tags") or []):
+        _add_count(tag_counts, tag, sign)
+    summary["module_count"] = len(tag_counts)
+    
+    method = (interface.get("method") or "").upper()
+    if method:
+        _add_count(summary["method_counts"], method, sign)
+    
+    if interface.get("deprecated"):
+        summary["deprecated_count"] += sign
+
+
+def update_summary(summary: Optional[Dict[str, Any]], collection_data: Dict[str, Any],
+                   removed: Optional[Dict[str, Any]] = None, added: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    按接口差量生成新的概要信息，不修改传入的 summary
+    
+    Args:
+        summary: 原概要信息，为None或缺少统计字段（旧版清单）时根据 collection_data 重新计算
+        collection_data: 修改后的集合数据
+        removed: 被移除（或修改前）的接口
+        added: 新增（或修改后）的接口
+    
+    Returns:
+        新的概要信息
+    """
+    if not summary or "tag_counts" not in summary:
+        return build_summary(collection_data)
+    
+    summary = dict(summary, tag_counts=dict(summary["tag_counts"]), method_counts=dict(summary["method_counts"]))
+    if removed is not None:
+        apply_interface(summary, removed, -1)
+    if added is not None:
+        apply_interface(summary, added, 1)
+    summary["_updated_at"] = collection_data.get("_updated_at")
+    summary["_version"] = record_version(collection_data)
+    return summary
+
+
+def _add_count(counts: Dict[str, int], key: str, delta: int):
+    """计数加减，减到0时移除该键"""
+    value = counts.get(key, 0) + delta
+    if value > 0:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+
+def count_testcases(json_content: Optional[str]) -> int:
+    """
+    统计JSON格式测试用例内容中的用例数
+    
+    Args:
+        json_content: 测试用例JSON字符串（{"test_cases": [...]} 或用例数组）
+    
+    Returns:
+        用例数，内容为空或无法解析时返回0
+    """
+    if not json_content:
+        return 0
+    try:
+        content = json.loads(json_content)
+    except (TypeError, ValueError):
+        return 0
+    if isinstance(content, dict):
+        content = content.get("test_cases")
+    return len(content) if isinstance(content, list) else 0
+
+
+def new_testcase_record(collection_id: str, interface_id: str, yaml_content: Optional[str] = None,
+                        json_content: Optional[str] = None, workflow_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    生成新保存的测试用例记录（save_testcase / save_testcase_batch 共用）
+    
+    Returns:
+        测试用例记录
+    """
+    now = datetime.now().isoformat()
+    return {
+        "collection_id": collection_id,
+        "interface_id": interface_id,
+        "yaml_content": yaml_content or "",
+        "json_content": json_content or "",
+        "testcase_count": count_testcases(json_content),
+        "workflow_id": workflow_id,
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+def testcase_status(testcase: Optional[Dict[str, Any]], has_python_script: bool = False) -> Dict[str, Any]:
+    """
+    生成单个接口的测试用例状态
+    
+    Args:
+        testcase: 测试用例记录，不存在时为None
+        has_python_script: 是否存在Python脚本
+    
+    Returns:
+        状态字典（has_testcase、has_python_script、testcase_count、updated_at、python_generated_at）
+    """
+    if testcase is None:
+        return {
+            "has_testcase": False,
+            "has_python_script": False,
+            "testcase_count": 0,
+            "updated_at": None,
+            "python_generated_at": None
+        }
+    
+    # 保存时记录的用例数，旧记录没有该字段时从内容中统计
+    testcase_count = testcase.get("testcase_count")
+    if testcase_count is None:
+        testcase_count = count_testcases(testcase.get("json_content"))
+    
+    return {
+        "has_testcase": True,
+        "has_python_script": has_python_script,
+        "testcase_count": testcase_count,
+        "updated_at": testcase.get("updated_at"),
+        "python_generated_at": testcase.get("python_generated_at") if has_python_script else None
+    }
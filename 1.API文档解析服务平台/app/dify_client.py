@@ -8,16 +8,34 @@ import logging
 import re
 import tempfile
 import os
-from typing import Dict, Any, Optional
-from app.dify_parser import parse_dify_testcase_file
+from typing import Dict, Any, Iterator, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.dify_parser import parse_dify_testcase_file, IncrementalTestcaseParser
+from app.generation_cache import GenerationCache, canonicalize, canonicalize_yaml, make_cache_key
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CONNECT_TIMEOUT = 10  # 建立连接的超时（秒）
+DEFAULT_READ_TIMEOUT = 60  # 等待响应数据的超时（秒）
+DEFAULT_PYTHON_READ_TIMEOUT = 120  # 生成Python脚本等待响应数据的超时（秒）
+DEFAULT_POOL_SIZE = 10  # 连接池大小
+DEFAULT_MAX_RETRIES = 3  # 最大重试次数
+# 可以安全重试的状态码：限流（429）和服务暂不可用（503）表示服务端拒绝处理请求，重试不会重复调用大模型；
+# 502 可能在上游已开始处理后才返回，重新发送POST会重复计费，因此不重试
+RETRY_STATUS_CODES = (429, 503)
+# 提示词版本：修改生成测试用例或Python脚本的提示词后需要递增，使之前缓存的生成结果失效
+PROMPT_VERSION = "1"
+
 
 class DifyClient:
     """Dify API客户端"""
     
-    def __init__(self, api_key_yaml: str, workflow_yaml_url: str, api_key_python: str, workflow_python_url: str):
+    def __init__(self, api_key_yaml: str, workflow_yaml_url: str, api_key_python: str, workflow_python_url: str,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 python_read_timeout: float = DEFAULT_PYTHON_READ_TIMEOUT, pool_size: int = DEFAULT_POOL_SIZE,
+                 max_retries: int = DEFAULT_MAX_RETRIES, cache: Optional[GenerationCache] = None,
+                 prompt_version: str = PROMPT_VERSION):
         """
         初始化Dify客户端
         
@@ -26,6 +44,13 @@ class DifyClient:
             workflow_yaml_url: 生成YAML测试用例的工作流URL
             api_key_python: Python脚本生成工作流的API密钥
             workflow_python_url: 生成Python脚本的工作流URL
+            connect_timeout: 建立连接的超时（秒）
+            read_timeout: 等待响应数据的超时（秒），流式请求为两段数据之间的最长间隔
+            python_read_timeout: 生成Python脚本等待响应数据的超时（秒）
+            pool_size: 每个Dify主机保持的最大连接数，应不小于同时生成的任务数
+            max_retries: 连接失败或返回 429/503 时的最大重试次数（指数退避并加随机抖动）
+            cache: 生成结果缓存，为None时不缓存
+            prompt_version: 提示词版本，作为缓存键的一部分
         """
         self.api_key_yaml = api_key_yaml
         self.workflow_yaml_url = workflow_yaml_url
@@ -41,8 +66,80 @@ class DifyClient:
             "Authorization": f"Bearer {api_key_python}",
             "Content-Type": "application/json"
         }
+        
+        self.timeout = (connect_timeout, read_timeout)
+        self.python_timeout = (connect_timeout, python_read_timeout)
+        self.session = self._create_session(pool_size, max_retries)
+        self.cache = cache
+        self.prompt_version = prompt_version
+    
+    @staticmethod
+    def _create_session(pool_size: int, max_retries: int) -> requests.Session:
+        """
+        创建复用连接的会话：连接池大小为pool_size，失败时按指数退避重试
+        只重试请求尚未被服务端处理的情况（连接失败、429/503），读超时和502不重试，避免重复调用大模型
+        
+        Args:
+            pool_size: 连接池大小
+            max_retries: 最大重试次数
+        
+        Returns:
+            requests会话
+        """
+        retry_options = {
+            "total": max_retries,
+            "connect": max_retries,
+            "read": False,  # 读超时直接抛出，不重试
+            "status": max_retries,
+            "backoff_factor": 0.5,
+            "status_forcelist": RETRY_STATUS_CODES,
+            "allowed_methods": None,  # 上述情况下POST同样可以安全重试
+            "respect_retry_after_header": True,
+            "raise_on_status": False
+        }
+        try:
+            retry = Retry(backoff_jitter=0.5, **retry_options)
+        except TypeError:
+            # urllib3 2.0 之前不支持 backoff_jitter
+            retry = Retry(**retry_options)
+        
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
+    def close(self):
+        """关闭会话，释放连接池中的连接"""
+        self.session.close()
+    
+    def generate_json_testcases(self, interface_details: Dict[str, Any], user_id: str = "default",
+                                force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        生成JSON格式测试用例，接口定义没有变化时直接返回缓存的结果
+        
+        Args:
+            interface_details: 接口详情信息
+            user_id: 用户ID
+            force_refresh: 为True时忽略缓存，重新调用Dify（结果仍会写入缓存）
+        
+        Returns:
+            包含解析结果的响应字典
+            {
+                "success": True/False,
+                "json_content": "JSON内容",
+                "test_cases": "解析后的测试用例列表",
+                "cached": 是否为缓存的结果（仅成功时）,
+                "error": "错误信息"
+            }
+        """
+        return self._cached_call(
+            self._testcase_cache_key(interface_details),
+            force_refresh,
+            lambda: self._request_json_testcases(interface_details, user_id)
+        )
     
-    def generate_json_testcases(self, interface_details: Dict[str, Any], user_id: str = "default") -> Dict[str, Any]:
+    def _request_json_testcases(self, interface_details: Dict[str, Any], user_id: str = "default") -> Dict[str, Any]:
         """
         调用Dify工作流生成JSON格式测试用例
         
@@ -69,34 +166,18 @@ class DifyClient:
             logger.info(f"[Dify客户端] 集合ID: {collection_id}")
             logger.info(f"[Dify客户端] API端点: {self.workflow_yaml_url}")
             
-            # 准备接口信息作为query参数
-            interface_info = {
-                "interface_id": interface_id,
-                "collection_id": collection_id,
-                "interface": interface_details.get('interface', {}),
-                "collection_info": interface_details.get('collection_info', {})
-            }
-            
             # 准备请求数据 - 对话工作流格式
-            payload = {
-                "inputs": {
-                    "kid": interface_id,
-                    "jihe": collection_id
-                },
-                "query": f"请根据以下接口信息生成JSON格式的测试用例，要求返回标准的JSON数组格式，每个测试用例包含test_case_id、test_case_name、api_name、method、url、headers、request_data、expected_status_code、expected_response、test_type、priority、description、preconditions、postconditions、tags等字段。请确保返回的是纯JSON格式，不要包含任何markdown代码块标记:\n{json.dumps(interface_info, ensure_ascii=False, indent=2)}",
-                "response_mode": "blocking",
-                "user": user_id
-            }
+            payload = self._build_testcase_payload(interface_details, user_id, "blocking")
             
             logger.info(f"[Dify客户端] 请求payload: inputs.kid={interface_id}, inputs.jihe={collection_id}")
             
             # 发送请求
             logger.info(f"[Dify客户端] 发送POST请求到: {self.workflow_yaml_url}")
-            response = requests.post(
+            response = self.session.post(
                 self.workflow_yaml_url,
                 headers=self.headers_yaml,
                 json=payload,
-                timeout=60
+                timeout=self.timeout
             )
             
             logger.info(f"[Dify客户端] 响应状态码: {response.status_code}")
@@ -132,21 +213,7 @@ class DifyClient:
                     "error": f"未知的响应格式: {result}"
                 }
             
-            # 使用精准解析器解析JSON内容
-            parse_result = parse_dify_testcase_file(json_content)
-            
-            if parse_result["success"]:
-                clean_json_content = parse_result["json_content"]
-                test_cases = parse_result["test_cases"]
-                logger.info(f"精准解析器成功解析{len(test_cases)}个测试用例")
-            else:
-                # 如果精准解析失败，打印详细调试信息并使用备选方案
-                logger.warning(f"精准解析器解析失败，错误信息: {parse_result.get('error', '未知错误')}")
-                logger.warning(f"完整的Dify返回值: {result}")
-                logger.warning(f"提取的JSON内容: {json_content}")
-                logger.warning("使用备选方案进行解析")
-                clean_json_content = self._extract_json_content(json_content)
-                test_cases = self._parse_json_testcases(clean_json_content)
+            clean_json_content, test_cases = self._parse_testcase_content(json_content, result)
             
             return {
                 "success": True,
@@ -175,7 +242,302 @@ class DifyClient:
                 "error": f"生成失败: {str(e)}"
             }
     
-    def generate_python_script(self, yaml_content: str, user_id: str = "default") -> Dict[str, Any]:
+    def stream_json_testcases(self, interface_details: Dict[str, Any], user_id: str = "default",
+                              force_refresh: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        以流式模式调用Dify工作流生成JSON测试用例，边接收边解析
+        接口定义没有变化时直接推送缓存的测试用例，不调用Dify
+        
+        Args:
+            interface_details: 接口详情信息
+            user_id: 用户ID
+            force_refresh: 为True时忽略缓存，重新调用Dify（结果仍会写入缓存）
+        
+        Yields:
+            事件字典，event字段为事件类型：
+            {"event": "chunk", "text": "新收到的文本片段"}
+            {"event": "testcase", "index": 序号, "test_case": 已完整接收的测试用例}
+            {"event": "done", 其余字段与generate_json_testcases的成功结果相同}
+            {"event": "error", "error": "错误信息"}
+            done 和 error 只会出现一个，且总是最后一个事件
+        """
+        interface_id = interface_details.get('interface', {}).get('id', '')
+        collection_id = interface_details.get('collection_info', {}).get('id', '')
+        logger.info(f"[Dify客户端] 开始流式生成测试用例: 接口ID={interface_id}, 集合ID={collection_id}")
+        
+        cache_key = self._testcase_cache_key(interface_details)
+        cached = None if force_refresh else self._cache_get(cache_key)
+        if cached is not None:
+            for index, test_case in enumerate(cached.get("test_cases") or [], 1):
+                yield {"event": "testcase", "index": index, "test_case": test_case}
+            yield {"event": "done", **cached}
+            return
+        
+        payload = self._build_testcase_payload(interface_details, user_id, "streaming")
+        parser = IncrementalTestcaseParser()
+        answer_parts = []
+        outputs_text = None
+        workflow_id = None
+        streamed = []
+        
+        try:
+            with self.session.post(
+                self.workflow_yaml_url,
+                headers=self.headers_yaml,
+                json=payload,
+                timeout=self.timeout,
+                stream=True
+            ) as response:
+                logger.info(f"[Dify客户端] 流式响应状态码: {response.status_code}")
+                response.raise_for_status()
+                
+                for event in self._iter_sse_events(response):
+                    name = event.get("event")
+                    workflow_id = event.get("workflow_run_id") or workflow_id
+                    
+                    if name in ("message", "agent_message"):
+                        # 对话工作流：answer 为增量文本
+                        text = event.get("answer") or ""
+                    elif name == "text_chunk":
+                        # 工作流：data.text 为增量文本
+                        text = (event.get("data") or {}).get("text") or ""
+                    elif name == "workflow_finished":
+                        data = event.get("data") or {}
+                        if data.get("status") not in (None, "succeeded"):
+                            error_msg = data.get("error") or "工作流执行失败"
+                            logger.error(f"Dify工作流执行失败: {error_msg}")
+                            yield {"event": "error", "error": error_msg}
+                            return
+                        outputs_text = (data.get("outputs") or {}).get("text")
+                        continue
+                    elif name == "error":
+                        error_msg = event.get("message") or "工作流执行失败"
+                        logger.error(f"Dify流式响应返回错误: {error_msg}")
+                        yield {"event": "error", "error": error_msg}
+                        return
+                    else:
+                        continue
+                    
+                    if not text:
+                        continue
+                    answer_parts.append(text)
+                    yield {"event": "chunk", "text": text}
+                    for test_case in parser.feed(text):
+                        streamed.append(test_case)
+                        yield {"event": "testcase", "index": len(streamed), "test_case": test_case}
+            
+            json_content = "".join(answer_parts)
+            if not json_content and outputs_text:
+                # 工作流没有输出 text_chunk 时，只能在结束时一次性解析
+                json_content = outputs_text
+                for test_case in parser.feed(outputs_text):
+                    streamed.append(test_case)
+                    yield {"event": "testcase", "index": len(streamed), "test_case": test_case}
+            
+            if not json_content:
+                logger.error("Dify流式响应中没有生成内容")
+                yield {"event": "error", "error": "工作流没有返回内容"}
+                return
+            
+            clean_json_content, test_cases = self._parse_testcase_content(json_content)
+            if not test_cases and streamed:
+                # 完整内容无法解析（如纯数组格式）时，使用增量解析得到的测试用例
+                test_cases = streamed
+                clean_json_content = json.dumps({"test_cases": streamed}, ensure_ascii=False, indent=2)
+            logger.info(f"[Dify客户端] 流式生成完成: 增量解析{len(streamed)}个, 最终解析{len(test_cases)}个测试用例")
+            generated = {
+                "success": True,
+                "json_content": clean_json_content,
+                "test_cases": test_cases,
+                "original_content": json_content,
+                "workflow_id": workflow_id
+            }
+            self._cache_put(cache_key, generated)
+            yield {"event": "done", **generated, "cached": False}
+        
+        except requests.exceptions.Timeout:
+            logger.error("Dify API流式请求超时")
+            yield {"event": "error", "error": "请求超时，请稍后重试"}
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Dify API流式请求失败: {str(e)}")
+            yield {"event": "error", "error": f"请求失败: {str(e)}"}
+        except Exception as e:
+            logger.error(f"流式生成JSON测试用例失败: {str(e)}")
+            yield {"event": "error", "error": f"生成失败: {str(e)}"}
+    
+    def _build_testcase_payload(self, interface_details: Dict[str, Any], user_id: str, response_mode: str) -> Dict[str, Any]:
+        """
+        构造测试用例生成工作流的请求数据
+        
+        Args:
+            interface_details: 接口详情信息
+            user_id: 用户ID
+            response_mode: blocking 或 streaming
+        
+        Returns:
+            请求数据
+        """
+        interface_id = interface_details.get('interface', {}).get('id', '')
+        collection_id = interface_details.get('collection_info', {}).get('id', '')
+        
+        # 准备接口信息作为query参数
+        interface_info = {
+            "interface_id": interface_id,
+            "collection_id": collection_id,
+            "interface": interface_details.get('interface', {}),
+            "collection_info": interface_details.get('collection_info', {})
+        }
+        
+        return {
+            "inputs": {
+                "kid": interface_id,
+                "jihe": collection_id
+            },
+            "query": f"请根据以下接口信息生成JSON格式的测试用例，要求返回标准的JSON数组格式，每个测试用例包含test_case_id、test_case_name、api_name、method、url、headers、request_data、expected_status_code、expected_response、test_type、priority、description、preconditions、postconditions、tags等字段。请确保返回的是纯JSON格式，不要包含任何markdown代码块标记:\n{json.dumps(interface_info, ensure_ascii=False, indent=2)}",
+            "response_mode": response_mode,
+            "user": user_id
+        }
+    
+    def _parse_testcase_content(self, json_content: str, raw_result: Any = None) -> tuple:
+        """
+        解析工作流返回的测试用例文本，精准解析失败时使用备选方案
+        
+        Args:
+            json_content: 工作流输出的文本
+            raw_result: 完整的Dify返回值，仅用于调试日志
+        
+        Returns:
+            (标准化后的JSON内容, 测试用例列表)
+        """
+        # 使用精准解析器解析JSON内容
+        parse_result = parse_dify_testcase_file(json_content)
+        
+        if parse_result["success"]:
+            test_cases = parse_result["test_cases"]
+            logger.info(f"精准解析器成功解析{len(test_cases)}个测试用例")
+            return parse_result["json_content"], test_cases
+        
+        # 如果精准解析失败，打印详细调试信息并使用备选方案
+        logger.warning(f"精准解析器解析失败，错误信息: {parse_result.get('error', '未知错误')}")
+        if raw_result is not None:
+            logger.warning(f"完整的Dify返回值: {raw_result}")
+        logger.warning(f"提取的JSON内容: {json_content}")
+        logger.warning("使用备选方案进行解析")
+        clean_json_content = self._extract_json_content(json_content)
+        return clean_json_content, self._parse_json_testcases(clean_json_content)
+    
+    def _testcase_cache_key(self, interface_details: Dict[str, Any]) -> str:
+        """
+        计算测试用例生成结果的缓存键：接口定义和集合信息（不含ID和下划线开头的元数据）、工作流URL、提示词版本
+        重新导入的相同接口即使ID不同也能命中缓存
+        """
+        content = {
+            "interface": {key: value for key, value in (interface_details.get('interface') or {}).items() if key != 'id'},
+            "collection_info": {key: value for key, value in (interface_details.get('collection_info') or {}).items() if key != 'id'}
+        }
+        return make_cache_key("json_testcases", canonicalize(content), self.workflow_yaml_url, self.prompt_version)
+    
+    def _cache_get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的生成结果，命中时返回带 cached=True 的副本"""
+        if self.cache is None:
+            return None
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return None
+        logger.info(f"[Dify客户端] 命中生成结果缓存: {cache_key[:12]}")
+        return {**cached, "cached": True}
+    
+    def _cache_put(self, cache_key: str, result: Dict[str, Any]):
+        """缓存成功的生成结果"""
+        if self.cache is not None and result.get("success"):
+            self.cache.put(cache_key, {key: value for key, value in result.items() if key != "cached"})
+    
+    def _cached_call(self, cache_key: str, force_refresh: bool, generate) -> Dict[str, Any]:
+        """
+        先查缓存，未命中（或强制刷新）时调用generate生成并缓存成功的结果
+        
+        Args:
+            cache_key: 缓存键
+            force_refresh: 是否忽略缓存
+            generate: 无参数的生成函数
+        
+        Returns:
+            生成结果，成功时带有cached字段
+        """
+        if not force_refresh:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+        
+        result = generate()
+        self._cache_put(cache_key, result)
+        if result.get("success"):
+            result["cached"] = False
+        return result
+    
+    @staticmethod
+    def _iter_sse_events(response) -> Iterator[Dict[str, Any]]:
+        """
+        逐个读取SSE响应中的事件（data 行为JSON），忽略 ping 等无法解析的事件
+        
+        Args:
+            response: stream=True 的 requests 响应
+        
+        Yields:
+            事件数据字典
+        """
+        data_lines = []
+        for raw_line in response.iter_lines():
+            line = raw_line.decode('utf-8') if isinstance(raw_line, bytes) else raw_line
+            if line.startswith('data:'):
+                data_lines.append(line[5:].lstrip())
+                continue
+            if line or not data_lines:
+                # event: / id: / 注释行，或多余的空行
+                continue
+            data = "\n".join(data_lines)
+            data_lines = []
+            try:
+                event = json.loads(data)
+            except json.JSONDecodeError:
+                logger.debug(f"忽略无法解析的SSE事件: {data[:200]}")
+                continue
+            if isinstance(event, dict):
+                yield event
+        
+        if data_lines:
+            try:
+                event = json.loads("\n".join(data_lines))
+            except json.JSONDecodeError:
+                return
+            if isinstance(event, dict):
+                yield event
+    
+    def generate_python_script(self, yaml_content: str, user_id: str = "default", force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        生成Python测试脚本，YAML测试用例没有变化时直接返回缓存的结果
+        
+        Args:
+            yaml_content: YAML测试用例内容
+            user_id: 用户ID
+            force_refresh: 为True时忽略缓存，重新调用Dify（结果仍会写入缓存）
+        
+        Returns:
+            包含Python代码的响应字典
+            {
+                "success": True/False,
+                "python_code": "Python代码",
+                "cached": 是否为缓存的结果（仅成功时）,
+                "error": "错误信息"
+            }
+        """
+        return self._cached_call(
+            make_cache_key("python_script", canonicalize_yaml(yaml_content), self.workflow_python_url, self.prompt_version),
+            force_refresh,
+            lambda: self._request_python_script(yaml_content, user_id)
+        )
+    
+    def _request_python_script(self, yaml_content: str, user_id: str = "default") -> Dict[str, Any]:
         """
         调用Dify工作流生成Python测试脚本
         
@@ -204,11 +566,11 @@ class DifyClient:
             logger.info(f"API端点: {self.workflow_python_url}")
             
             # 发送请求
-            response = requests.post(
+            response = self.session.post(
                 self.workflow_python_url,
                 headers=self.headers_python,
                 json=payload,
-                timeout=60
+                timeout=self.timeout
             )
             
             response.raise_for_status()
@@ -274,7 +636,26 @@ class DifyClient:
                 "error": f"生成失败: {str(e)}"
             }
 
-    def generate_python_script_with_yaml(self, yaml_content: str, user_id: str = "default") -> Dict[str, Any]:
+    def generate_python_script_with_yaml(self, yaml_content: str, user_id: str = "default",
+                                         force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        生成Python测试脚本（使用YAML文件上传），YAML测试用例没有变化时直接返回缓存的结果
+        
+        Args:
+            yaml_content: YAML测试用例内容（metadata.generated_at 等易变字段不影响缓存）
+            user_id: 用户ID
+            force_refresh: 为True时忽略缓存，重新调用Dify（结果仍会写入缓存）
+        
+        Returns:
+            与generate_python_script相同
+        """
+        return self._cached_call(
+            make_cache_key("python_script_file", canonicalize_yaml(yaml_content), self.workflow_python_url, self.prompt_version),
+            force_refresh,
+            lambda: self._request_python_script_with_yaml(yaml_content, user_id)
+        )
+    
+    def _request_python_script_with_yaml(self, yaml_content: str, user_id: str = "default") -> Dict[str, Any]:
         """
         调用Dify工作流生成Python测试脚本（使用YAML文件上传）
         
@@ -319,12 +700,12 @@ class DifyClient:
                     logger.info(f"上传文件: {os.path.basename(temp_file_path)}")
                     
                     # 上传文件获取file_id
-                    upload_response = requests.post(
+                    upload_response = self.session.post(
                         upload_url,
                         headers={'Authorization': self.headers_python['Authorization']},
                         files=files,
                         data=data,
-                        timeout=60
+                        timeout=self.timeout
                     )
                     
                     logger.info(f"上传响应状态码: {upload_response.status_code}")
@@ -364,11 +745,11 @@ class DifyClient:
                     logger.info(f"chat-messages请求数据: {payload}")
                     
                     # 发送chat-messages请求
-                    response = requests.post(
+                    response = self.session.post(
                         self.workflow_python_url,
                         headers=self.headers_python,
                         json=payload,
-                        timeout=120
+                        timeout=self.python_timeout
                     )
                     
                     logger.info(f"chat-messages响应状态码: {response.status_code}")
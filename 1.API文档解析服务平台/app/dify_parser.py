@@ -191,30 +191,105 @@ def _validate_test_cases(test_cases: List[Dict]) -> List[Dict]:
             logger.warning(f"跳过非字典类型的测试用例: {type(test_case)}")
             continue
             
-        # 确保测试用例有基本字段
-        standardized_case = {
-            "test_case_id": test_case.get("test_case_id", f"TC{i+1:03d}"),
-            "test_case_name": test_case.get("test_case_name", f"测试用例{i+1}"),
-            "api_name": test_case.get("api_name", "未知接口"),
-            "method": test_case.get("method", "GET"),
-            "url": test_case.get("url", "/"),
-            "headers": test_case.get("headers", {}),
-            "request_data": test_case.get("request_data", {}),
-            "expected_status_code": test_case.get("expected_status_code", 200),
-            "expected_response": test_case.get("expected_response", {}),
-            "test_type": test_case.get("test_type", "positive"),
-            "priority": test_case.get("priority", "medium"),
-            "description": test_case.get("description", ""),
-            "preconditions": test_case.get("preconditions", ""),
-            "postconditions": test_case.get("postconditions", ""),
-            "tags": test_case.get("tags", [])
-        }
-        
-        validated_cases.append(standardized_case)
+        validated_cases.append(_standardize_test_case(test_case, i))
     
     return validated_cases
 
 
+def _standardize_test_case(test_case: Dict, i: int) -> Dict:
+    """补全单个测试用例的基本字段，i为测试用例在列表中的下标"""
+    
+    # 确保测试用例有基本字段
+    return {
+        "test_case_id": test_case.get("test_case_id", f"TC{i+1:03d}"),
+        "test_case_name": test_case.get("test_case_name", f"测试用例{i+1}"),
+        "api_name": test_case.get("api_name", "未知接口"),
+        "method": test_case.get("method", "GET"),
+        "url": test_case.get("url", "/"),
+        "headers": test_case.get("headers", {}),
+        "request_data": test_case.get("request_data", {}),
+        "expected_status_code": test_case.get("expected_status_code", 200),
+        "expected_response": test_case.get("expected_response", {}),
+        "test_type": test_case.get("test_type", "positive"),
+        "priority": test_case.get("priority", "medium"),
+        "description": test_case.get("description", ""),
+        "preconditions": test_case.get("preconditions", ""),
+        "postconditions": test_case.get("postconditions", ""),
+        "tags": test_case.get("tags", [])
+    }
+
+
+class IncrementalTestcaseParser:
+    """
+    增量测试用例解析器
+    流式接收Dify输出的文本，每当一个测试用例对象（顶层数组或顶层对象中数组的元素）完整闭合时立即解析返回，
+    支持 [...] 和 {"test_cases": [...]} 两种格式，JSON之外的说明文字、代码块标记会被忽略
+    """
+    
+    def __init__(self):
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._capture = None
+        self._capture_depth = 0
+        self._count = 0
+    
+    def feed(self, text: str) -> List[Dict]:
+        """
+        输入新收到的文本片段
+        
+        Args:
+            text: 文本片段
+        
+        Returns:
+            本次新完整接收的测试用例列表（已补全基本字段）
+        """
+        completed = []
+        for char in text:
+            if self._capture is not None:
+                self._capture.append(char)
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            
+            if char == '"':
+                # 容器之外的引号属于说明文字
+                self._in_string = bool(self._stack)
+            elif char in '{[':
+                if char == '{' and self._capture is None and self._stack in (['['], ['{', '[']):
+                    self._capture = [char]
+                    self._capture_depth = len(self._stack)
+                self._stack.append(char)
+            elif char in '}]' and self._stack:
+                self._stack.pop()
+                if self._capture is not None and len(self._stack) == self._capture_depth:
+                    test_case = self._finish_capture()
+                    if test_case is not None:
+                        completed.append(test_case)
+        return completed
+    
+    def _finish_capture(self) -> Optional[Dict]:
+        """解析当前捕获的对象，不是合法的JSON对象时返回None"""
+        content = ''.join(self._capture)
+        self._capture = None
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError:
+            logger.debug(f"增量解析跳过无效的JSON对象: {content[:200]}")
+            return None
+        if not isinstance(data, dict):
+            return None
+        test_case = _standardize_test_case(data, self._count)
+        self._count += 1
+        return test_case
+
+
 def save_testcases_to_file(test_cases: List[Dict], file_path: str) -> bool:
     """将测试用例保存到文件"""
     
@@ -0,0 +1,359 @@
+"""
+接口分面筛选索引
+按集合预先计算各筛选项的位图（Python 整数，第 i 位对应集合中的第 i 个接口）：
+请求方法、标签（模块）、是否废弃、是否有测试用例、是否有Python脚本；
+组合筛选通过位图的交集/并集完成，各筛选项的计数也只需位运算，不需要遍历接口
+
+本进程的写入通过存储的数据变更通知（add_listener）增量更新：接口增删改只更新该接口所在的位，
+测试用例变化只更新对应接口的 has_testcase / has_python_script 位；
+其他进程的写入在查询时发现：集合概要中的版本号或修改时间变化时重建接口相关的位图，
+测试用例变更标记（get_testcase_stamp）变化时重建测试用例相关的位图
+"""
+import threading
+from typing import Dict, Any, Optional, List, Iterable
+
+from app.storage_events import COLLECTION, INTERFACE, TESTCASE
+
+# 取值为 true/false 的筛选项（另有 method、tag 两个筛选项；同一筛选项的多个取值之间为 OR，不同筛选项之间为 AND）
+BOOLEAN_FACETS = ("deprecated", "has_testcase", "has_python_script")
+
+# 测试用例相关位图尚未计算（与任何测试用例变更标记都不相等）
+_UNKNOWN_STAMP = object()
+
+_TRUE_VALUES = ("true", "1", "yes")
+_FALSE_VALUES = ("false", "0", "no")
+
+
+def parse_boolean(value: str) -> Optional[str]:
+    """
+    将布尔筛选项的取值规范为 "true"/"false"
+    
+    Returns:
+        "true"、"false"，无法识别时返回None
+    """
+    value = value.strip().lower()
+    if value in _TRUE_VALUES:
+        return "true"
+    if value in _FALSE_VALUES:
+        return "false"
+    return None
+
+
+def _popcount(bitmap: int) -> int:
+    """位图中为1的位数"""
+    return bin(bitmap).count("1")
+
+
+def _positions(bitmap: int) -> List[int]:
+    """位图中为1的位的位置（从小到大）"""
+    return [position for position, bit in enumerate(bin(bitmap)[:1:-1]) if bit == "1"]
+
+
+def _remove_position(bitmap: int, position: int) -> int:
+    """移除位图中的一位，更高的位整体右移一位（对应接口删除后后续接口位置前移）"""
+    low_mask = (1 << position) - 1
+    return (bitmap & low_mask) | ((bitmap >> 1) & ~low_mask)
+
+
+class FacetIndex:
+    """接口分面筛选索引"""
+    
+    def __init__(self, storage):
+        """
+        初始化筛选索引（按集合在首次查询时建立），并注册存储的数据变更通知
+        
+        Args:
+            storage: 存储实例（JSONStorage / SQLiteStorage）
+        """
+        self.storage = storage
+        # _lock 只保护下面两个字典；读取存储、计算位图时只持有对应集合的锁，不同集合互不阻塞
+        self._lock = threading.Lock()
+        # 集合ID -> 索引条目
+        self._collections: Dict[str, Dict[str, Any]] = {}
+        # 集合ID -> 集合锁
+        self._collection_locks: Dict[str, threading.Lock] = {}
+        storage.add_listener(self._on_change)
+    
+    def query(self, collection_id: str, filters: Dict[str, Iterable[str]]) -> Optional[Dict[str, Any]]:
+        """
+        按筛选条件查询集合中的接口
+        
+        Args:
+            collection_id: 集合ID
+            filters: 筛选项 -> 取值列表（method 不区分大小写，布尔筛选项取值为 "true"/"false"）
+        
+        Returns:
+            {
+                "title", "base_url": 集合信息,
+                "interface_count": 集合接口总数,
+                "interfaces": 命中的接口概要（按集合中的顺序）,
+                "facets": 筛选项 -> {取值: 接口数}（计数时不应用该筛选项自身的条件）
+            }
+            集合不存在时返回None
+        """
+        with self._collection_lock(collection_id):
+            entry = self._get_entry(collection_id)
+            if entry is None:
+                return None
+            
+            bitmaps = entry["bitmaps"]
+            masks = {}
+            for facet, values in filters.items():
+                mask = 0
+                for value in values:
+                    mask |= bitmaps[facet].get(self._normalize(facet, value), 0)
+                masks[facet] = mask
+            
+            matched = entry["all"]
+            for mask in masks.values():
+                matched &= mask
+            
+            facets = {}
+            for facet, value_bitmaps in bitmaps.items():
+                others = entry["all"]
+                for other, mask in masks.items():
+                    if other != facet:
+                        others &= mask
+                facets[facet] = {value: _popcount(bitmap & others) for value, bitmap in value_bitmaps.items()}
+            
+            return {
+                "title": entry["title"],
+                "base_url": entry["base_url"],
+                "interface_count": len(entry["rows"]),
+                "interfaces": [entry["rows"][position] for position in _positions(matched)],
+                "facets": facets
+            }
+    
+    @staticmethod
+    def _normalize(facet: str, value: str) -> Optional[str]:
+        """规范筛选项的取值"""
+        if facet == "method":
+            return value.strip().upper()
+        if facet in BOOLEAN_FACETS:
+            return parse_boolean(value)
+        return value
+    
+    # ------------------------------------------------------------------
+    # 索引维护
+    # ------------------------------------------------------------------
+    
+    def _collection_lock(self, collection_id: str) -> threading.Lock:
+        """获取集合锁"""
+        with self._lock:
+            lock = self._collection_locks.get(collection_id)
+            if lock is None:
+                lock = self._collection_locks[collection_id] = threading.Lock()
+            return lock
+    
+    def _discard(self, collection_id: Optional[str] = None):
+        """丢弃集合（为None时为全部集合）的索引条目，下次查询时重建"""
+        with self._lock:
+            if collection_id is None:
+                self._collections.clear()
+            else:
+                self._collections.pop(collection_id, None)
+    
+    @staticmethod
+    def _stamp(summary: Dict[str, Any]) -> tuple:
+        """集合概要中决定接口相关位图的字段"""
+        return (summary.get("_version"), summary.get("_updated_at"), summary.get("interface_count"),
+                summary.get("title"), summary.get("base_url"))
+    
+    def _get_entry(self, collection_id: str) -> Optional[Dict[str, Any]]:
+        """获取集合的索引条目，其他进程修改了集合或测试用例时重建对应的位图（调用方需持有集合锁）"""
+        summary = self.storage.get_collection_summary(collection_id)
+        if summary is None:
+            self._discard(collection_id)
+            return None
+        
+        stamp = self._stamp(summary)
+        with self._lock:
+            entry = self._collections.get(collection_id)
+        if entry is None or entry["stamp"] != stamp:
+            entry = self._build_entry(collection_id, stamp)
+            with self._lock:
+                if entry is None:
+                    self._collections.pop(collection_id, None)
+                    return None
+                self._collections[collection_id] = entry
+        
+        testcase_stamp = self.storage.get_testcase_stamp(collection_id)
+        if entry["testcase_stamp"] != testcase_stamp:
+            self._build_testcase_bitmaps(collection_id, entry)
+            entry["testcase_stamp"] = testcase_stamp
+        return entry
+    
+    def _build_entry(self, collection_id: str, stamp: tuple) -> Optional[Dict[str, Any]]:
+        """根据集合数据计算接口相关的位图"""
+        collection = self.storage.get_collection(collection_id)
+        if collection is None:
+            return None
+        
+        entry = {
+            "stamp": stamp,
+            "testcase_stamp": _UNKNOWN_STAMP,
+            "title": collection.get("title"),
+            "base_url": collection.get("base_url"),
+            "rows": [],
+            # 接口ID -> 在 rows 和位图中的位置
+            "positions": {},
+            "all": 0,
+            "bitmaps": {"method": {}, "tag": {}, "deprecated": {"true": 0, "false": 0},
+                        "has_testcase": {"true": 0, "false": 0}, "has_python_script": {"true": 0, "false": 0}}
+        }
+        for interface in collection.get("interfaces", []):
+            self._append_interface(entry, interface)
+        return entry
+    
+    def _build_testcase_bitmaps(self, collection_id: str, entry: Dict[str, Any]):
+        """根据测试用例状态计算全部接口的 has_testcase / has_python_script 位图"""
+        self._update_testcase_bits(collection_id, entry, range(len(entry["rows"])))
+    
+    def _update_testcase_bits(self, collection_id: str, entry: Dict[str, Any], positions: Iterable[int]):
+        """按测试用例状态更新指定位置接口的 has_testcase / has_python_script 位"""
+        positions = list(positions)
+        statuses = self.storage.get_testcase_statuses(
+            collection_id, [entry["rows"][position]["interface_id"] for position in positions]
+        )
+        bitmaps = entry["bitmaps"]
+        for position in positions:
+            status = statuses.get(entry["rows"][position]["interface_id"]) or {}
+            for facet in ("has_testcase", "has_python_script"):
+                self._set_bit(bitmaps[facet], position, "true" if status.get(facet) else "false")
+    
+    @staticmethod
+    def _interface_row(interface: Dict[str, Any]) -> Dict[str, Any]:
+        """筛选结果中的接口概要"""
+        return {
+            "interface_id": interface.get("id"),
+            "method": interface.get("method"),
+            "path": interface.get("path"),
+            "summary": interface.get("summary"),
+            "description": interface.get("description"),
+            "tags": interface.get("tags"),
+            "deprecated": interface.get("deprecated", False)
+        }
+    
+    @staticmethod
+    def _interface_values(interface: Dict[str, Any]) -> Dict[str, Iterable[str]]:
+        """接口在 method / tag / deprecated 筛选项上的取值"""
+        method = (interface.get("method") or "").upper()
+        return {
+            "method": [method] if method else [],
+            "tag": set(interface.get("tags") or []),
+            "deprecated": ["true" if interface.get("deprecated") else "false"]
+        }
+    
+    @staticmethod
+    def _set_bit(value_bitmaps: Dict[str, int], position: int, value: str):
+        """将一个位置在布尔筛选项中设为指定取值"""
+        bit = 1 << position
+        for other in value_bitmaps:
+            value_bitmaps[other] &= ~bit
+        value_bitmaps[value] |= bit
+    
+    def _append_interface(self, entry: Dict[str, Any], interface: Dict[str, Any]) -> int:
+        """在索引条目末尾加入接口（测试用例相关的位为 false），返回其位置"""
+        position = len(entry["rows"])
+        bit = 1 << position
+        entry["rows"].append(self._interface_row(interface))
+        entry["positions"][str(interface.get("id"))] = position
+        entry["all"] |= bit
+        bitmaps = entry["bitmaps"]
+        for facet, values in self._interface_values(interface).items():
+            for value in values:
+                bitmaps[facet][value] = bitmaps[facet].get(value, 0) | bit
+        bitmaps["has_testcase"]["false"] |= bit
+        bitmaps["has_python_script"]["false"] |= bit
+        return position
+    
+    def _clear_interface(self, entry: Dict[str, Any], position: int):
+        """清除接口在 method / tag / deprecated 位图中的位，并去掉已没有接口的方法和标签"""
+        bit = 1 << position
+        for facet in ("method", "tag", "deprecated"):
+            value_bitmaps = entry["bitmaps"][facet]
+            for value in list(value_bitmaps):
+                value_bitmaps[value] &= ~bit
+                if not value_bitmaps[value] and facet not in BOOLEAN_FACETS:
+                    del value_bitmaps[value]
+    
+    def _remove_interface(self, entry: Dict[str, Any], position: int):
+        """从索引条目中移除接口，后续接口的位置前移"""
+        self._clear_interface(entry, position)
+        rows = entry["rows"]
+        entry["positions"].pop(str(rows[position]["interface_id"]), None)
+        del rows[position]
+        for moved in range(position, len(rows)):
+            entry["positions"][str(rows[moved]["interface_id"])] = moved
+        entry["all"] = (1 << len(rows)) - 1
+        for value_bitmaps in entry["bitmaps"].values():
+            for value in value_bitmaps:
+                value_bitmaps[value] = _remove_position(value_bitmaps[value], position)
+    
+    # ------------------------------------------------------------------
+    # 数据变更通知
+    # ------------------------------------------------------------------
+    
+    def _on_change(self, event: str, collection_id: Optional[str], interface_ids: Optional[List[str]]):
+        """存储写入后的回调：只更新受影响接口的位，无法增量更新时丢弃条目"""
+        if event == COLLECTION:
+            # 整个集合被替换或删除，下次查询时重建
+            self._discard(collection_id)
+            return
+        if collection_id is None:
+            # 全部测试用例被替换，下次查询时重新计算各集合的测试用例位图
+            with self._lock:
+                entries = list(self._collections.values())
+            for entry in entries:
+                entry["testcase_stamp"] = _UNKNOWN_STAMP
+            return
+        
+        with self._collection_lock(collection_id):
+            with self._lock:
+                entry = self._collections.get(collection_id)
+            if entry is None:
+                return
+            try:
+                if event == INTERFACE:
+                    self._apply_interface_changes(collection_id, entry, interface_ids)
+                elif event == TESTCASE:
+                    self._apply_testcase_changes(collection_id, entry, interface_ids)
+            except Exception:
+                self._discard(collection_id)
+                raise
+    
+    def _apply_interface_changes(self, collection_id: str, entry: Dict[str, Any], interface_ids: List[str]):
+        """按接口的当前数据更新、追加或移除其位"""
+        for interface_id in interface_ids:
+            interface = self.storage.get_interface(collection_id, interface_id)
+            position = entry["positions"].get(interface_id)
+            if interface is None:
+                if position is not None:
+                    self._remove_interface(entry, position)
+            elif position is None:
+                position = self._append_interface(entry, interface)
+                self._update_testcase_bits(collection_id, entry, [position])
+            else:
+                self._clear_interface(entry, position)
+                entry["rows"][position] = self._interface_row(interface)
+                bit = 1 << position
+                for facet, values in self._interface_values(interface).items():
+                    for value in values:
+                        entry["bitmaps"][facet][value] = entry["bitmaps"][facet].get(value, 0) | bit
+        
+        # 记录写入后的概要，之后查询时不再重建；接口数对不上说明期间还有其他写入，改为下次查询时重建
+        summary = self.storage.get_collection_summary(collection_id)
+        if summary is None or summary.get("interface_count") != len(entry["rows"]):
+            self._discard(collection_id)
+            return
+        entry["stamp"] = self._stamp(summary)
+    
+    def _apply_testcase_changes(self, collection_id: str, entry: Dict[str, Any], interface_ids: Optional[List[str]]):
+        """更新测试用例有变化的接口的 has_testcase / has_python_script 位"""
+        if interface_ids is None:
+            positions = range(len(entry["rows"]))
+        else:
+            positions = sorted({entry["positions"][interface_id] for interface_id in interface_ids
+                                if interface_id in entry["positions"]})
+        self._update_testcase_bits(collection_id, entry, positions)
+        entry["testcase_stamp"] = self.storage.get_testcase_stamp(collection_id)
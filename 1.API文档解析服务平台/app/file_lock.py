@@ -0,0 +1,179 @@
+"""
+跨进程文件锁
+为存储文件提供共享锁（读）和排他锁（读-改-写），多个 gunicorn worker 进程共享同一数据目录时
+保证并发写入不会互相覆盖
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any
+
+if os.name == 'nt':
+    import msvcrt
+    
+    def _lock_fd(fd: int, exclusive: bool):
+        # msvcrt 不支持共享锁，统一使用排他锁；LK_LOCK 只重试10次，这里自行循环等待
+        os.lseek(fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                time.sleep(0.05)
+    
+    def _unlock_fd(fd: int):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+    
+    def _lock_fd(fd: int, exclusive: bool):
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+    
+    def _unlock_fd(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class FileLock:
+    """
+    基于 "<path>.lock" 锁文件的跨进程读写锁
+    
+    同一进程内由线程读写锁协调：多个线程可以同时持有共享锁（共用同一个文件锁），排他锁与其他任何持有者互斥；
+    同一线程可以嵌套获取（例如在排他锁内再读取文件），但不支持由共享锁升级为排他锁——
+    升级需要先释放再重新获取，其间其他进程可能写入，调用方应直接获取排他锁并在锁内重新读取
+    """
+    
+    def __init__(self, path: str):
+        """
+        初始化文件锁
+        
+        Args:
+            path: 被保护的数据文件路径
+        """
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self._cond = threading.Condition(threading.Lock())
+        self._owner = threading.local()
+        self._readers = 0
+        self._writer = None
+        self._waiting_writers = 0
+        self._fd = None
+        
+        # 等待时间统计
+        self._stats_lock = threading.Lock()
+        self._acquire_count = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+    
+    @contextmanager
+    def acquire(self, exclusive: bool = True):
+        """
+        获取锁
+        
+        Args:
+            exclusive: True 为排他锁（读-改-写），False 为共享锁（只读）
+        
+        Raises:
+            RuntimeError: 当前线程持有共享锁时请求排他锁
+        """
+        depth = getattr(self._owner, "depth", 0)
+        if depth:
+            # 嵌套获取：排他锁内可以再获取任意锁，共享锁内只能再获取共享锁
+            if exclusive and not self._owner.exclusive:
+                raise RuntimeError(f"不支持由共享锁升级为排他锁: {self.path}")
+            self._owner.depth += 1
+            try:
+                yield
+            finally:
+                self._owner.depth -= 1
+            return
+        
+        start = time.monotonic()
+        if exclusive:
+            self._acquire_exclusive()
+        else:
+            self._acquire_shared()
+        self._owner.depth = 1
+        self._owner.exclusive = exclusive
+        self._record_wait(time.monotonic() - start)
+        
+        try:
+            yield
+        finally:
+            self._owner.depth = 0
+            self._release(exclusive)
+    
+    def _acquire_shared(self):
+        """获取共享锁：等待本进程的写入者完成，第一个读取者获取共享文件锁"""
+        with self._cond:
+            # 有写入者等待时新的读取者让行，避免写入者饿死
+            while self._writer is not None or self._waiting_writers:
+                self._cond.wait()
+            if self._readers == 0:
+                # 持有条件锁期间等待文件锁：此时本进程的其他线程无论读写都需要等待
+                self._open_and_lock(False)
+            self._readers += 1
+    
+    def _acquire_exclusive(self):
+        """获取排他锁：等待本进程的读取者和写入者全部释放后获取排他文件锁"""
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._open_and_lock(True)
+            except BaseException:
+                self._cond.notify_all()
+                raise
+            finally:
+                self._waiting_writers -= 1
+            self._writer = threading.get_ident()
+    
+    def _open_and_lock(self, exclusive: bool):
+        """打开锁文件并获取文件锁（调用方持有 self._cond）"""
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            _lock_fd(fd, exclusive)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+    
+    def _release(self, exclusive: bool):
+        """释放锁，最后一个持有者释放文件锁并唤醒等待的线程"""
+        with self._cond:
+            if exclusive:
+                self._writer = None
+            else:
+                self._readers -= 1
+                if self._readers:
+                    return
+            try:
+                _unlock_fd(self._fd)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+                self._cond.notify_all()
+    
+    def _record_wait(self, wait: float):
+        """记录一次获取锁的等待时间"""
+        with self._stats_lock:
+            self._acquire_count += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取锁等待时间统计
+        
+        Returns:
+            包含获取次数、总/平均/最大等待时间（毫秒）的字典
+        """
+        with self._stats_lock:
+            return {
+                "acquire_count": self._acquire_count,
+                "total_wait_ms": round(self._total_wait * 1000, 3),
+                "avg_wait_ms": round(self._total_wait * 1000 / self._acquire_count, 3) if self._acquire_count else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3)
+            }
@@ -0,0 +1,167 @@
+"""
+生成结果缓存
+接口定义（或YAML测试用例）没有变化时，重新生成会得到同样的结果却要再等一次完整的 Dify 调用、消耗大模型额度。
+缓存以内容哈希为键：接口定义/YAML 规范化后（忽略以下划线开头的元数据字段和生成时间等易变字段、字典按键排序）
+与工作流URL、提示词版本一起计算 SHA-256，只缓存成功的结果
+
+缓存保存在进程内存中，按最近使用顺序淘汰超出数量上限的条目，超过有效期的条目在读取时丢弃
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+import yaml
+
+# 计算缓存键时忽略的易变字段（每次生成都会变化，不影响生成结果）
+VOLATILE_KEYS = ("generated_at",)
+
+
+def canonicalize(value: Any) -> Any:
+    """
+    规范化用于计算缓存键的内容：去掉以下划线开头的元数据字段（_version、_updated_at 等）和易变字段
+    
+    Args:
+        value: 接口定义等可序列化为JSON的内容
+    
+    Returns:
+        规范化后的内容
+    """
+    if isinstance(value, dict):
+        return {
+            str(key): canonicalize(item) for key, item in value.items()
+            if not str(key).startswith('_') and key not in VOLATILE_KEYS
+        }
+    if isinstance(value, (list, tuple)):
+        return [canonicalize(item) for item in value]
+    return value
+
+
+def canonicalize_yaml(content: str) -> Any:
+    """
+    规范化YAML文本：能解析为字典或列表时按结构规范化（忽略格式差异和易变字段），否则按原文
+    
+    Args:
+        content: YAML文本
+    
+    Returns:
+        规范化后的内容
+    """
+    try:
+        data = yaml.safe_load(content)
+    except yaml.YAMLError:
+        return content
+    if isinstance(data, (dict, list)):
+        return canonicalize(data)
+    return content
+
+
+def make_cache_key(kind: str, content: Any, *parts: Any) -> str:
+    """
+    计算缓存键
+    
+    Args:
+        kind: 生成类型（不同类型的结果互不共用）
+        content: 已规范化的生成输入
+        parts: 其他影响生成结果的参数（工作流URL、提示词版本等）
+    
+    Returns:
+        SHA-256 十六进制摘要
+    """
+    payload = json.dumps([kind, content, parts], ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class GenerationCache:
+    """生成结果缓存（LRU + 有效期），线程安全"""
+    
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 86400):
+        """
+        初始化缓存
+        
+        Args:
+            max_entries: 最多缓存的结果数，为0时不缓存
+            ttl_seconds: 缓存有效期（秒），为0时不过期
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # 缓存键 -> (写入时间, 结果)，按最近使用顺序排列
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+    
+    @property
+    def enabled(self) -> bool:
+        """是否启用缓存"""
+        return self.max_entries > 0
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存
+        
+        Returns:
+            缓存的结果，不存在或已过期返回None
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds and time.time() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                self._expirations += 1
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+    
+    def put(self, key: str, value: Dict[str, Any]):
+        """写入缓存，超出数量上限时淘汰最久未使用的条目"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+    
+    def clear(self) -> int:
+        """
+        清空缓存
+        
+        Returns:
+            清除的条目数
+        """
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+        return count
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+        
+        Returns:
+            {"entries": 条目数, "max_entries": 数量上限, "ttl_seconds": 有效期, "hits": 命中次数, "misses": 未命中次数,
+             "hit_rate": 命中率, "evictions": 因数量上限淘汰的条目数, "expirations": 过期丢弃的条目数}
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0,
+                "evictions": self._evictions,
+                "expirations": self._expirations
+            }
@@ -0,0 +1,476 @@
+"""
+测试用例生成任务队列
+调用 Dify 生成测试用例需要数十秒，请求线程只负责提交任务并立即返回任务ID，
+生成在固定大小的线程池中执行（线程数即对 Dify 的最大并发数），完成后通过 storage.save_testcase 保存结果；
+客户端按任务ID查询状态和结果。同一接口已有排队或执行中的任务时直接返回该任务，不重复调用 Dify
+
+整个集合的批量生成同样在该线程池中执行：每个批量任务最多同时占用 max_concurrency 个线程，
+一个接口完成后再提交下一个接口，失败时按指数退避重试（由定时器重新提交，等待期间不占用线程）；生成结果每满 batch_size 个批量保存一次
+
+任务状态保存在进程内存中，已结束的任务保留最近 max_finished 个
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+STATUS_COMPLETED = "completed"
+
+
+class GenerationJobQueue:
+    """测试用例生成任务队列"""
+    
+    # 批量生成失败重试的初始等待秒数（之后每次翻倍）
+    RETRY_DELAY = 2.0
+    
+    def __init__(self, storage, max_workers: int = 4, max_finished: int = 1000):
+        """
+        初始化任务队列
+        
+        Args:
+            storage: 存储实例（JSONStorage / SQLiteStorage）
+            max_workers: 同时执行的生成任务数
+            max_finished: 保留的已结束任务数
+        """
+        self.storage = storage
+        self.max_workers = max_workers
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="generation")
+        self._lock = threading.Lock()
+        # 任务ID -> 任务
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        # 任务ID -> 任务结束事件
+        self._done: Dict[str, threading.Event] = {}
+        # (集合ID, 接口ID) -> 排队或执行中的任务ID
+        self._active: Dict[tuple, str] = {}
+        # 已结束的任务ID（按结束顺序）
+        self._finished = deque()
+        # 批量任务ID -> 批量任务
+        self._batches: Dict[str, Dict[str, Any]] = {}
+        # 集合ID -> 执行中的批量任务ID
+        self._active_batches: Dict[str, str] = {}
+        # 已结束的批量任务ID（按结束顺序）
+        self._finished_batches = deque()
+    
+    def submit(self, dify_client, collection_id: str, interface_id: str, interface_details: Dict[str, Any],
+               force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        提交生成任务
+        
+        Args:
+            dify_client: Dify客户端
+            collection_id: 集合ID
+            interface_id: 接口ID
+            interface_details: 传给 DifyClient.generate_json_testcases 的接口详情
+            force_refresh: 是否忽略缓存的生成结果
+        
+        Returns:
+            任务信息（该接口已有未结束的任务时返回该任务）
+        """
+        with self._lock:
+            job_id = self._active.get((collection_id, interface_id))
+            if job_id is not None:
+                return dict(self._jobs[job_id])
+            
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "collection_id": collection_id,
+                "interface_id": interface_id,
+                "status": STATUS_QUEUED,
+                "created_at": datetime.now().isoformat(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None
+            }
+            self._done[job_id] = threading.Event()
+            self._active[(collection_id, interface_id)] = job_id
+            job = dict(self._jobs[job_id])
+        
+        self._executor.submit(self._run, job_id, dify_client, interface_details, force_refresh)
+        logger.info(f"提交生成任务: {job_id} ({collection_id}/{interface_id})")
+        return job
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取任务信息
+        
+        Returns:
+            任务信息，任务不存在（或已被清理）返回None
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+    
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        等待任务结束
+        
+        Args:
+            job_id: 任务ID
+            timeout: 最长等待秒数，为None时一直等待
+        
+        Returns:
+            任务信息（超时返回时任务可能尚未结束），任务不存在返回None
+        """
+        with self._lock:
+            done = self._done.get(job_id)
+        if done is not None:
+            done.wait(timeout)
+        return self.get(job_id)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取队列统计信息
+        
+        Returns:
+            {"workers": 线程数, "queued": 排队任务数, "running": 执行中任务数, "finished": 保留的已结束任务数,
+             "batches": 执行中的批量任务数}
+        """
+        with self._lock:
+            statuses = [job["status"] for job in self._jobs.values()]
+            batches = len(self._active_batches)
+        return {
+            "workers": self.max_workers,
+            "queued": statuses.count(STATUS_QUEUED),
+            "running": statuses.count(STATUS_RUNNING),
+            "finished": len(self._finished),
+            "batches": batches
+        }
+    
+    def _run(self, job_id: str, dify_client, interface_details: Dict[str, Any], force_refresh: bool = False):
+        """在线程池中执行生成任务，任何异常都会把任务标记为失败，保证任务一定结束"""
+        try:
+            job = self._update(job_id, status=STATUS_RUNNING, started_at=datetime.now().isoformat())
+            collection_id, interface_id = job["collection_id"], job["interface_id"]
+        
+            try:
+                result = dify_client.generate_json_testcases(interface_details, force_refresh=force_refresh)
+            except Exception as e:
+                logger.error(f"生成任务执行失败: {job_id} ({collection_id}/{interface_id}): {e}")
+                result = {"success": False, "error": str(e)}
+            if not isinstance(result, dict):
+                result = {"success": False, "error": f"生成结果格式错误: {type(result).__name__}"}
+            
+            json_content = result.get("json_content")
+            if result.get("success") and not json_content:
+                result = {"success": False, "error": "生成结果为空"}
+            
+            if result.get("success"):
+                workflow_id = result.get("workflow_id")
+                try:
+                    saved = self.storage.save_testcase(collection_id, interface_id, json_content=json_content, workflow_id=workflow_id)
+                except Exception as e:
+                    logger.error(f"保存生成的测试用例失败: {collection_id}_{interface_id}: {e}")
+                    saved = False
+                if not saved:
+                    logger.warning(f"测试用例生成成功但保存失败: {collection_id}_{interface_id}")
+                self._finish(job_id, status=STATUS_SUCCEEDED, result={
+                    "json_content": json_content,
+                    "original_content": result.get("original_content", ""),
+                    "workflow_id": workflow_id,
+                    "saved": saved,
+                    "cached": bool(result.get("cached"))
+                })
+            else:
+                self._finish(job_id, status=STATUS_FAILED, error=result.get("error") or "生成失败")
+        except Exception as e:
+            logger.exception(f"生成任务异常结束: {job_id}")
+            self._finish(job_id, status=STATUS_FAILED, error=f"生成任务异常: {e}")
+    
+    def _update(self, job_id: str, **fields) -> Dict[str, Any]:
+        """更新任务字段，返回任务信息"""
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            return dict(job)
+    
+    def _finish(self, job_id: str, **fields):
+        """标记任务结束，并清理超出保留数量的旧任务（任务已结束时忽略）"""
+        with self._lock:
+            done = self._done.pop(job_id, None)
+            if done is None:
+                return
+            job = self._jobs[job_id]
+            job.update(fields, finished_at=datetime.now().isoformat())
+            self._active.pop((job["collection_id"], job["interface_id"]), None)
+            done.set()
+            
+            self._finished.append(job_id)
+            while len(self._finished) > self.max_finished:
+                self._jobs.pop(self._finished.popleft(), None)
+        logger.info(f"生成任务结束: {job_id} ({job['status']})")
+
+    # ------------------------------------------------------------------
+    # 批量生成
+    # ------------------------------------------------------------------
+    
+    def submit_batch(self, dify_client, collection_id: str, collection_info: Dict[str, Any], interfaces: List[Dict[str, Any]],
+                     max_concurrency: Optional[int] = None, retries: int = 2, skip_existing: bool = True,
+                     batch_size: int = 20, force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        提交整个集合的批量生成任务
+        
+        Args:
+            dify_client: Dify客户端
+            collection_id: 集合ID
+            collection_info: 传给 Dify 的集合信息（id、title、base_url、version）
+            interfaces: 需要生成的接口
+            max_concurrency: 最大并发数，不超过线程池大小，为None时使用线程池大小
+            retries: 每个接口失败后的重试次数
+            skip_existing: 是否跳过已有测试用例的接口
+            batch_size: 每批保存的测试用例数
+            force_refresh: 是否忽略缓存的生成结果
+        
+        Returns:
+            批量任务进度（该集合已有执行中的批量任务时返回该任务）
+        """
+        with self._lock:
+            batch_id = self._active_batches.get(collection_id)
+            if batch_id is not None:
+                return self._batch_progress(self._batches[batch_id])
+        
+        skipped = 0
+        if skip_existing:
+            statuses = self.storage.get_testcase_statuses(collection_id, [interface.get("id") for interface in interfaces])
+            pending = [interface for interface in interfaces if not statuses.get(interface.get("id"), {}).get("has_testcase")]
+            skipped = len(interfaces) - len(pending)
+        else:
+            pending = list(interfaces)
+        
+        with self._lock:
+            batch_id = self._active_batches.get(collection_id)
+            if batch_id is not None:
+                return self._batch_progress(self._batches[batch_id])
+            
+            batch_id = uuid.uuid4().hex
+            batch = {
+                "batch_id": batch_id,
+                "collection_id": collection_id,
+                "collection_info": collection_info,
+                "status": STATUS_RUNNING,
+                "total": len(interfaces),
+                "skipped": skipped,
+                "succeeded": 0,
+                "failed": 0,
+                "saved": 0,
+                "failures": [],
+                "max_concurrency": max(1, min(max_concurrency or self.max_workers, self.max_workers)),
+                "retries": retries,
+                "batch_size": batch_size,
+                "force_refresh": force_refresh,
+                "cached": 0,
+                "pending": deque(pending),
+                "running": 0,
+                "saving": 0,
+                "unsaved": [],
+                "created_at": datetime.now().isoformat(),
+                "started": time.time(),
+                "finished_at": None
+            }
+            self._batches[batch_id] = batch
+            self._active_batches[collection_id] = batch_id
+            
+            starting = []
+            while batch["pending"] and len(starting) < batch["max_concurrency"]:
+                starting.append(batch["pending"].popleft())
+            batch["running"] = len(starting)
+            if not starting:
+                self._finish_batch(batch)
+            progress = self._batch_progress(batch)
+        
+        for interface in starting:
+            if not self._submit_batch_item(batch, dify_client, interface):
+                self._complete_batch_item(batch, dify_client, interface.get("id"), {"success": False, "error": "生成线程池已关闭"})
+        logger.info(f"提交批量生成任务: {batch_id} ({collection_id}, 待生成 {len(pending)} 个, 跳过 {skipped} 个)")
+        return progress
+    
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取批量任务进度
+        
+        Returns:
+            批量任务进度，任务不存在（或已被清理）返回None
+        """
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            return self._batch_progress(batch) if batch is not None else None
+    
+    def _submit_batch_item(self, batch: Dict[str, Any], dify_client, interface: Dict[str, Any], attempt: int = 0) -> bool:
+        """
+        把批量任务中的单个接口提交到线程池
+        
+        Returns:
+            是否提交成功（线程池已关闭时返回False）
+        """
+        try:
+            self._executor.submit(self._run_batch_item, batch, dify_client, interface, attempt)
+            return True
+        except RuntimeError as e:
+            logger.error(f"提交批量生成失败: {batch['collection_id']}/{interface.get('id')}: {e}")
+            return False
+    
+    def _retry_batch_item(self, batch: Dict[str, Any], dify_client, interface: Dict[str, Any], attempt: int):
+        """退避等待结束后重新提交失败的接口（在定时器线程中执行）"""
+        if not self._submit_batch_item(batch, dify_client, interface, attempt):
+            self._complete_batch_item(batch, dify_client, interface.get("id"), {"success": False, "error": "生成线程池已关闭"})
+    
+    def _run_batch_item(self, batch: Dict[str, Any], dify_client, interface: Dict[str, Any], attempt: int = 0):
+        """
+        在线程池中生成批量任务中的单个接口（一次尝试）
+        失败且还可以重试时由定时器在退避时间后重新提交，等待期间不占用线程池；
+        否则记录结果并提交该批量任务的下一个接口
+        """
+        interface_id = interface.get("id")
+        result = {"success": False, "error": "生成失败"}
+        try:
+            interface_details = {"interface": interface, "collection_info": batch["collection_info"]}
+            try:
+                result = dify_client.generate_json_testcases(interface_details, force_refresh=batch["force_refresh"])
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            if not isinstance(result, dict):
+                result = {"success": False, "error": f"生成结果格式错误: {type(result).__name__}"}
+            elif result.get("success") and not result.get("json_content"):
+                result = {"success": False, "error": "生成结果为空"}
+        
+            if not result.get("success"):
+                logger.warning(f"批量生成失败: {batch['collection_id']}/{interface_id} (第 {attempt + 1} 次): {result.get('error')}")
+                if attempt < batch["retries"]:
+                    timer = threading.Timer(self.RETRY_DELAY * 2 ** attempt, self._retry_batch_item,
+                                            args=(batch, dify_client, interface, attempt + 1))
+                    timer.daemon = True
+                    timer.start()
+                    return
+        except Exception as e:
+            logger.exception(f"批量生成异常: {batch['collection_id']}/{interface_id}")
+            result = {"success": False, "error": str(e)}
+        
+        self._complete_batch_item(batch, dify_client, interface_id, result)
+    
+    def _complete_batch_item(self, batch: Dict[str, Any], dify_client, interface_id: str, result: Dict[str, Any]):
+        """记录单个接口的最终结果，提交下一个接口，攒满一批时保存；无论是否出错都会检查批量任务是否结束"""
+        to_save = []
+        try:
+            with self._lock:
+                batch["running"] -= 1
+                if result.get("success"):
+                    batch["succeeded"] += 1
+                    if result.get("cached"):
+                        batch["cached"] += 1
+                    batch["unsaved"].append({
+                        "interface_id": interface_id,
+                        "json_content": result.get("json_content"),
+                        "workflow_id": result.get("workflow_id")
+                    })
+                else:
+                    batch["failed"] += 1
+                    batch["failures"].append({"interface_id": interface_id, "error": result.get("error") or "生成失败"})
+                
+                next_interface = batch["pending"].popleft() if batch["pending"] else None
+                if next_interface is not None:
+                    batch["running"] += 1
+                # 攒满一批或全部接口已生成时保存
+                all_done = next_interface is None and batch["running"] == 0
+                if batch["unsaved"] and (len(batch["unsaved"]) >= batch["batch_size"] or all_done):
+                    to_save, batch["unsaved"] = batch["unsaved"], []
+                    batch["saving"] += 1
+            
+            if next_interface is not None and not self._submit_batch_item(batch, dify_client, next_interface):
+                self._abort_pending(batch, next_interface, "生成线程池已关闭")
+            if to_save:
+                self._save_batch(batch, to_save)
+        finally:
+            with self._lock:
+                if to_save:
+                    batch["saving"] -= 1
+                idle = not batch["pending"] and batch["running"] == 0 and batch["saving"] == 0
+                # 提交下一个接口失败等情况下剩下的未保存结果
+                leftover = batch["unsaved"] if idle else []
+                if leftover:
+                    batch["unsaved"] = []
+            if leftover:
+                self._save_batch(batch, leftover)
+            with self._lock:
+                if batch["status"] == STATUS_RUNNING and not batch["pending"] and batch["running"] == 0 and batch["saving"] == 0:
+                    self._finish_batch(batch)
+    
+    def _abort_pending(self, batch: Dict[str, Any], interface: Dict[str, Any], error: str):
+        """无法继续提交时，把当前接口和所有排队中的接口记为失败"""
+        with self._lock:
+            aborted = [interface] + list(batch["pending"])
+            batch["pending"].clear()
+            batch["running"] -= 1
+            batch["failed"] += len(aborted)
+            batch["failures"].extend({"interface_id": item.get("id"), "error": error} for item in aborted)
+    
+    def _save_batch(self, batch: Dict[str, Any], items: List[Dict[str, Any]]):
+        """批量保存生成的测试用例"""
+        try:
+            saved = self.storage.save_testcase_batch(batch["collection_id"], items)
+        except Exception as e:
+            logger.error(f"批量保存测试用例失败: {batch['collection_id']}: {e}")
+            saved = False
+        
+        with self._lock:
+            if saved:
+                batch["saved"] += len(items)
+            else:
+                logger.warning(f"{len(items)} 个测试用例生成成功但保存失败: {batch['collection_id']}")
+    
+    def _finish_batch(self, batch: Dict[str, Any]):
+        """标记批量任务结束，并清理超出保留数量的旧批量任务（调用方需持有 _lock）"""
+        batch["status"] = STATUS_COMPLETED
+        batch["finished_at"] = datetime.now().isoformat()
+        batch["elapsed"] = time.time() - batch["started"]
+        self._active_batches.pop(batch["collection_id"], None)
+        
+        self._finished_batches.append(batch["batch_id"])
+        while len(self._finished_batches) > self.max_finished:
+            self._batches.pop(self._finished_batches.popleft(), None)
+        logger.info(f"批量生成任务结束: {batch['batch_id']} (成功 {batch['succeeded']}, 失败 {batch['failed']}, 跳过 {batch['skipped']})")
+    
+    @staticmethod
+    def _batch_progress(batch: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        生成批量任务进度（调用方需持有 _lock）
+        
+        Returns:
+            批量任务ID、状态、各状态接口数、命中缓存数、已保存数、失败明细、耗时和预计剩余秒数
+        """
+        processed = batch["succeeded"] + batch["failed"]
+        remaining = len(batch["pending"]) + batch["running"]
+        elapsed = batch.get("elapsed", time.time() - batch["started"])
+        # 按目前的完成速度估算剩余时间
+        eta = round(remaining * elapsed / processed, 1) if processed and remaining else (0 if not remaining else None)
+        return {
+            "batch_id": batch["batch_id"],
+            "collection_id": batch["collection_id"],
+            "status": batch["status"],
+            "total": batch["total"],
+            "skipped": batch["skipped"],
+            "succeeded": batch["succeeded"],
+            "cached": batch["cached"],
+            "failed": batch["failed"],
+            "running": batch["running"],
+            "remaining": remaining,
+            "saved": batch["saved"],
+            "failures": list(batch["failures"]),
+            "max_concurrency": batch["max_concurrency"],
+            "created_at": batch["created_at"],
+            "finished_at": batch["finished_at"],
+            "elapsed_seconds": round(elapsed, 1),
+            "eta_seconds": eta
+        }
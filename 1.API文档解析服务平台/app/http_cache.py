@@ -0,0 +1,82 @@
+"""
+读接口的条件请求（ETag / Last-Modified）
+ETag 由存储中的版本号、修改时间等元数据计算，不依赖响应内容，因此可以在组装响应之前判断：
+请求的 If-None-Match 命中（或没有 If-None-Match 时 If-Modified-Since 不早于修改时间）直接返回 304；
+响应带 Cache-Control: no-cache，浏览器每次使用缓存前都会重新验证，不会读到过期数据
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from flask import request, current_app
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    根据元数据计算强 ETag
+    
+    Args:
+        parts: 决定响应内容的元数据（版本号、修改时间等，需可序列化为JSON）
+    
+    Returns:
+        ETag 值（不含引号）
+    """
+    content = json.dumps(parts, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()[:20]
+
+
+def to_http_datetime(value: Optional[str]) -> Optional[datetime]:
+    """
+    将存储中的修改时间（本地时间的 ISO 格式字符串）转换为 UTC 时间，精确到秒
+    
+    Returns:
+        UTC 时间，为空或格式错误时返回None
+    """
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return moment.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None):
+    """
+    判断请求中缓存的响应是否仍然有效（If-None-Match 优先于 If-Modified-Since）
+    
+    Args:
+        etag: 当前的 ETag
+        last_modified: 当前的修改时间，为None时不处理 If-Modified-Since
+    
+    Returns:
+        缓存有效时返回 304 响应，否则返回None
+    """
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    elif last_modified is not None and request.if_modified_since is not None:
+        since = request.if_modified_since
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        matched = last_modified <= since
+    else:
+        matched = False
+    
+    if not matched:
+        return None
+    return with_validators(current_app.response_class(status=304), etag, last_modified)
+
+
+def with_validators(response, etag: str, last_modified: Optional[datetime] = None):
+    """
+    为响应设置 ETag、Last-Modified 和 Cache-Control
+    
+    Returns:
+        传入的响应
+    """
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
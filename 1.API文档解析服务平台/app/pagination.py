@@ -0,0 +1,136 @@
+"""
+列表接口的游标分页和字段投影
+游标是 base64url 编码的 {"after": 上一页最后一条记录的ID, "pos": 该记录的排序位置}，客户端原样传回即可；
+下一页从该记录之后开始，翻页期间其他记录被增删时不会重复或遗漏后续记录，该记录本身被删除时按排序位置续接
+"""
+import base64
+import json
+from typing import Dict, Any, Optional, List, Iterable
+
+# 默认每页数量和最大每页数量
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def encode_cursor(after_id: str, position: int) -> str:
+    """
+    生成游标
+    
+    Args:
+        after_id: 当前页最后一条记录的ID
+        position: 该记录的排序位置
+    
+    Returns:
+        游标字符串
+    """
+    content = json.dumps({"after": after_id, "pos": position}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(content).decode('ascii').rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    解析游标
+    
+    Returns:
+        (记录ID, 排序位置)
+    
+    Raises:
+        ValueError: 游标格式错误
+    """
+    try:
+        content = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(content.decode('utf-8'))
+        after_id, position = str(data["after"]), int(data["pos"])
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise ValueError("cursor 参数无效")
+    return after_id, position
+
+
+def parse_page_args(args) -> Optional[tuple]:
+    """
+    解析请求中的分页参数（limit、cursor）
+    
+    Args:
+        args: 查询参数（request.args）
+    
+    Returns:
+        (每页数量, 游标位置 (记录ID, 排序位置) 或 None)；两个参数都没有传入时返回None，表示不分页
+    
+    Raises:
+        ValueError: 参数格式错误
+    """
+    limit = args.get('limit')
+    cursor = args.get('cursor')
+    if limit is None and not cursor:
+        return None
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_LIMIT
+    except ValueError:
+        raise ValueError("limit 必须是整数")
+    if limit < 1 or limit > MAX_LIMIT:
+        raise ValueError(f"limit 须在1-{MAX_LIMIT}之间")
+    return limit, decode_cursor(cursor) if cursor else None
+
+
+def paginate(rows: List[Dict[str, Any]], id_key: str, limit: int, after: Optional[tuple]) -> tuple:
+    """
+    对内存中已排好序的记录分页
+    
+    Args:
+        rows: 记录列表
+        id_key: 记录ID字段名
+        limit: 每页数量
+        after: 游标位置 (记录ID, 排序位置)，为None时从第一条开始
+    
+    Returns:
+        (当前页记录, 下一页游标，没有更多记录时为None)
+    """
+    start = 0
+    if after is not None:
+        after_id, position = after
+        if 0 <= position < len(rows) and str(rows[position].get(id_key)) == after_id:
+            start = position + 1
+        else:
+            for index, row in enumerate(rows):
+                if str(row.get(id_key)) == after_id:
+                    start = index + 1
+                    break
+            else:
+                # 游标所指的记录已被删除，其后的记录前移到了它的位置
+                start = max(0, min(position, len(rows)))
+    
+    page = rows[start:start + limit]
+    end = start + len(page)
+    next_cursor = encode_cursor(str(page[-1].get(id_key)), end - 1) if page and end < len(rows) else None
+    return page, next_cursor
+
+
+def parse_fields(value: Optional[str], allowed: Iterable[str], required: str) -> Optional[List[str]]:
+    """
+    解析字段投影参数（fields=a,b,c）
+    
+    Args:
+        value: fields 参数值，为空时返回None表示返回全部字段
+        allowed: 可选的字段
+        required: 始终返回的字段（记录ID）
+    
+    Returns:
+        需要返回的字段列表
+    
+    Raises:
+        ValueError: 包含不支持的字段
+    """
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"不支持的字段: {', '.join(unknown)}")
+    return [required] + [field for field in fields if field != required]
+
+
+def project(rows: List[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """按字段投影记录，fields 为None时原样返回"""
+    if fields is None:
+        return rows
+    return [{field: row.get(field) for field in fields} for row in rows]
@@ -1,8 +1,15 @@
-from flask import Blueprint, request, jsonify, current_app, render_template, send_file
+from flask import Blueprint, request, jsonify, current_app, render_template, send_file, stream_with_context
 from werkzeug.utils import secure_filename
 from app.parser import APIDocParser
 from app.dify_client import DifyClient
+from app.collection_summary import testcase_status
+from app.versioning import VersionConflict, record_version
+from app.facet_index import BOOLEAN_FACETS, parse_boolean
+from app.pagination import parse_page_args, paginate, parse_fields, project, encode_cursor
+from app.http_cache import make_etag, to_http_datetime, not_modified, with_validators
+from app.generation_jobs import STATUS_SUCCEEDED
 from datetime import datetime
+import json
 import uuid
 import traceback
 import io
@@ -11,6 +18,16 @@ import os
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 web_bp = Blueprint('web', __name__)
 
+# 列表接口 fields 参数可选的字段（集合ID、接口ID始终返回）
+COLLECTION_FIELDS = ('title', 'description', 'version', 'base_url', 'interface_count', 'module_count',
+                     'tags', 'method_counts', 'deprecated_count', 'updated_at')
+INTERFACE_FIELDS = ('method', 'path', 'summary', 'description', 'tags', 'deprecated')
+
+def refresh_requested() -> bool:
+    """请求是否要求忽略缓存的生成结果（查询参数 refresh=true）"""
+    return parse_boolean(request.args.get('refresh', '')) == 'true'
+
+
 @api_bp.route('/upload', methods=['POST'])
 def upload_document():
     """
@@ -86,38 +103,64 @@ def upload_document():
 @api_bp.route('/collections', methods=['GET'])
 def get_collections():
     """
-    获取所有文档集合列表
+    获取所有文档集合列表（按创建时间排序）
+    
+    查询参数（均可选）:
+        - limit: 每页数量，传入 limit 或 cursor 时分页返回
+        - cursor: 上一页响应中的 next_cursor
+        - fields: 需要返回的字段，多个以逗号分隔，collection_id 始终返回
     
     响应:
-        - 200: 成功返回集合列表
+        - 200: 成功返回集合列表；分页时 total 为集合总数，next_cursor 为下一页游标（没有更多时为 null）；
+               ETag 由各集合的版本号和修改时间计算
+        - 304: If-None-Match 与当前 ETag 一致
+        - 400: 参数错误
     """
     storage = current_app.config['STORAGE']
-    collections = storage.get_all_collections()
+    try:
+        page_args = parse_page_args(request.args)
+        fields = parse_fields(request.args.get('fields'), COLLECTION_FIELDS, 'collection_id')
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    # 列表只需要概要信息，无需加载每个集合的完整接口数据
+    summaries = storage.get_collection_summaries()
+    
+    # 删除集合不会产生更晚的修改时间，列表只使用 ETag，不设置 Last-Modified
+    etag = make_etag('collections', sorted(
+        (cid, summary.get('_version'), summary.get('_updated_at'), summary.get('_created_at'))
+        for cid, summary in summaries.items()
+    ))
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
     
     result = []
-    for cid, doc in collections.items():
-        # 计算模块数量（从接口的tags中提取唯一模块）
-        modules = set()
-        for interface in doc['interfaces']:
-            if interface.get('tags'):
-                for tag in interface['tags']:
-                    modules.add(tag)
-        
+    for cid, summary in sorted(summaries.items(), key=lambda item: (item[1].get('_created_at') or '', item[0])):
         result.append({
             'collection_id': cid,
-            'title': doc['title'],
-            'description': doc['description'],
-            'version': doc['version'],
-            'base_url': doc['base_url'],
-            'interface_count': len(doc['interfaces']),
-            'module_count': len(modules)
+            'title': summary['title'],
+            'description': summary['description'],
+            'version': summary['version'],
+            'base_url': summary['base_url'],
+            'interface_count': summary['interface_count'],
+            'module_count': summary['module_count'],
+            'tags': sorted(summary.get('tag_counts', {})),
+            'method_counts': summary.get('method_counts', {}),
+            'deprecated_count': summary.get('deprecated_count', 0),
+            'updated_at': summary.get('_updated_at') or summary.get('_created_at')
         })
     
-    return jsonify({
-        'success': True,
-        'collections': result,
-        'total': len(result)
-    }), 200
+    total = len(result)
+    response = {'success': True}
+    if page_args is not None:
+        result, response['next_cursor'] = paginate(result, 'collection_id', *page_args)
+    response['collections'] = project(result, fields)
+    response['total'] = total
+    return with_validators(jsonify(response), etag), 200
 
 @api_bp.route('/collection/<collection_id>', methods=['GET'])
 def get_collection(collection_id):
@@ -132,47 +175,181 @@ def get_collection(collection_id):
         - 404: 集合不存在
     """
     storage = current_app.config['STORAGE']
-    doc = storage.get_collection(collection_id)
+    summary = storage.get_collection_summary(collection_id)
     
-    if not doc:
+    if not summary:
         return jsonify({
             'success': False,
             'error': '集合不存在'
         }), 404
     
-    # 计算模块数量
-    modules = set()
-    for interface in doc['interfaces']:
-        if interface.get('tags'):
-            for tag in interface['tags']:
-                modules.add(tag)
-    
     return jsonify({
         'success': True,
         'collection': {
             'collection_id': collection_id,
-            'title': doc['title'],
-            'description': doc['description'],
-            'version': doc['version'],
-            'base_url': doc['base_url'],
-            'interface_count': len(doc['interfaces']),
-            'module_count': len(modules)
+            'title': summary['title'],
+            'description': summary['description'],
+            'version': summary['version'],
+            'base_url': summary['base_url'],
+            'interface_count': summary['interface_count'],
+            'module_count': summary['module_count'],
+            'tags': sorted(summary.get('tag_counts', {})),
+            'method_counts': summary.get('method_counts', {}),
+            'deprecated_count': summary.get('deprecated_count', 0),
+            'updated_at': summary.get('_updated_at') or summary.get('_created_at')
         }
     }), 200
 
+@api_bp.route('/collection/<collection_id>/raw-doc', methods=['GET'])
+def get_collection_raw_doc(collection_id):
+    """
+    获取集合导入时的原始文档（按需从冷数据中加载）
+    
+    参数:
+        - collection_id: 集合 ID
+        
+    响应:
+        - 200: 成功
+        - 404: 集合不存在或没有原始文档
+    """
+    storage = current_app.config['STORAGE']
+    raw_doc = storage.get_raw_doc(collection_id)
+    
+    if raw_doc is None:
+        return jsonify({
+            'success': False,
+            'error': '集合不存在或没有原始文档'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'collection_id': collection_id,
+        'raw_doc': raw_doc
+    }), 200
+
 @api_bp.route('/collection/<collection_id>/interfaces', methods=['GET'])
 def get_collection_interfaces(collection_id):
     """
-    获取指定集合的所有接口概要
+    获取指定集合的所有接口概要，支持按请求方法、标签、废弃状态、测试用例/Python脚本状态筛选，
+    以及游标分页和字段投影
     
     参数:
         - collection_id: 集合 ID
         
+    查询参数（均可选，同一参数的多个取值之间为“或”，不同参数之间为“且”）:
+        - method: 请求方法，多个以逗号分隔，如 GET,POST
+        - tag: 标签（模块），可重复传入
+        - deprecated / has_testcase / has_python_script: true 或 false
+        - facets: 为 true 时即使没有筛选条件也返回各筛选项的计数
+        - limit: 每页数量，传入 limit 或 cursor 时分页返回
+        - cursor: 上一页响应中的 next_cursor
+        - fields: 需要返回的字段，多个以逗号分隔，interface_id 始终返回
+    
     响应:
-        - 200: 成功
+        - 200: 成功；带筛选条件时 total 为命中数，interface_count 为集合接口总数，
+               facets 为各筛选项取值的接口数（计数时不应用该筛选项自身的条件）；
+               分页时 next_cursor 为下一页游标（没有更多时为 null）；
+               ETag 由集合的版本号和修改时间（有筛选条件时还包括测试用例的变更标记）计算
+        - 304: If-None-Match 与当前 ETag 一致，或 If-Modified-Since 不早于集合的修改时间
+        - 400: 筛选、分页或字段参数错误
         - 404: 集合不存在
     """
     storage = current_app.config['STORAGE']
+    
+    filters = {}
+    methods = [m for value in request.args.getlist('method') for m in value.split(',') if m.strip()]
+    if methods:
+        filters['method'] = methods
+    if request.args.getlist('tag'):
+        filters['tag'] = request.args.getlist('tag')
+    for facet in BOOLEAN_FACETS:
+        values = request.args.getlist(facet)
+        if not values:
+            continue
+        if any(parse_boolean(value) is None for value in values):
+            return jsonify({
+                'success': False,
+                'error': f'{facet} 只能为 true 或 false'
+            }), 400
+        filters[facet] = values
+    
+    try:
+        page_args = parse_page_args(request.args)
+        fields = parse_fields(request.args.get('fields'), INTERFACE_FIELDS, 'interface_id')
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    summary = storage.get_collection_summary(collection_id)
+    if not summary:
+        return jsonify({
+            'success': False,
+            'error': '集合不存在'
+        }), 404
+    
+    use_facets = bool(filters) or parse_boolean(request.args.get('facets', '')) == 'true'
+    stamp = (summary.get('_version'), summary.get('_updated_at'), summary.get('_created_at'))
+    if use_facets:
+        # 筛选结果还取决于测试用例状态，其变化不会更新集合的修改时间，只使用 ETag（由磁盘上的测试用例文件标识计算，
+        # 各进程一致）；测试用例有尚未落盘的延迟写入时不设置 ETag
+        testcase_stamp = storage.get_testcase_stamp(collection_id)
+        etag = make_etag('interfaces', collection_id, stamp, testcase_stamp) if testcase_stamp is not None else None
+        last_modified = None
+    else:
+        etag = make_etag('interfaces', collection_id, stamp)
+        last_modified = to_http_datetime(summary.get('_updated_at') or summary.get('_created_at'))
+    cached = not_modified(etag, last_modified) if etag is not None else None
+    if cached is not None:
+        return cached
+    
+    if use_facets:
+        # 通过预先计算的位图筛选，不遍历接口
+        result = current_app.config['FACET_INDEX'].query(collection_id, filters)
+        if result is None:
+            return jsonify({
+                'success': False,
+                'error': '集合不存在'
+            }), 404
+        
+        interfaces = result['interfaces']
+        response = {
+            'success': True,
+            'collection_id': collection_id,
+            'title': result['title'],
+            'base_url': result['base_url'],
+            'total': len(interfaces),
+            'interface_count': result['interface_count'],
+            'facets': result['facets']
+        }
+        if page_args is not None:
+            interfaces, response['next_cursor'] = paginate(interfaces, 'interface_id', *page_args)
+        response['interfaces'] = project(interfaces, fields)
+        if etag is None:
+            return jsonify(response), 200
+        return with_validators(jsonify(response), etag), 200
+    
+    if page_args is not None:
+        # 分页时只读取当前页的接口，集合信息取自概要
+        page = storage.get_interface_page(collection_id, *page_args)
+        if page is None:
+            return jsonify({
+                'success': False,
+                'error': '集合不存在'
+            }), 404
+        
+        next_page = page['next']
+        return with_validators(jsonify({
+            'success': True,
+            'collection_id': collection_id,
+            'title': summary['title'],
+            'base_url': summary['base_url'],
+            'interfaces': project([interface_row(interface) for interface in page['interfaces']], fields),
+            'total': summary['interface_count'],
+            'next_cursor': encode_cursor(*next_page) if next_page else None
+        }), etag, last_modified), 200
+    
     doc = storage.get_collection(collection_id)
     
     if not doc:
@@ -181,26 +358,63 @@ def get_collection_interfaces(collection_id):
             'error': '集合不存在'
         }), 404
     
-    interfaces = []
-    
-    for interface in doc['interfaces']:
-        interfaces.append({
-            'interface_id': interface['id'],
-            'method': interface['method'],
-            'path': interface['path'],
-            'summary': interface['summary'],
-            'description': interface['description'],
-            'tags': interface['tags'],
-            'deprecated': interface.get('deprecated', False)
-        })
+    interfaces = [interface_row(interface) for interface in doc['interfaces']]
     
-    return jsonify({
+    return with_validators(jsonify({
         'success': True,
         'collection_id': collection_id,
         'title': doc['title'],
         'base_url': doc['base_url'],
-        'interfaces': interfaces,
+        'interfaces': project(interfaces, fields),
         'total': len(interfaces)
+    }), etag, last_modified), 200
+
+def interface_row(interface):
+    """接口列表中返回的接口概要"""
+    return {
+        'interface_id': interface['id'],
+        'method': interface['method'],
+        'path': interface['path'],
+        'summary': interface['summary'],
+        'description': interface['description'],
+        'tags': interface['tags'],
+        'deprecated': interface.get('deprecated', False)
+    }
+
+@api_bp.route('/collection/<collection_id>/testcases', methods=['GET'])
+def get_collection_testcases(collection_id):
+    """
+    获取指定集合下已生成的测试用例概要（覆盖率视图，不返回用例内容）
+    
+    参数:
+        - collection_id: 集合 ID
+    
+    响应:
+        - 200: 成功
+        - 404: 集合不存在
+    """
+    storage = current_app.config['STORAGE']
+    summary = storage.get_collection_summary(collection_id)
+    
+    if not summary:
+        return jsonify({
+            'success': False,
+            'error': '集合不存在'
+        }), 404
+    
+    testcases = []
+    for testcase in storage.iter_testcases(collection_id):
+        has_python_script = 'python_code' in testcase or bool(testcase.get('python_script_path'))
+        testcases.append(dict(testcase_status(testcase, has_python_script), interface_id=testcase.get('interface_id')))
+    
+    interface_count = summary.get('interface_count', 0)
+    return jsonify({
+        'success': True,
+        'collection_id': collection_id,
+        'testcases': testcases,
+        'total': len(testcases),
+        'interface_count': interface_count,
+        'coverage': min(round(len(testcases) / interface_count, 4), 1.0) if interface_count else 0.0
     }), 200
 
 @api_bp.route('/interface/<collection_id>/<interface_id>', methods=['GET'])
@@ -213,19 +427,21 @@ def get_interface(collection_id, interface_id):
         - interface_id: 接口 ID
         
     响应:
-        - 200: 成功
+        - 200: 成功，ETag 由接口部分（接口版本号）和集合部分（集合的版本号、修改时间）组成，更新时可作为 If-Match 传回，
+               只比较接口部分；Last-Modified 为集合的修改时间
+        - 304: If-None-Match 与当前 ETag 一致，或 If-Modified-Since 不早于集合的修改时间
         - 404: 集合或接口不存在
     """
     storage = current_app.config['STORAGE']
-    doc = storage.get_collection(collection_id)
+    summary = storage.get_collection_summary(collection_id)
     
-    if not doc:
+    if not summary:
         return jsonify({
             'success': False,
             'error': '集合不存在'
         }), 404
     
-    interface = next((i for i in doc['interfaces'] if i['id'] == interface_id), None)
+    interface = storage.get_interface(collection_id, interface_id)
     
     if not interface:
         return jsonify({
@@ -233,15 +449,23 @@ def get_interface(collection_id, interface_id):
             'error': '接口不存在'
         }), 404
     
-    return jsonify({
+    # 响应中还包含集合信息，集合改名、重新上传或接口删除后重建时 ETag 都会变化
+    etag = interface_etag(collection_id, interface_id, interface, summary)
+    last_modified = to_http_datetime(summary.get('_updated_at') or summary.get('_created_at'))
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
+    
+    response = jsonify({
         'success': True,
         'interface': interface,
         'collection_info': {
             'id': collection_id,
-            'title': doc['title'],
-            'version': doc['version']
+            'title': summary['title'],
+            'version': summary['version']
         }
-    }), 200
+    })
+    return with_validators(response, etag, last_modified), 200
 
 @api_bp.route('/interface/<collection_id>/<interface_id>', methods=['PUT'])
 def update_interface(collection_id, interface_id):
@@ -252,32 +476,47 @@ def update_interface(collection_id, interface_id):
         - collection_id: 集合 ID
         - interface_id: 接口 ID
         
+    请求头:
+        - If-Match: 可选，读取接口时得到的 ETag 或接口版本号（_version），接口已被他人修改时拒绝更新；
+                    只比较 ETag 的接口部分，同一集合中其他接口的修改不会导致412
+        
     请求体:
         - interface: 更新后的接口信息
         
     响应:
-        - 200: 更新成功
+        - 200: 更新成功，ETag 响应头与读取更新后的接口时相同
         - 404: 集合或接口不存在
         - 400: 请求参数错误
+        - 412: If-Match 与接口当前版本不一致
     """
     try:
         storage = current_app.config['STORAGE']
-        doc = storage.get_collection(collection_id)
         
-        if not doc:
+        if not storage.collection_exists(collection_id):
             return jsonify({
                 'success': False,
                 'error': '集合不存在'
             }), 404
         
-        interface_index = next((i for i, iface in enumerate(doc['interfaces']) if iface['id'] == interface_id), None)
-        
-        if interface_index is None:
+        current_interface = storage.get_interface(collection_id, interface_id)
+        if current_interface is None:
             return jsonify({
                 'success': False,
                 'error': '接口不存在'
             }), 404
         
+        # If-Match: * 只要求接口存在；既不包含当前接口部分的 ETag 也不包含当前版本号时直接返回412
+        expected_version = None
+        if request.if_match and not request.if_match.star_tag:
+            current_version = record_version(current_interface)
+            validator = interface_validator(collection_id, interface_id, current_interface)
+            if not any(tag.split('-')[0] == validator or tag == str(current_version)
+                       for tag in request.if_match.as_set()):
+                summary = storage.get_collection_summary(collection_id) or {}
+                return version_conflict_response(
+                    current_version, interface_etag(collection_id, interface_id, current_interface, summary))
+            expected_version = current_version
+        
         data = request.get_json()
         if not data or 'interface' not in data:
             return jsonify({
@@ -287,19 +526,27 @@ def update_interface(collection_id, interface_id):
         
         # 更新接口信息（保留ID）
         updated_interface = data['interface']
-        updated_interface['id'] = interface_id
-        doc['interfaces'][interface_index] = updated_interface
-        
-        # 保存更新后的集合
-        storage.update_collection(collection_id, doc)
+        try:
+            if not storage.update_interface(collection_id, interface_id, updated_interface,
+                                            expected_version=expected_version):
+                return jsonify({
+                    'success': False,
+                    'error': '更新接口失败'
+                }), 500
+        except VersionConflict as e:
+            # 检查 If-Match 之后、写入之前被其他请求修改
+            return version_conflict_response(e.current_version)
         
         current_app.logger.info(f"接口信息已更新: {interface_id}")
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'message': '接口信息已更新',
             'interface': updated_interface
-        }), 200
+        })
+        summary = storage.get_collection_summary(collection_id) or {}
+        response.set_etag(interface_etag(collection_id, interface_id, updated_interface, summary))
+        return response, 200
         
     except Exception as e:
         current_app.logger.error(f"更新接口信息失败: {traceback.format_exc()}")
@@ -308,6 +555,33 @@ def update_interface(collection_id, interface_id):
             'error': f'服务器错误: {str(e)}'
         }), 500
 
+def version_conflict_response(current_version, current_etag=None):
+    """接口已被他人修改时的412响应，ETag 为接口当前的 ETag（未知时为版本号）"""
+    response = jsonify({
+        'success': False,
+        'error': '接口已被其他人修改，请重新加载后再保存',
+        'current_version': current_version
+    })
+    response.set_etag(current_etag or str(current_version))
+    return response, 412
+
+
+def interface_validator(collection_id, interface_id, interface):
+    """
+    接口详情 ETag 的接口部分，只由接口版本号计算，用于 If-Match
+    集合和接口ID一起参与计算，删除后重建的同名接口不会与旧记录的 ETag 相同
+    """
+    return make_etag(collection_id, interface_id, record_version(interface))
+
+
+def interface_etag(collection_id, interface_id, interface, summary):
+    """
+    接口详情的 ETag："接口部分-集合部分"；响应中包含集合信息，集合部分由集合的版本号和修改时间计算，
+    只用于条件 GET（304），更新时的 If-Match 只比较接口部分
+    """
+    collection_validator = make_etag(summary.get('_version'), summary.get('_created_at'), summary.get('_updated_at'))
+    return f"{interface_validator(collection_id, interface_id, interface)}-{collection_validator}"
+
 @api_bp.route('/collection/<collection_id>/delete-interface/<interface_id>', methods=['DELETE'])
 def delete_interface(collection_id, interface_id):
     """
@@ -316,6 +590,7 @@ def delete_interface(collection_id, interface_id):
     参数:
         - collection_id: 集合 ID
         - interface_id: 接口 ID
+        - cascade: 查询参数，为 true 时同时删除该接口的测试用例和Python脚本（可选）
         
     响应:
         - 200: 删除成功
@@ -324,31 +599,28 @@ def delete_interface(collection_id, interface_id):
     """
     try:
         storage = current_app.config['STORAGE']
-        doc = storage.get_collection(collection_id)
         
-        if not doc:
+        if not storage.collection_exists(collection_id):
             return jsonify({
                 'success': False,
                 'error': '集合不存在'
             }), 404
         
-        # 查找接口索引
-        interface_index = next((i for i, iface in enumerate(doc['interfaces']) if iface['id'] == interface_id), None)
+        # 删除接口
+        deleted_interface = storage.delete_interface(collection_id, interface_id)
         
-        if interface_index is None:
+        if deleted_interface is None:
             return jsonify({
                 'success': False,
                 'error': '接口不存在'
             }), 404
         
-        # 删除接口
-        deleted_interface = doc['interfaces'].pop(interface_index)
-        
-        # 保存更新后的集合
-        storage.update_collection(collection_id, doc)
-        
         current_app.logger.info(f"接口已删除: {interface_id}")
         
+        if request.args.get('cascade', '').lower() in ('1', 'true', 'yes'):
+            storage.delete_python_script(collection_id, interface_id)
+            storage.delete_testcase(collection_id, interface_id)
+        
         return jsonify({
             'success': True,
             'message': '接口已删除',
@@ -381,9 +653,8 @@ def add_interface(collection_id):
     """
     try:
         storage = current_app.config['STORAGE']
-        doc = storage.get_collection(collection_id)
         
-        if not doc:
+        if not storage.collection_exists(collection_id):
             return jsonify({
                 'success': False,
                 'error': '集合不存在'
@@ -403,11 +674,12 @@ def add_interface(collection_id):
         if 'id' not in new_interface or not new_interface['id']:
             new_interface['id'] = str(uuid.uuid4())
         
-        # 添加到接口列表
-        doc['interfaces'].append(new_interface)
-        
-        # 保存更新后的集合
-        storage.update_collection(collection_id, doc)
+        # 添加到接口列表末尾
+        if not storage.add_interface(collection_id, new_interface):
+            return jsonify({
+                'success': False,
+                'error': '添加接口失败'
+            }), 500
         
         current_app.logger.info(f"新接口已添加: {new_interface['id']}")
         
@@ -428,15 +700,18 @@ def add_interface(collection_id):
 @api_bp.route('/search', methods=['GET'])
 def search_interfaces():
     """
-    搜索接口
+    搜索接口（倒排索引，多个关键词以空格分隔，需全部命中，按相关度排序）
     
     查询参数:
         - q: 搜索关键词（必需）
         - collection_id: 限定搜索的集合 ID（可选）
+        - limit: 每页结果数（可选，默认50，最大500）
+        - offset: 跳过的结果数（可选，默认0）
         
     响应:
-        - 200: 成功
-        - 400: 缺少搜索关键词
+        - 200: 成功，total 为命中的接口总数
+        - 400: 缺少搜索关键词或分页参数错误
+        - 404: 指定的集合不存在
     """
     keyword = request.args.get('q', '').strip().lower()
     collection_id = request.args.get('collection_id', '').strip()
@@ -447,50 +722,36 @@ def search_interfaces():
             'error': '搜索关键词不能为空'
         }), 400
     
+    try:
+        limit = int(request.args.get('limit', 50))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'limit/offset 必须是整数'
+        }), 400
+    if limit < 1 or limit > 500 or offset < 0:
+        return jsonify({
+            'success': False,
+            'error': 'limit 须在1-500之间，offset 不能为负数'
+        }), 400
+    
     storage = current_app.config['STORAGE']
-    collections = storage.get_all_collections()
-    results = []
+    if collection_id and not storage.collection_exists(collection_id):
+        return jsonify({
+            'success': False,
+            'error': '指定的集合不存在'
+        }), 404
     
-    # 确定搜索范围
-    if collection_id:
-        if not storage.collection_exists(collection_id):
-            return jsonify({
-                'success': False,
-                'error': '指定的集合不存在'
-            }), 404
-        search_collections = {collection_id: collections[collection_id]}
-    else:
-        search_collections = collections
-    
-    # 搜索接口
-    for cid, doc in search_collections.items():
-        for interface in doc['interfaces']:
-            # 在 summary, description, path, operation_id 中搜索
-            searchable_text = ' '.join([
-                interface['summary'].lower(),
-                interface['description'].lower(),
-                interface['path'].lower(),
-                interface.get('operation_id', '').lower(),
-                ' '.join(interface.get('tags', [])).lower()
-            ])
-            
-            if keyword in searchable_text:
-                results.append({
-                    'collection_id': cid,
-                    'collection_title': doc['title'],
-                    'interface_id': interface['id'],
-                    'method': interface['method'],
-                    'path': interface['path'],
-                    'summary': interface['summary'],
-                    'description': interface['description'],
-                    'tags': interface['tags']
-                })
+    found = current_app.config['SEARCH_INDEX'].search(keyword, collection_id or None, limit, offset)
     
     return jsonify({
         'success': True,
         'keyword': keyword,
-        'results': results,
-        'total': len(results)
+        'results': found['results'],
+        'total': found['total'],
+        'limit': limit,
+        'offset': offset
     }), 200
 
 @api_bp.route('/collection/<collection_id>', methods=['DELETE'])
@@ -500,12 +761,14 @@ def delete_collection(collection_id):
     
     参数:
         - collection_id: 集合 ID
+        - cascade: 查询参数，为 true 时同时删除该集合的测试用例和Python脚本（可选）
         
     响应:
         - 200: 删除成功
         - 404: 集合不存在
     """
     storage = current_app.config['STORAGE']
+    cascade = request.args.get('cascade', '').lower() in ('1', 'true', 'yes')
     
     if not storage.collection_exists(collection_id):
         return jsonify({
@@ -513,7 +776,7 @@ def delete_collection(collection_id):
             'error': '集合不存在'
         }), 404
     
-    if storage.delete_collection(collection_id):
+    if storage.delete_collection(collection_id, cascade=cascade):
         return jsonify({
             'success': True,
             'message': '集合已删除'
@@ -533,14 +796,82 @@ def health_check():
         - 200: 服务正常
     """
     storage = current_app.config['STORAGE']
-    collections = storage.get_all_collections()
+    summaries = storage.get_collection_summaries()
     return jsonify({
         'status': 'healthy',
         'service': 'API Document Parser',
         'version': '1.0.0',
-        'collections_count': len(collections)
+        'collections_count': len(summaries),
+        'storage_cache': storage.get_cache_stats(),
+        'storage_locks': storage.get_lock_stats(),
+        'generation_jobs': current_app.config['GENERATION_JOBS'].get_stats(),
+        'generation_cache': current_app.config['GENERATION_CACHE'].get_stats()
+    }), 200
+
+@api_bp.route('/admin/cache', methods=['GET'])
+def get_storage_cache_stats():
+    """
+    获取存储层内存缓存统计
+    
+    响应:
+        - 200: 成功，返回缓存占用字节数（估算）、上限、命中率、条目数和淘汰次数
+    """
+    storage = current_app.config['STORAGE']
+    return jsonify({
+        'success': True,
+        'cache': storage.get_cache_stats()
+    }), 200
+
+@api_bp.route('/admin/generation-cache', methods=['GET', 'DELETE'])
+def manage_generation_cache():
+    """
+    查看（GET）或清空（DELETE）生成结果缓存
+    
+    响应:
+        - 200: GET 返回条目数、上限、有效期、命中/未命中次数和命中率；DELETE 返回清除的条目数
+    """
+    cache = current_app.config['GENERATION_CACHE']
+    if request.method == 'DELETE':
+        return jsonify({
+            'success': True,
+            'cleared': cache.clear()
+        }), 200
+    return jsonify({
+        'success': True,
+        'cache': cache.get_stats()
     }), 200
 
+@api_bp.route('/admin/gc', methods=['POST'])
+def collect_storage_garbage():
+    """
+    清理孤立数据：已删除的集合/接口遗留的测试用例和Python脚本文件等
+    
+    请求体（可选）:
+        {
+            "dry_run": true  # 只统计不删除
+        }
+    
+    响应:
+        - 200: 清理完成，返回各类数据的清理数量和释放的字节数
+        - 500: 服务器错误
+    """
+    try:
+        storage = current_app.config['STORAGE']
+        data = request.get_json(silent=True) or {}
+        result = storage.collect_garbage(dry_run=bool(data.get('dry_run')))
+        
+        return jsonify({
+            'success': True,
+            'result': result
+        }), 200
+    
+    except Exception as e:
+        current_app.logger.error(f"清理孤立数据失败: {traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': f'服务器错误: {str(e)}'
+        }), 500
+
 @api_bp.route('/generate-yaml/<collection_id>/<interface_id>', methods=['POST'])
 def generate_yaml_testcases(collection_id, interface_id):
     """
@@ -549,6 +880,9 @@ def generate_yaml_testcases(collection_id, interface_id):
     参数:
         - collection_id: 集合 ID
         - interface_id: 接口 ID
+    
+    查询参数:
+        - refresh: 为 true 时忽略缓存的生成结果，重新调用Dify
         
     响应:
         - 200: 成功生成YAML
@@ -559,14 +893,14 @@ def generate_yaml_testcases(collection_id, interface_id):
         storage = current_app.config['STORAGE']
         
         # 检查集合是否存在
-        doc = storage.get_collection(collection_id)
-        if not doc:
+        summary = storage.get_collection_summary(collection_id)
+        if not summary:
             return jsonify({
                 'success': False,
                 'error': '集合不存在'
             }), 404
         
-        interface = next((i for i in doc['interfaces'] if i['id'] == interface_id), None)
+        interface = storage.get_interface(collection_id, interface_id)
         
         # 检查接口是否存在
         if not interface:
@@ -580,9 +914,9 @@ def generate_yaml_testcases(collection_id, interface_id):
             'interface': interface,
             'collection_info': {
                 'id': collection_id,
-                'title': doc['title'],
-                'base_url': doc['base_url'],
-                'version': doc['version']
+                'title': summary['title'],
+                'base_url': summary['base_url'],
+                'version': summary['version']
             }
         }
         
@@ -594,7 +928,7 @@ def generate_yaml_testcases(collection_id, interface_id):
                 'error': 'Dify客户端未配置'
             }), 500
         
-        result = dify_client.generate_json_testcases(interface_details)
+        result = dify_client.generate_json_testcases(interface_details, force_refresh=refresh_requested())
         
         if result['success']:
             # 保存测试用例到存储
@@ -610,7 +944,8 @@ def generate_yaml_testcases(collection_id, interface_id):
                 'json_content': json_content,
                 'original_content': result.get('original_content', ''),  # 原始AI响应内容
                 'workflow_id': workflow_id,
-                'saved': save_success
+                'saved': save_success,
+                'cached': result.get('cached', False)
             }), 200
         else:
             return jsonify({
@@ -629,29 +964,35 @@ def generate_yaml_testcases(collection_id, interface_id):
 @api_bp.route('/generate-json/<collection_id>/<interface_id>', methods=['POST'])
 def generate_json_testcases(collection_id, interface_id):
     """
-    生成JSON格式的测试用例
+    提交JSON格式测试用例的生成任务（在后台线程池中调用Dify，完成后自动保存测试用例）
     
     参数:
         - collection_id: 集合 ID
         - interface_id: 接口 ID
         
+    查询参数:
+        - wait: 为 true 时等待生成结束后返回生成结果（兼容旧的同步调用方式）
+        - refresh: 为 true 时忽略缓存的生成结果，重新调用Dify
+    
     响应:
-        - 200: 成功生成JSON
+        - 202: 已提交，返回任务ID，通过 GET /api/generation-jobs/<job_id> 查询状态和结果
+               （该接口已有未结束的任务时返回该任务）
+        - 200: wait=true 时生成成功
         - 404: 集合或接口不存在
-        - 500: 生成失败
+        - 500: Dify客户端未配置，或 wait=true 时生成失败
     """
     try:
         storage = current_app.config['STORAGE']
         
         # 检查集合是否存在
-        doc = storage.get_collection(collection_id)
-        if not doc:
+        summary = storage.get_collection_summary(collection_id)
+        if not summary:
             return jsonify({
                 'success': False,
                 'error': '集合不存在'
             }), 404
         
-        interface = next((i for i in doc['interfaces'] if i['id'] == interface_id), None)
+        interface = storage.get_interface(collection_id, interface_id)
         
         # 检查接口是否存在
         if not interface:
@@ -665,9 +1006,9 @@ def generate_json_testcases(collection_id, interface_id):
             'interface': interface,
             'collection_info': {
                 'id': collection_id,
-                'title': doc['title'],
-                'base_url': doc['base_url'],
-                'version': doc['version']
+                'title': summary['title'],
+                'base_url': summary['base_url'],
+                'version': summary['version']
             }
         }
         
@@ -679,28 +1020,31 @@ def generate_json_testcases(collection_id, interface_id):
                 'error': 'Dify客户端未配置'
             }), 500
         
-        result = dify_client.generate_json_testcases(interface_details)
+        jobs = current_app.config['GENERATION_JOBS']
+        job = jobs.submit(dify_client, collection_id, interface_id, interface_details, force_refresh=refresh_requested())
         
-        if result['success']:
-            # 保存测试用例到存储
-            workflow_id = result.get('workflow_id')
-            json_content = result['json_content']
-            save_success = storage.save_testcase(collection_id, interface_id, json_content=json_content, workflow_id=workflow_id)
+        if parse_boolean(request.args.get('wait', '')) != 'true':
+            response = jsonify({
+                'success': True,
+                'job_id': job['job_id'],
+                'status': job['status'],
+                'status_url': f"/api/generation-jobs/{job['job_id']}"
+            })
+            response.headers['Location'] = f"/api/generation-jobs/{job['job_id']}"
+            return response, 202
             
-            if not save_success:
-                current_app.logger.warning(f"测试用例生成成功但保存失败: {collection_id}_{interface_id}")
-                
+        job = jobs.wait(job['job_id'])
+        if job['status'] == STATUS_SUCCEEDED:
             return jsonify({
                 'success': True,
-                'json_content': json_content,
-                'original_content': result.get('original_content', ''),  # 原始AI响应内容
-                'workflow_id': workflow_id,
-                'saved': save_success
+                'job_id': job['job_id'],
+                **job['result']
             }), 200
         else:
             return jsonify({
                 'success': False,
-                'error': result['error']
+                'job_id': job['job_id'],
+                'error': job['error']
             }), 500
             
     except Exception as e:
@@ -711,6 +1055,248 @@ def generate_json_testcases(collection_id, interface_id):
         }), 500
 
 
+@api_bp.route('/generate-json-stream/<collection_id>/<interface_id>', methods=['POST'])
+def stream_json_testcases(collection_id, interface_id):
+    """
+    以流式方式生成JSON格式测试用例（Server-Sent Events），Dify每输出一段内容就转发给浏览器，
+    每个测试用例完整接收后立即推送，生成结束后自动保存测试用例
+    
+    参数:
+        - collection_id: 集合 ID
+        - interface_id: 接口 ID
+    
+    查询参数:
+        - refresh: 为 true 时忽略缓存的生成结果，重新调用Dify（命中缓存时直接推送缓存的测试用例）
+    
+    响应:
+        - 200: text/event-stream，依次推送以下事件（data 均为JSON）：
+               chunk: {"text"} Dify新输出的文本片段
+               testcase: {"index", "test_case"} 已完整接收的测试用例
+               done: {"success", "json_content", "original_content", "workflow_id", "saved", "testcase_count", "cached"} 生成结束并已保存
+               error: {"success", "error"} 生成失败
+        - 404: 集合或接口不存在
+        - 500: Dify客户端未配置
+    """
+    storage = current_app.config['STORAGE']
+    
+    # 检查集合是否存在
+    summary = storage.get_collection_summary(collection_id)
+    if not summary:
+        return jsonify({
+            'success': False,
+            'error': '集合不存在'
+        }), 404
+    
+    interface = storage.get_interface(collection_id, interface_id)
+    
+    # 检查接口是否存在
+    if not interface:
+        return jsonify({
+            'success': False,
+            'error': '接口不存在'
+        }), 404
+    
+    dify_client = current_app.config.get('DIFY_CLIENT')
+    if not dify_client:
+        return jsonify({
+            'success': False,
+            'error': 'Dify客户端未配置'
+        }), 500
+    
+    # 准备接口详情
+    interface_details = {
+        'interface': interface,
+        'collection_info': {
+            'id': collection_id,
+            'title': summary['title'],
+            'base_url': summary['base_url'],
+            'version': summary['version']
+        }
+    }
+    logger = current_app.logger
+    force_refresh = refresh_requested()
+    
+    def sse(event, data):
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    
+    def generate():
+        try:
+            for event in dify_client.stream_json_testcases(interface_details, force_refresh=force_refresh):
+                name = event.pop('event')
+                if name == 'done':
+                    workflow_id = event.get('workflow_id')
+                    json_content = event['json_content']
+                    save_success = storage.save_testcase(collection_id, interface_id, json_content=json_content, workflow_id=workflow_id)
+                    if not save_success:
+                        logger.warning(f"测试用例生成成功但保存失败: {collection_id}_{interface_id}")
+                    yield sse('done', {
+                        'success': True,
+                        'json_content': json_content,
+                        'original_content': event.get('original_content', ''),
+                        'workflow_id': workflow_id,
+                        'saved': save_success,
+                        'testcase_count': len(event.get('test_cases') or []),
+                        'cached': event.get('cached', False)
+                    })
+                elif name == 'error':
+                    yield sse('error', {'success': False, 'error': event['error']})
+                else:
+                    yield sse(name, event)
+        except Exception as e:
+            logger.error(f"流式生成JSON测试用例失败: {traceback.format_exc()}")
+            yield sse('error', {'success': False, 'error': f'服务器错误: {str(e)}'})
+    
+    return current_app.response_class(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
+@api_bp.route('/generation-jobs/<job_id>', methods=['GET'])
+def get_generation_job(job_id):
+    """
+    查询测试用例生成任务
+    
+    参数:
+        - job_id: 任务 ID
+    
+    响应:
+        - 200: 成功，job.status 为 queued / running / succeeded / failed；
+               succeeded 时 job.result 包含 json_content、original_content、workflow_id、saved，failed 时 job.error 为错误信息
+        - 404: 任务不存在或已被清理
+    """
+    job = current_app.config['GENERATION_JOBS'].get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': '任务不存在'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job
+    }), 200
+
+
+@api_bp.route('/collection/<collection_id>/generate-all', methods=['POST'])
+def generate_collection_testcases(collection_id):
+    """
+    提交整个集合的批量测试用例生成任务（在后台线程池中并发调用Dify，生成结果分批保存）
+    
+    参数:
+        - collection_id: 集合 ID
+    
+    请求体（JSON，均可选）:
+        - max_concurrency: 最大并发数，默认且最大为 GENERATION_WORKERS
+        - retries: 每个接口失败后的重试次数（0-5，默认2）
+        - skip_existing: 是否跳过已有测试用例的接口（默认 true）
+        - batch_size: 每批保存的测试用例数（1-200，默认20）
+        - refresh: 是否忽略缓存的生成结果，重新调用Dify（默认 false）
+    
+    响应:
+        - 202: 已提交，返回批量任务进度，通过 GET /api/generation-batches/<batch_id> 查询
+               （该集合已有执行中的批量任务时返回该任务）
+        - 400: 参数错误
+        - 404: 集合不存在
+        - 500: Dify客户端未配置
+    """
+    try:
+        storage = current_app.config['STORAGE']
+        options = request.get_json(silent=True) or {}
+        
+        try:
+            max_concurrency = int(options['max_concurrency']) if options.get('max_concurrency') is not None else None
+            retries = int(options.get('retries', 2))
+            batch_size = int(options.get('batch_size', 20))
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'max_concurrency、retries、batch_size 必须是整数'
+            }), 400
+        if (max_concurrency is not None and max_concurrency < 1) or not 0 <= retries <= 5 or not 1 <= batch_size <= 200:
+            return jsonify({
+                'success': False,
+                'error': 'max_concurrency 须大于0，retries 须在0-5之间，batch_size 须在1-200之间'
+            }), 400
+        skip_existing = options.get('skip_existing', True)
+        if isinstance(skip_existing, str):
+            skip_existing = parse_boolean(skip_existing) != 'false'
+        refresh = options.get('refresh', False)
+        if isinstance(refresh, str):
+            refresh = parse_boolean(refresh) == 'true'
+        
+        collection = storage.get_collection(collection_id)
+        if not collection:
+            return jsonify({
+                'success': False,
+                'error': '集合不存在'
+            }), 404
+        
+        dify_client = current_app.config.get('DIFY_CLIENT')
+        if not dify_client:
+            return jsonify({
+                'success': False,
+                'error': 'Dify客户端未配置'
+            }), 500
+        
+        collection_info = {
+            'id': collection_id,
+            'title': collection.get('title'),
+            'base_url': collection.get('base_url'),
+            'version': collection.get('version')
+        }
+        batch = current_app.config['GENERATION_JOBS'].submit_batch(
+            dify_client, collection_id, collection_info, collection.get('interfaces', []),
+            max_concurrency=max_concurrency, retries=retries, skip_existing=bool(skip_existing), batch_size=batch_size,
+            force_refresh=bool(refresh)
+        )
+        
+        response = jsonify({
+            'success': True,
+            'batch': batch,
+            'status_url': f"/api/generation-batches/{batch['batch_id']}"
+        })
+        response.headers['Location'] = f"/api/generation-batches/{batch['batch_id']}"
+        return response, 202
+    
+    except Exception as e:
+        current_app.logger.error(f"提交批量生成任务失败: {traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': f'服务器错误: {str(e)}'
+        }), 500
+
+
+@api_bp.route('/generation-batches/<batch_id>', methods=['GET'])
+def get_generation_batch(batch_id):
+    """
+    查询批量生成任务进度
+    
+    参数:
+        - batch_id: 批量任务 ID
+    
+    响应:
+        - 200: 成功，batch 包含 status（running / completed）、total、skipped、succeeded、failed、running、remaining、
+               saved（已保存数）、failures（失败接口及原因）、elapsed_seconds、eta_seconds（预计剩余秒数）
+        - 404: 批量任务不存在或已被清理
+    """
+    batch = current_app.config['GENERATION_JOBS'].get_batch(batch_id)
+    if batch is None:
+        return jsonify({
+            'success': False,
+            'error': '批量任务不存在'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'batch': batch
+    }), 200
+
+
 @api_bp.route('/generate-python', methods=['POST'])
 def generate_python_script():
     """
@@ -720,6 +1306,9 @@ def generate_python_script():
         - test_cases: JSON格式测试用例数据
         - yaml_content: YAML测试用例内容（兼容旧版本）
         
+    查询参数:
+        - refresh: 为 true 时忽略缓存的生成结果，重新调用Dify
+    
     响应:
         - 200: 成功生成Python脚本
         - 400: 请求参数错误
@@ -750,7 +1339,7 @@ def generate_python_script():
                 'error': 'Dify客户端未配置'
             }), 500
         
-        result = dify_client.generate_python_script(yaml_content)
+        result = dify_client.generate_python_script(yaml_content, force_refresh=refresh_requested())
         
         if result['success']:
             # 验证Python语法
@@ -760,6 +1349,7 @@ def generate_python_script():
                 'success': True,
                 'python_code': result['python_code'],
                 'workflow_id': result.get('workflow_id'),
+                'cached': result.get('cached', False),
                 'syntax_valid': validation['valid'],
                 'syntax_error': validation.get('error')
             }), 200
@@ -956,6 +1546,9 @@ def batch_get_testcase_status():
         - collection_id: 集合 ID
         - interface_ids: 接口 ID 列表
         
+    返回的 status_map 为 接口ID -> 是否有测试用例；details 为 接口ID -> 详细状态
+    （has_testcase、has_python_script、testcase_count、updated_at、python_generated_at）
+    
     响应:
         - 200: 成功
         - 400: 缺少参数
@@ -987,12 +1580,9 @@ def batch_get_testcase_status():
         
         storage = current_app.config['STORAGE']
         
-        # 批量检查所有接口的测试用例状态
-        status_map = {}
-        
-        for interface_id in interface_ids:
-            has_testcase = storage.has_testcase(collection_id, interface_id)
-            status_map[interface_id] = has_testcase
+        # 一次读取所有接口的测试用例状态
+        details = storage.get_testcase_statuses(collection_id, interface_ids)
+        status_map = {interface_id: status['has_testcase'] for interface_id, status in details.items()}
         
         current_app.logger.info(f"批量检查测试用例状态: collection_id={collection_id}, 接口数量={len(interface_ids)}, 已有测试用例数量={sum(status_map.values())}")
         
@@ -1000,8 +1590,10 @@ def batch_get_testcase_status():
             'success': True,
             'collection_id': collection_id,
             'status_map': status_map,
+            'details': details,
             'total_count': len(interface_ids),
             'has_testcase_count': sum(status_map.values()),
+            'has_python_script_count': sum(1 for status in details.values() if status['has_python_script']),
             'message': '批量查询成功'
         }), 200
         
@@ -1081,7 +1673,8 @@ def get_testcase():
         - interface_id: 接口 ID
         
     响应:
-        - 200: 成功
+        - 200: 成功，ETag 由测试用例和Python脚本的更新时间计算，Last-Modified 为其中较晚者
+        - 304: If-None-Match 与当前 ETag 一致，或 If-Modified-Since 不早于更新时间
         - 400: 缺少参数
         - 404: 测试用例不存在
         - 500: 服务器错误
@@ -1105,11 +1698,21 @@ def get_testcase():
                 'error': '测试用例不存在'
             }), 404
         
-        return jsonify({
+        etag = make_etag('testcase', collection_id, interface_id, testcase_data.get('created_at'),
+                         testcase_data.get('updated_at'), testcase_data.get('python_generated_at'),
+                         testcase_data.get('python_script_hash'))
+        modified_times = [to_http_datetime(testcase_data.get(field)) for field in ('updated_at', 'python_generated_at')]
+        modified_times = [moment for moment in modified_times if moment is not None]
+        last_modified = max(modified_times) if modified_times else None
+        cached = not_modified(etag, last_modified)
+        if cached is not None:
+            return cached
+        
+        return with_validators(jsonify({
             'success': True,
             'testcase': testcase_data,
             'message': '获取测试用例成功'
-        }), 200
+        }), etag, last_modified), 200
         
     except Exception as e:
         current_app.logger.error(f"获取测试用例失败: {traceback.format_exc()}")
@@ -1916,6 +2519,9 @@ def generate_python_yaml():
         - interface_id: 接口 ID
         - user_id: 用户ID（可选）
         
+    查询参数:
+        - refresh: 为 true 时忽略缓存的生成结果，重新调用Dify
+    
     响应:
         - 200: 成功
         - 400: 缺少参数
@@ -2011,7 +2617,7 @@ def generate_python_yaml():
         has_existing_script = storage.has_python_script(collection_id, interface_id)
         
         # 调用Dify客户端生成Python脚本
-        result = dify_client.generate_python_script_with_yaml(yaml_content, user_id)
+        result = dify_client.generate_python_script_with_yaml(yaml_content, user_id, force_refresh=refresh_requested())
         
         if result['success']:
             # 验证Python语法
@@ -2035,6 +2641,7 @@ def generate_python_yaml():
                 'success': True,
                 'python_code': result['python_code'],
                 'workflow_id': result.get('workflow_id'),
+                'cached': result.get('cached', False),
                 'syntax_valid': validation['valid'],
                 'syntax_error': validation.get('error'),
                 'saved_to_file': save_success,
@@ -0,0 +1,169 @@
+"""
+Python脚本内容存储
+生成的Python脚本按内容的SHA-256存放在 <storage_dir>/python_scripts/objects/<hash>.py，
+内容相同的脚本只保存一份；测试用例记录中只保存路径、哈希、大小和时间等元数据，脚本内容按需读取
+"""
+import hashlib
+import mmap
+import os
+import tempfile
+import time
+from typing import Dict, Any, Optional, Iterable
+import logging
+
+from app.file_lock import FileLock
+
+logger = logging.getLogger(__name__)
+
+
+class ScriptStore:
+    """按内容寻址的Python脚本存储"""
+    
+    # 超过该大小的脚本通过mmap读取，避免缓冲读取的多次拷贝
+    MMAP_THRESHOLD = 1024 * 1024
+    
+    # 超过该时间（秒）的临时文件视为写入中断的遗留文件
+    TEMP_FILE_AGE = 3600
+    
+    def __init__(self, scripts_dir: str):
+        """
+        初始化脚本存储
+        
+        Args:
+            scripts_dir: Python脚本目录（旧版 <collection_id>_<interface_id>.py 文件也在该目录下）
+        """
+        self.scripts_dir = scripts_dir
+        self.objects_dir = os.path.join(scripts_dir, "objects")
+        # 保存/释放脚本时持有，保证“检查引用后删除”与“写入后登记引用”不会交错
+        self._lock = FileLock(os.path.join(scripts_dir, "_store"))
+    
+    def _ensure_dir(self):
+        """确保脚本目录存在"""
+        if not os.path.exists(self.objects_dir):
+            os.makedirs(self.objects_dir)
+            logger.info(f"创建Python脚本存储目录: {self.objects_dir}")
+    
+    def lock(self):
+        """获取脚本存储的跨进程排他锁"""
+        self._ensure_dir()
+        return self._lock.acquire(exclusive=True)
+    
+    def object_path(self, script_hash: str) -> str:
+        """脚本内容哈希对应的文件路径"""
+        return os.path.join(self.objects_dir, f"{script_hash}.py")
+    
+    def put(self, python_code: str) -> Dict[str, Any]:
+        """
+        保存脚本内容，内容已存在时不重复写入（调用方需持有 lock()）
+        
+        Args:
+            python_code: Python代码内容
+        
+        Returns:
+            {"path": 文件路径, "hash": SHA-256, "size": 字节数}
+        """
+        content = python_code.encode('utf-8')
+        script_hash = hashlib.sha256(content).hexdigest()
+        path = self.object_path(script_hash)
+        
+        if not os.path.exists(path):
+            self._ensure_dir()
+            fd, tmp_path = tempfile.mkstemp(prefix=f"{script_hash}.", suffix=".tmp", dir=self.objects_dir)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        
+        return {"path": path, "hash": script_hash, "size": len(content)}
+    
+    def read(self, path: str) -> Optional[str]:
+        """
+        读取脚本内容，大文件通过mmap读取
+        
+        Args:
+            path: 脚本文件路径
+        
+        Returns:
+            脚本内容，文件不存在或读取失败时返回None
+        """
+        try:
+            with open(path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size >= self.MMAP_THRESHOLD:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        return mapped[:].decode('utf-8')
+                return f.read().decode('utf-8')
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"读取Python脚本文件失败: {path}: {e}")
+            return None
+    
+    def remove(self, script_hash: Optional[str], path: Optional[str]):
+        """
+        删除不再被引用的脚本文件（调用方需持有 lock() 并确认没有其他引用）
+        
+        Args:
+            script_hash: 脚本内容哈希，旧版按接口保存的脚本为None
+            path: 脚本文件路径
+        """
+        target = self.object_path(script_hash) if script_hash else path
+        if target and os.path.exists(target):
+            os.remove(target)
+            logger.info(f"删除Python脚本文件: {target}")
+
+    def sweep(self, referenced_hashes: Iterable[str], referenced_paths: Iterable[str], dry_run: bool = False) -> Dict[str, int]:
+        """
+        删除没有被引用的脚本文件和写入中断遗留的临时文件（调用方需持有 lock()）
+        
+        Args:
+            referenced_hashes: 仍被引用的脚本内容哈希
+            referenced_paths: 仍被引用的脚本文件路径（旧版按接口保存的脚本没有哈希）
+            dry_run: 为True时只统计不删除
+        
+        Returns:
+            {"files": 删除的文件数, "bytes": 释放的字节数}
+        """
+        referenced_hashes = set(referenced_hashes)
+        referenced_paths = {os.path.abspath(path) for path in referenced_paths}
+        expire_before = time.time() - self.TEMP_FILE_AGE
+        result = {"files": 0, "bytes": 0}
+        
+        candidates = []
+        for directory in (self.scripts_dir, self.objects_dir):
+            if os.path.isdir(directory):
+                candidates.extend(os.path.join(directory, name) for name in os.listdir(directory))
+        
+        for path in candidates:
+            name = os.path.basename(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if name.endswith(".tmp"):
+                if os.path.dirname(path) != self.objects_dir or stat.st_mtime > expire_before:
+                    continue
+            elif not name.endswith(".py") or not os.path.isfile(path):
+                continue
+            elif os.path.dirname(path) == self.objects_dir and name[:-len(".py")] in referenced_hashes:
+                continue
+            elif os.path.abspath(path) in referenced_paths:
+                continue
+            
+            if not dry_run:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.error(f"删除孤立的Python脚本文件失败: {path}: {e}")
+                    continue
+                logger.info(f"删除孤立的Python脚本文件: {path}")
+            result["files"] += 1
+            result["bytes"] += stat.st_size
+        return result
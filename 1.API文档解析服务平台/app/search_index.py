@@ -0,0 +1,377 @@
+"""
+接口搜索倒排索引
+对接口的 summary、description、path、operation_id、tags 建立字符 n-gram（单字和二元组）倒排表，
+查询时每个关键词取其二元组倒排表的交集得到候选接口，再用子串匹配确认，多个关键词之间为 AND 关系；
+结果按命中字段的权重打分排序，只对候选接口计算，耗时与命中数量相关而与接口总数无关
+
+索引按集合维护，只更新内容有变化的接口的倒排表：
+本进程的写入通过存储的数据变更通知（add_listener）在写入后立即增量更新（接口增删改只更新该接口），
+并记录写入后全部集合的变更标记（get_collections_stamp），之后的查询不需要再对比任何集合；
+其他进程的写入在查询时通过变更标记的变化发现，此时才对比各集合概要中的版本号和修改时间。
+其他进程恰好与本进程同时写入时，其修改要等变更标记下次变化才会被发现
+"""
+import heapq
+import re
+import threading
+from typing import Dict, Any, Optional, List
+
+from app.storage_events import INTERFACE, TESTCASE
+
+# 英文/数字单词，整词命中时额外加分
+_TOKEN_PATTERN = re.compile(r'[a-z0-9_]+')
+
+
+class SearchIndex:
+    """接口搜索倒排索引"""
+    
+    # 字段及命中时的得分
+    FIELD_WEIGHTS = (("summary", 3), ("path", 2), ("operation_id", 2), ("tags", 2), ("description", 1))
+    
+    # 关键词与接口中的英文单词完全相同时的额外得分
+    TOKEN_BONUS = 2
+    
+    def __init__(self, storage):
+        """
+        初始化搜索索引（首次查询时建立）
+        
+        Args:
+            storage: 存储实例（JSONStorage / SQLiteStorage）
+        """
+        self.storage = storage
+        self._lock = threading.Lock()
+        # n-gram -> 接口文档编号集合
+        self._postings: Dict[str, set] = {}
+        # 接口文档编号 -> 文档
+        self._docs: Dict[int, Dict[str, Any]] = {}
+        # 集合ID -> {"stamp": 概要中的版本号、修改时间等, "title": 标题, "docs": 接口ID -> 文档编号}
+        self._collections: Dict[str, Dict[str, Any]] = {}
+        self._next_doc_id = 0
+        # 无法增量更新、待下次查询时同步的集合ID，为None时需要对比全部集合（尚未建立索引或全部集合被替换）
+        self._pending_lock = threading.Lock()
+        self._dirty: Optional[set] = None
+        # 索引对应的全部集合变更标记（对比全部集合或应用本进程的写入后记录）
+        self._collections_stamp = None
+        storage.add_listener(self._on_change)
+    
+    def search(self, query: str, collection_id: Optional[str] = None, limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+        """
+        搜索接口
+        
+        Args:
+            query: 搜索关键词，多个关键词以空白分隔，需全部命中
+            collection_id: 限定搜索的集合ID（可选）
+            limit: 返回结果数
+            offset: 跳过的结果数
+        
+        Returns:
+            {"total": 命中的接口总数, "results": 按得分从高到低排列的当前页结果}
+        """
+        terms = list(dict.fromkeys(query.lower().split()))
+        if not terms:
+            return {"total": 0, "results": []}
+        
+        with self._lock:
+            self._sync()
+            
+            scope = None
+            if collection_id is not None:
+                entry = self._collections.get(collection_id)
+                if entry is None:
+                    return {"total": 0, "results": []}
+                scope = set(entry["docs"].values())
+            
+            # 先处理候选最少的关键词，尽早缩小候选集
+            candidates = scope
+            for term in sorted(terms, key=self._estimate):
+                candidates = self._match_term(term, candidates)
+                if not candidates:
+                    return {"total": 0, "results": []}
+            
+            ranked = []
+            for doc_id in candidates:
+                doc = self._docs[doc_id]
+                ranked.append((-self._score(doc, terms), doc["collection_id"], doc["position"], doc_id))
+            page = heapq.nsmallest(offset + limit, ranked)[offset:]
+            
+            results = []
+            for neg_score, cid, _, doc_id in page:
+                result = dict(self._docs[doc_id]["result"])
+                result["collection_id"] = cid
+                result["collection_title"] = self._collections[cid]["title"]
+                result["score"] = -neg_score
+                results.append(result)
+            return {"total": len(ranked), "results": results}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取索引统计信息
+        
+        Returns:
+            {"collections": 集合数, "interfaces": 接口数, "grams": n-gram 数}
+        """
+        with self._lock:
+            return {
+                "collections": len(self._collections),
+                "interfaces": len(self._docs),
+                "grams": len(self._postings)
+            }
+    
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _term_grams(term: str) -> set:
+        """关键词对应的 n-gram：单字关键词用单字，其余用二元组"""
+        if len(term) == 1:
+            return {term}
+        return {term[i:i + 2] for i in range(len(term) - 1)}
+    
+    def _estimate(self, term: str) -> int:
+        """估算关键词的候选数（最短倒排表的长度）"""
+        return min(len(self._postings.get(gram, ())) for gram in self._term_grams(term))
+    
+    def _match_term(self, term: str, candidates: Optional[set]) -> set:
+        """
+        求命中单个关键词的接口
+        
+        Args:
+            term: 小写关键词
+            candidates: 已有的候选接口，为None表示不限
+        
+        Returns:
+            命中的接口文档编号集合
+        """
+        postings = sorted((self._postings.get(gram, set()) for gram in self._term_grams(term)), key=len)
+        if candidates is not None:
+            postings.insert(0, candidates)
+        matched = set(postings[0])
+        for posting in postings[1:]:
+            matched &= posting
+            if not matched:
+                return matched
+        if len(term) > 2:
+            # 二元组都命中不代表关键词连续出现，用子串匹配确认
+            matched = {doc_id for doc_id in matched if term in self._docs[doc_id]["text"]}
+        return matched
+    
+    def _score(self, doc: Dict[str, Any], terms: List[str]) -> int:
+        """计算接口的得分：每个关键词按命中字段的权重累加，整词命中额外加分"""
+        score = 0
+        for term in terms:
+            for (_, weight), text in zip(self.FIELD_WEIGHTS, doc["fields"]):
+                if term in text:
+                    score += weight
+            if term in doc["tokens"]:
+                score += self.TOKEN_BONUS
+        return score
+    
+    # ------------------------------------------------------------------
+    # 索引维护
+    # ------------------------------------------------------------------
+    
+    def _on_change(self, event: str, collection_id: Optional[str], interface_ids: Optional[List[str]]):
+        """存储写入后的回调：增量更新受影响的集合或接口（测试用例不影响搜索结果）"""
+        if event == TESTCASE:
+            return
+        if collection_id is None:
+            # 全部集合被替换，下次查询时对比全部集合
+            with self._pending_lock:
+                self._dirty = None
+            return
+        
+        with self._lock:
+            with self._pending_lock:
+                if self._dirty is None:
+                    # 索引尚未建立或已需要全量对比，下次查询时一并处理
+                    return
+            try:
+                if event == INTERFACE and collection_id in self._collections:
+                    self._apply_interface_changes(collection_id, interface_ids)
+                else:
+                    summary = self.storage.get_collection_summary(collection_id)
+                    if summary is None:
+                        self._remove_collection(collection_id)
+                    else:
+                        self._sync_collection(collection_id, summary)
+            except Exception:
+                with self._pending_lock:
+                    if self._dirty is not None:
+                        self._dirty.add(collection_id)
+                raise
+            # 索引已包含本次写入，记录写入后的变更标记，之后的查询不会因为本进程的写入而对比全部集合
+            self._collections_stamp = self.storage.get_collections_stamp()
+    
+    def _apply_interface_changes(self, collection_id: str, interface_ids: List[str]):
+        """按接口的当前数据更新、新增或移除其倒排表（调用方需持有 _lock）"""
+        entry = self._collections[collection_id]
+        docs = entry["docs"]
+        for interface_id in interface_ids:
+            interface = self.storage.get_interface(collection_id, interface_id)
+            doc_id = docs.get(interface_id)
+            if interface is None:
+                if doc_id is not None:
+                    self._remove_doc(docs.pop(interface_id))
+                continue
+            
+            fields = self._interface_fields(interface)
+            if doc_id is not None:
+                doc = self._docs[doc_id]
+                if doc["fields"] == fields:
+                    doc["result"] = self._interface_result(interface)
+                    continue
+                position = doc["position"]
+                self._remove_doc(doc_id)
+            else:
+                # 新接口追加在集合末尾，结果排序只需要位置的相对顺序
+                position = max((self._docs[d]["position"] for d in docs.values()), default=-1) + 1
+            docs[interface_id] = self._add_doc(collection_id, position, interface, fields)
+        
+        # 接口数对不上说明期间还有其他写入，下次查询时重新索引该集合
+        summary = self.storage.get_collection_summary(collection_id)
+        if summary is None or summary.get("interface_count") != len(docs):
+            with self._pending_lock:
+                if self._dirty is not None:
+                    self._dirty.add(collection_id)
+            return
+        entry["stamp"] = self._collection_stamp(summary)
+    
+    def _sync(self):
+        """同步待处理的集合；全部集合的变更标记变化时（其他进程写入）对比全部集合（调用方需持有 _lock）"""
+        with self._pending_lock:
+            dirty, self._dirty = self._dirty, set()
+        
+        stamp = self.storage.get_collections_stamp()
+        if dirty is None or stamp != self._collections_stamp:
+            self._sync_all()
+            self._collections_stamp = stamp
+            return
+        
+        for collection_id in dirty:
+            summary = self.storage.get_collection_summary(collection_id)
+            if summary is None:
+                self._remove_collection(collection_id)
+            else:
+                self._sync_collection(collection_id, summary)
+    
+    def _sync_all(self):
+        """对比全部集合的概要，增量更新新增、修改、删除的集合"""
+        summaries = self.storage.get_collection_summaries()
+        
+        for collection_id in [cid for cid in self._collections if cid not in summaries]:
+            self._remove_collection(collection_id)
+        
+        for collection_id, summary in summaries.items():
+            self._sync_collection(collection_id, summary)
+    
+    @staticmethod
+    def _collection_stamp(summary: Dict[str, Any]) -> tuple:
+        """集合概要中决定索引内容的字段"""
+        return (summary.get("_version"), summary.get("_updated_at"), summary.get("title"),
+                summary.get("interface_count"))
+    
+    def _sync_collection(self, collection_id: str, summary: Dict[str, Any]):
+        """集合概要中的版本号、修改时间等有变化时重新索引该集合"""
+        stamp = self._collection_stamp(summary)
+        entry = self._collections.get(collection_id)
+        if entry is None or entry["stamp"] != stamp:
+            self._index_collection(collection_id, stamp)
+    
+    def _index_collection(self, collection_id: str, stamp: tuple):
+        """重新读取集合，只更新内容有变化的接口"""
+        collection = self.storage.get_collection(collection_id)
+        if collection is None:
+            self._remove_collection(collection_id)
+            return
+        
+        entry = self._collections.setdefault(collection_id, {"docs": {}})
+        entry["stamp"] = stamp
+        entry["title"] = collection.get("title")
+        docs = entry["docs"]
+        
+        seen = set()
+        for position, interface in enumerate(collection.get("interfaces", [])):
+            interface_id = str(interface.get("id"))
+            if interface_id in seen:
+                continue
+            seen.add(interface_id)
+            
+            fields = self._interface_fields(interface)
+            doc_id = docs.get(interface_id)
+            if doc_id is not None and self._docs[doc_id]["fields"] == fields:
+                doc = self._docs[doc_id]
+                doc["position"] = position
+                doc["result"] = self._interface_result(interface)
+                continue
+            if doc_id is not None:
+                self._remove_doc(doc_id)
+            docs[interface_id] = self._add_doc(collection_id, position, interface, fields)
+        
+        for interface_id in [iid for iid in docs if iid not in seen]:
+            self._remove_doc(docs.pop(interface_id))
+    
+    def _remove_collection(self, collection_id: str):
+        """移除集合的全部接口"""
+        entry = self._collections.pop(collection_id, None)
+        if entry is not None:
+            for doc_id in entry["docs"].values():
+                self._remove_doc(doc_id)
+    
+    def _add_doc(self, collection_id: str, position: int, interface: Dict[str, Any], fields: tuple) -> int:
+        """将接口加入倒排表，返回文档编号"""
+        doc_id = self._next_doc_id
+        self._next_doc_id += 1
+        text = "\n".join(fields)
+        self._docs[doc_id] = {
+            "collection_id": collection_id,
+            "position": position,
+            "fields": fields,
+            "text": text,
+            "tokens": frozenset(_TOKEN_PATTERN.findall(text)),
+            "result": self._interface_result(interface)
+        }
+        for gram in self._text_grams(text):
+            self._postings.setdefault(gram, set()).add(doc_id)
+        return doc_id
+    
+    def _remove_doc(self, doc_id: int):
+        """将接口从倒排表中移除"""
+        doc = self._docs.pop(doc_id)
+        for gram in self._text_grams(doc["text"]):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(doc_id)
+                if not posting:
+                    del self._postings[gram]
+    
+    @staticmethod
+    def _text_grams(text: str) -> set:
+        """文本中的单字和二元组（不跨越空白，关键词本身不含空白）"""
+        grams = set()
+        for word in text.split():
+            grams.update(word)
+            grams.update(word[i:i + 2] for i in range(len(word) - 1))
+        return grams
+    
+    @classmethod
+    def _interface_fields(cls, interface: Dict[str, Any]) -> tuple:
+        """接口各搜索字段的小写文本，顺序与 FIELD_WEIGHTS 一致"""
+        fields = []
+        for name, _ in cls.FIELD_WEIGHTS:
+            value = interface.get(name)
+            if name == "tags":
+                value = " ".join(str(tag) for tag in value or [])
+            fields.append(str(value or "").lower())
+        return tuple(fields)
+    
+    @staticmethod
+    def _interface_result(interface: Dict[str, Any]) -> Dict[str, Any]:
+        """搜索结果中展示的接口字段"""
+        return {
+            "interface_id": interface.get("id"),
+            "method": interface.get("method"),
+            "path": interface.get("path"),
+            "summary": interface.get("summary"),
+            "description": interface.get("description"),
+            "tags": interface.get("tags")
+        }
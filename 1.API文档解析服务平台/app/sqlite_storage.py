@@ -0,0 +1,1367 @@
+"""
+SQLite 数据持久化存储模块
+与 JSONStorage 提供相同的公共方法，集合、接口、测试用例和Python脚本元数据分别按行存储，
+单个接口的修改只写入对应的行，读取时也只查询需要的数据；
+原始文档（raw_doc）压缩存储，只在 get_raw_doc 中按需读取
+"""
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Iterator
+import logging
+
+from app.collection_summary import build_summary, update_summary, testcase_status, new_testcase_record
+from app.script_store import ScriptStore
+from app.storage_events import ChangeNotifier, COLLECTION, INTERFACE, TESTCASE
+from app.versioning import VersionConflict, record_version, check_version, bump_version, stamp_interface_versions
+
+logger = logging.getLogger(__name__)
+
+# 集合表中单独成列的字段，其余顶层字段存入 extra 列
+_COLLECTION_COLUMNS = ("title", "description", "version", "base_url")
+_COLLECTION_RESERVED = set(_COLLECTION_COLUMNS) | {"interfaces", "raw_doc", "_id", "_created_at", "_updated_at", "_version"}
+
+# 读取集合时查询的列，不包含 raw_doc
+_COLLECTION_SELECT = "SELECT id, title, description, version, base_url, extra, created_at, updated_at, row_version FROM collections"
+
+# Python脚本相关字段，与 JSONStorage 中测试用例记录的字段名保持一致
+_PYTHON_FIELDS = ("python_code", "python_script_path", "python_script_hash", "python_script_size",
+                  "python_workflow_id", "python_generated_at")
+
+# IN 查询每批的参数个数（旧版SQLite限制为999）
+_BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS collections (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    description TEXT,
+    version TEXT,
+    base_url TEXT,
+    extra TEXT NOT NULL DEFAULT '{}',
+    raw_doc TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    row_version INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS interfaces (
+    collection_id TEXT NOT NULL,
+    interface_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    method TEXT,
+    path TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (collection_id, interface_id)
+);
+CREATE INDEX IF NOT EXISTS idx_interfaces_position ON interfaces (collection_id, position);
+CREATE TABLE IF NOT EXISTS testcases (
+    collection_id TEXT NOT NULL,
+    interface_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at TEXT,
+    updated_at TEXT,
+    PRIMARY KEY (collection_id, interface_id)
+);
+CREATE TABLE IF NOT EXISTS collection_summaries (
+    collection_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS python_scripts (
+    collection_id TEXT NOT NULL,
+    interface_id TEXT NOT NULL,
+    script_path TEXT NOT NULL,
+    workflow_id TEXT,
+    generated_at TEXT,
+    code_length INTEGER,
+    script_hash TEXT,
+    script_size INTEGER,
+    PRIMARY KEY (collection_id, interface_id)
+);
+"""
+
+# 已有数据库升级时需要补充的列
+_ADDED_COLUMNS = {
+    "collections": (("row_version", "INTEGER NOT NULL DEFAULT 1"),),
+    "python_scripts": (("script_hash", "TEXT"), ("script_size", "INTEGER")),
+}
+
+_POST_UPGRADE_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_python_scripts_hash ON python_scripts (script_hash);
+"""
+
+
+def _dumps(data: Any) -> str:
+    """序列化为紧凑的JSON字符串"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+class SQLiteStorage(ChangeNotifier):
+    """SQLite存储管理器（WAL模式）"""
+    
+    def __init__(self, db_path: str = os.path.join("data", "storage.db"), storage_dir: str = "data"):
+        """
+        初始化存储管理器
+        
+        Args:
+            db_path: SQLite数据库文件路径
+            storage_dir: 存储目录路径（Python脚本文件保存在其下的 python_scripts 目录）
+        """
+        self.db_path = db_path
+        self.storage_dir = storage_dir
+        self.script_store = ScriptStore(os.path.join(storage_dir, "python_scripts"))
+        self._local = threading.local()
+        # 数据变更监听器（见 add_listener）
+        self._listeners = []
+        self._ensure_storage_dir()
+        
+        conn = self._get_conn()
+        conn.executescript(_SCHEMA)
+        self._upgrade_schema(conn)
+        conn.executescript(_POST_UPGRADE_SCHEMA)
+        conn.commit()
+        self._backfill_summaries()
+    
+    def _ensure_storage_dir(self):
+        """确保存储目录存在"""
+        for directory in (self.storage_dir, os.path.dirname(self.db_path)):
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+                logger.info(f"创建存储目录: {directory}")
+    
+    @staticmethod
+    def _upgrade_schema(conn: sqlite3.Connection):
+        """为旧版本创建的数据库补充新增的列"""
+        for table, columns in _ADDED_COLUMNS.items():
+            existing = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+            for name, column_type in columns:
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+                    logger.info(f"数据库升级: {table} 表新增列 {name}")
+    
+    def _backfill_summaries(self):
+        """为缺少概要信息的集合（升级前创建的数据库）计算概要信息"""
+        conn = self._get_conn()
+        missing = [
+            r["id"] for r in conn.execute(
+                "SELECT id FROM collections WHERE id NOT IN (SELECT collection_id FROM collection_summaries)"
+            )
+        ]
+        if not missing:
+            return
+        with conn:
+            for collection_id in missing:
+                self._write_summary(conn, collection_id, build_summary(self.get_collection(collection_id)))
+        logger.info(f"已补充 {len(missing)} 个集合的概要信息")
+    
+    def _get_conn(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接（sqlite3连接不能跨线程共享）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def close(self):
+        """关闭当前线程的数据库连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存命中统计（SQLite后端不使用进程内缓存，统计恒为0）
+        
+        Returns:
+            与 JSONStorage.get_cache_stats 结构相同的字典
+        """
+        return {"hits": 0, "misses": 0, "hit_ratio": 0.0, "entries": 0,
+                "resident_bytes": 0, "max_bytes": 0, "evictions": 0}
+    
+    def get_lock_stats(self) -> Dict[str, Any]:
+        """
+        获取文件锁等待时间统计（SQLite自行处理并发锁，不使用文件锁）
+        
+        Returns:
+            空字典
+        """
+        return {}
+    
+    # ------------------------------------------------------------------
+    # 集合
+    # ------------------------------------------------------------------
+    
+    def _row_to_collection(self, row: sqlite3.Row, interfaces: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """将集合行和接口列表组装为与 JSONStorage 一致的集合结构"""
+        collection = json.loads(row["extra"] or "{}")
+        for column in _COLLECTION_COLUMNS:
+            collection[column] = row[column]
+        collection["interfaces"] = interfaces
+        collection["_created_at"] = row["created_at"]
+        collection["_id"] = row["id"]
+        if row["updated_at"]:
+            collection["_updated_at"] = row["updated_at"]
+        collection["_version"] = row["row_version"]
+        return collection
+    
+    def _load_interfaces(self, conn: sqlite3.Connection, collection_id: str) -> List[Dict[str, Any]]:
+        """按顺序加载集合下的所有接口"""
+        rows = conn.execute(
+            "SELECT data FROM interfaces WHERE collection_id = ? ORDER BY position",
+            (collection_id,)
+        ).fetchall()
+        return [json.loads(r["data"]) for r in rows]
+    
+    def _write_collection(self, conn: sqlite3.Connection, collection_id: str, collection_data: Dict[str, Any]):
+        """
+        写入集合行，并增量同步接口行：只写入内容或顺序发生变化的接口，删除已移除的接口；
+        collection_data 中没有 raw_doc 时保留已有的原始文档
+        """
+        extra = {k: v for k, v in collection_data.items() if k not in _COLLECTION_RESERVED}
+        raw_doc = collection_data.get("raw_doc")
+        conn.execute(
+            """
+            INSERT INTO collections (id, title, description, version, base_url, extra, raw_doc, created_at, updated_at, row_version)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                title = excluded.title, description = excluded.description, version = excluded.version,
+                base_url = excluded.base_url, extra = excluded.extra, raw_doc = COALESCE(excluded.raw_doc, collections.raw_doc),
+                created_at = excluded.created_at, updated_at = excluded.updated_at, row_version = excluded.row_version
+            """,
+            (
+                collection_id,
+                collection_data.get("title"),
+                collection_data.get("description"),
+                collection_data.get("version"),
+                collection_data.get("base_url"),
+                _dumps(extra),
+                sqlite3.Binary(gzip.compress(_dumps(raw_doc).encode("utf-8"))) if raw_doc is not None else None,
+                collection_data.get("_created_at"),
+                collection_data.get("_updated_at"),
+                record_version(collection_data),
+            )
+        )
+        
+        existing = {
+            r["interface_id"]: (r["position"], r["data"])
+            for r in conn.execute(
+                "SELECT interface_id, position, data FROM interfaces WHERE collection_id = ?",
+                (collection_id,)
+            )
+        }
+        
+        # 位置只要求保持相对顺序，尽量沿用已有位置，避免删除一个接口后重写其后所有行
+        last_position = -1
+        seen = set()
+        for interface in collection_data.get("interfaces", []):
+            interface_id = str(interface.get("id"))
+            seen.add(interface_id)
+            data = _dumps(interface)
+            old = existing.get(interface_id)
+            
+            if old is not None and old[0] > last_position:
+                position = old[0]
+                if old[1] == data:
+                    last_position = position
+                    continue
+            else:
+                position = last_position + 1
+            last_position = position
+            
+            if old is not None and old[1] == data:
+                conn.execute(
+                    "UPDATE interfaces SET position = ? WHERE collection_id = ? AND interface_id = ?",
+                    (position, collection_id, interface_id)
+                )
+            else:
+                conn.execute(
+                    """
+                    INSERT INTO interfaces (collection_id, interface_id, position, method, path, data)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(collection_id, interface_id) DO UPDATE SET
+                        position = excluded.position, method = excluded.method,
+                        path = excluded.path, data = excluded.data
+                    """,
+                    (collection_id, interface_id, position, interface.get("method"), interface.get("path"), data)
+                )
+        
+        removed = [(collection_id, iid) for iid in existing if iid not in seen]
+        if removed:
+            conn.executemany(
+                "DELETE FROM interfaces WHERE collection_id = ? AND interface_id = ?",
+                removed
+            )
+    
+        self._write_summary(conn, collection_id, build_summary(collection_data))
+    
+    @staticmethod
+    def _write_summary(conn: sqlite3.Connection, collection_id: str, summary: Dict[str, Any]):
+        """写入集合概要信息"""
+        conn.execute(
+            "INSERT OR REPLACE INTO collection_summaries (collection_id, data) VALUES (?, ?)",
+            (collection_id, _dumps(summary))
+        )
+    
+    def _patch_summary(self, conn: sqlite3.Connection, collection_id: str, updated_at: str, version: int,
+                       removed: Optional[Dict[str, Any]] = None, added: Optional[Dict[str, Any]] = None):
+        """按接口差量更新集合概要信息，概要信息缺失时根据当前数据重新计算"""
+        row = conn.execute(
+            "SELECT data FROM collection_summaries WHERE collection_id = ?", (collection_id,)
+        ).fetchone()
+        if row is None:
+            summary = build_summary(self.get_collection(collection_id))
+        else:
+            summary = update_summary(json.loads(row["data"]), {"_updated_at": updated_at, "_version": version},
+                                     removed, added)
+        self._write_summary(conn, collection_id, summary)
+    
+    def load_collections(self) -> Dict[str, Any]:
+        """
+        加载所有集合数据
+        
+        Returns:
+            集合数据字典
+        """
+        try:
+            conn = self._get_conn()
+            rows = conn.execute(f"{_COLLECTION_SELECT} ORDER BY created_at").fetchall()
+            collections = {
+                row["id"]: self._row_to_collection(row, self._load_interfaces(conn, row["id"]))
+                for row in rows
+            }
+            logger.info(f"成功加载 {len(collections)} 个集合")
+            return collections
+        except Exception as e:
+            logger.error(f"加载集合数据失败: {e}")
+            return {}
+    
+    def save_collections(self, collections: Dict[str, Any]) -> bool:
+        """
+        保存全部集合数据（数据库中不在 collections 内的集合会被删除）
+        
+        Args:
+            collections: 集合数据字典
+        
+        Returns:
+            保存是否成功
+        """
+        try:
+            conn = self._get_conn()
+            with conn:
+                existing_ids = {r["id"] for r in conn.execute("SELECT id FROM collections")}
+                for collection_id, collection_data in collections.items():
+                    self._write_collection(conn, collection_id, collection_data)
+                for collection_id in existing_ids - set(collections):
+                    conn.execute("DELETE FROM interfaces WHERE collection_id = ?", (collection_id,))
+                    conn.execute("DELETE FROM collection_summaries WHERE collection_id = ?", (collection_id,))
+                    conn.execute("DELETE FROM collections WHERE id = ?", (collection_id,))
+            
+            logger.info(f"成功保存 {len(collections)} 个集合到数据库")
+            self._notify(COLLECTION)
+            return True
+        except Exception as e:
+            logger.error(f"保存集合数据失败: {e}")
+            return False
+    
+    def add_collection(self, collection_data: Dict[str, Any]) -> str:
+        """
+        添加新的集合
+        
+        Args:
+            collection_data: 集合数据
+        
+        Returns:
+            集合ID
+        """
+        collection_id = str(uuid.uuid4())
+        
+        # 添加创建时间
+        collection_data["_created_at"] = datetime.now().isoformat()
+        collection_data["_id"] = collection_id
+        collection_data["_version"] = 1
+        
+        try:
+            conn = self._get_conn()
+            with conn:
+                self._write_collection(conn, collection_id, collection_data)
+        except Exception as e:
+            logger.error(f"保存集合失败: {e}")
+            raise Exception("保存集合失败")
+        
+        logger.info(f"成功添加集合: {collection_id}")
+        self._notify(COLLECTION, collection_id)
+        return collection_id
+    
+    def get_collection(self, collection_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取指定集合
+        
+        Args:
+            collection_id: 集合ID
+        
+        Returns:
+            集合数据，如果不存在返回None
+        """
+        conn = self._get_conn()
+        row = conn.execute(f"{_COLLECTION_SELECT} WHERE id = ?", (collection_id,)).fetchone()
+        if row is None:
+            return None
+        return self._row_to_collection(row, self._load_interfaces(conn, collection_id))
+    
+    def get_raw_doc(self, collection_id: str) -> Optional[Dict[str, Any]]:
+        """
+        按需读取集合的原始文档
+        
+        Args:
+            collection_id: 集合ID
+        
+        Returns:
+            原始文档，集合不存在或没有原始文档时返回None
+        """
+        row = self._get_conn().execute("SELECT raw_doc FROM collections WHERE id = ?", (collection_id,)).fetchone()
+        if row is None or row["raw_doc"] is None:
+            return None
+        raw_doc = row["raw_doc"]
+        if isinstance(raw_doc, bytes):
+            raw_doc = gzip.decompress(raw_doc).decode("utf-8")
+        # 早期版本以未压缩的JSON文本存储
+        return json.loads(raw_doc)
+    
+    def update_collection(self, collection_id: str, collection_data: Dict[str, Any],
+                          expected_version: Optional[int] = None) -> bool:
+        """
+        更新集合数据（集合版本号加1，内容有变化的接口版本号加1），只有发生变化的接口行会被写入
+        
+        Args:
+            collection_id: 集合ID
+            collection_data: 新的集合数据
+            expected_version: 期望的集合版本号，为None时不检查
+        
+        Returns:
+            更新是否成功
+        
+        Raises:
+            VersionConflict: 集合的当前版本与 expected_version 不一致
+        """
+        try:
+            conn = self._get_conn()
+            with conn:
+                # 立即获取写锁，保证“检查版本后写入”期间不会被其他连接修改
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT created_at, row_version FROM collections WHERE id = ?", (collection_id,)
+                ).fetchone()
+                if row is None:
+                    logger.warning(f"集合不存在: {collection_id}")
+                    return False
+                existing = {"_version": row["row_version"]}
+                check_version(existing, expected_version)
+                
+                # 保留创建时间和ID
+                collection_data["_created_at"] = row["created_at"]
+                collection_data["_id"] = collection_id
+                collection_data["_updated_at"] = datetime.now().isoformat()
+                bump_version(collection_data, existing)
+                stamp_interface_versions(self._load_interfaces(conn, collection_id), collection_data.get("interfaces", []))
+                
+                self._write_collection(conn, collection_id, collection_data)
+            self._notify(COLLECTION, collection_id)
+            return True
+        except VersionConflict:
+            raise
+        except Exception as e:
+            logger.error(f"更新集合失败: {e}")
+            return False
+    
+    def delete_collection(self, collection_id: str, cascade: bool = False) -> bool:
+        """
+        删除集合
+        
+        Args:
+            collection_id: 集合ID
+            cascade: 是否同时删除该集合的测试用例和不再被引用的Python脚本文件
+        
+        Returns:
+            删除是否成功
+        """
+        conn = self._get_conn()
+        with self.script_store.lock():
+            with conn:
+                cursor = conn.execute("DELETE FROM collections WHERE id = ?", (collection_id,))
+                if cursor.rowcount == 0:
+                    logger.warning(f"集合不存在: {collection_id}")
+                    return False
+                conn.execute("DELETE FROM interfaces WHERE collection_id = ?", (collection_id,))
+                conn.execute("DELETE FROM collection_summaries WHERE collection_id = ?", (collection_id,))
+                scripts = []
+                if cascade:
+                    scripts = conn.execute(
+                        "SELECT script_hash, script_path FROM python_scripts WHERE collection_id = ?", (collection_id,)
+                    ).fetchall()
+                    conn.execute("DELETE FROM testcases WHERE collection_id = ?", (collection_id,))
+                    conn.execute("DELETE FROM python_scripts WHERE collection_id = ?", (collection_id,))
+            
+            for row in scripts:
+                self._release_python_script(row["script_hash"], row["script_path"])
+        self._notify(COLLECTION, collection_id)
+        return True
+    
+    def get_all_collections(self) -> Dict[str, Any]:
+        """
+        获取所有集合
+        
+        Returns:
+            所有集合数据
+        """
+        return self.load_collections()
+    
+    def collection_exists(self, collection_id: str) -> bool:
+        """
+        检查集合是否存在
+        
+        Args:
+            collection_id: 集合ID
+        
+        Returns:
+            是否存在
+        """
+        row = self._get_conn().execute("SELECT 1 FROM collections WHERE id = ?", (collection_id,)).fetchone()
+        return row is not None
+    
+    def _query_summaries(self, collection_id: Optional[str] = None) -> Dict[str, Any]:
+        """查询写入时维护的集合概要信息，不加载接口数据"""
+        where, params = ("WHERE c.id = ?", (collection_id,)) if collection_id else ("", ())
+        rows = self._get_conn().execute(
+            f"""
+            SELECT s.collection_id, s.data FROM collection_summaries s
+            JOIN collections c ON c.id = s.collection_id {where}
+            ORDER BY c.created_at
+            """,
+            params
+        ).fetchall()
+        return {row["collection_id"]: json.loads(row["data"]) for row in rows}
+    
+    def get_collection_summaries(self) -> Dict[str, Any]:
+        """
+        获取所有集合的概要信息
+        
+        Returns:
+            集合ID -> 概要信息（title、description、version、base_url、interface_count、module_count、
+            tag_counts、method_counts、deprecated_count、_updated_at）
+        """
+        return self._query_summaries()
+    
+    def get_collections_stamp(self) -> tuple:
+        """
+        获取全部集合的变更标记（任一集合被新增、删除或修改后都会变化），供派生的索引判断是否需要对比各集合的概要
+        
+        Returns:
+            (集合数, 版本号之和, 最近修改时间, 最近创建时间)
+        """
+        row = self._get_conn().execute(
+            "SELECT COUNT(*), SUM(row_version), MAX(updated_at), MAX(created_at) FROM collections"
+        ).fetchone()
+        return tuple(row)
+    
+    def get_collection_summary(self, collection_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取指定集合的概要信息
+        
+        Args:
+            collection_id: 集合ID
+        
+        Returns:
+            概要信息，如果不存在返回None
+        """
+        return self._query_summaries(collection_id).get(collection_id)
+    
+    # ------------------------------------------------------------------
+    # 接口
+    # ------------------------------------------------------------------
+    
+    def get_interface(self, collection_id: str, interface_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取指定接口（按主键查询单行）
+        
+        Args:
+            collection_id: 集合ID
+            interface_id: 接口ID
+        
+        Returns:
+            接口数据，集合或接口不存在返回None
+        """
+        row = self._get_conn().execute(
+            "SELECT data FROM interfaces WHERE collection_id = ? AND interface_id = ?",
+            (collection_id, interface_id)
+        ).fetchone()
+        return json.loads(row["data"]) if row is not None else None
+    
+    def get_interface_page(self, collection_id: str, limit: int, after: Optional[tuple] = None) -> Optional[Dict[str, Any]]:
+        """
+        按集合中的顺序分页获取接口（按 position 索引范围查询，只读取当前页的行）
+        
+        Args:
+            collection_id: 集合ID
+            limit: 每页数量
+            after: 上一页最后一个接口的 (接口ID, position)，为None时从第一个接口开始；
+                   该接口已被删除时从原 position 之后继续
+        
+        Returns:
+            {"interfaces": 当前页接口, "next": 下一页的 (接口ID, position)，没有更多接口时为None}，
+            集合不存在返回None
+        """
+        conn = self._get_conn()
+        after_id, after_position = after if after is not None else (None, -1)
+        rows = conn.execute(
+            """
+            SELECT interface_id, position, data FROM interfaces
+            WHERE collection_id = ? AND position > COALESCE(
+                (SELECT position FROM interfaces WHERE collection_id = ? AND interface_id = ?), ?)
+            ORDER BY position LIMIT ?
+            """,
+            (collection_id, collection_id, after_id, after_position, limit + 1)
+        ).fetchall()
+        if not rows and not self.collection_exists(collection_id):
+            return None
+        
+        page = rows[:limit]
+        return {
+            "interfaces": [json.loads(r["data"]) for r in page],
+            "next": (page[-1]["interface_id"], page[-1]["position"]) if len(rows) > limit else None
+        }
+    
+    def update_interface(self, collection_id: str, interface_id: str, interface_data: Dict[str, Any],
+                         expected_version: Optional[int] = None) -> bool:
+        """
+        更新指定接口（保留接口ID，接口版本号加1），只写入该接口所在的行
+        
+        Args:
+            collection_id: 集合ID
+            interface_id: 接口ID
+            interface_data: 新的接口数据
+            expected_version: 期望的接口版本号，为None时不检查
+        
+        Returns:
+            更新是否成功，集合或接口不存在时返回False
+        
+        Raises:
+            VersionConflict: 接口的当前版本与 expected_version 不一致
+        """
+        interface_data["id"] = interface_id
+        try:
+            conn = self._get_conn()
+            with conn:
+                # 立即获取写锁，保证“检查版本后写入”期间不会被其他连接修改
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT data FROM interfaces WHERE collection_id = ? AND interface_id = ?",
+                    (collection_id, interface_id)
+                ).fetchone()
+                if row is None:
+                    logger.warning(f"接口不存在: {collection_id}/{interface_id}")
+                    return False
+                old_interface = json.loads(row["data"])
+                check_version(old_interface, expected_version)
+                bump_version(interface_data, old_interface)
+                conn.execute(
+                    "UPDATE interfaces SET method = ?, path = ?, data = ? WHERE collection_id = ? AND interface_id = ?",
+                    (interface_data.get("method"), interface_data.get("path"), _dumps(interface_data), collection_id, interface_id)
+                )
+                self._touch_collection(conn, collection_id, removed=old_interface, added=interface_data)
+            self._notify(INTERFACE, collection_id, [interface_id])
+            return True
+        except VersionConflict:
+            raise
+        except Exception as e:
+            logger.error(f"更新接口失败: {e}")
+            return False
+    
+    def add_interface(self, collection_id: str, interface_data: Dict[str, Any]) -> bool:
+        """
+        向集合末尾添加接口
+        
+        Args:
+            collection_id: 集合ID
+            interface_data: 接口数据，须包含 id
+        
+        Returns:
+            添加是否成功，集合不存在时返回False
+        """
+        interface_data["_version"] = 1
+        try:
+            conn = self._get_conn()
+            with conn:
+                if not self.collection_exists(collection_id):
+                    logger.warning(f"集合不存在: {collection_id}")
+                    return False
+                conn.execute(
+                    """
+                    INSERT INTO interfaces (collection_id, interface_id, position, method, path, data)
+                    SELECT ?, ?, COALESCE(MAX(position), -1) + 1, ?, ?, ?
+                    FROM interfaces WHERE collection_id = ?
+                    """,
+                    (collection_id, str(interface_data.get("id")), interface_data.get("method"),
+                     interface_data.get("path"), _dumps(interface_data), collection_id)
+                )
+                self._touch_collection(conn, collection_id, added=interface_data)
+            self._notify(INTERFACE, collection_id, [interface_data.get("id")])
+            return True
+        except Exception as e:
+            logger.error(f"添加接口失败: {e}")
+            return False
+    
+    def delete_interface(self, collection_id: str, interface_id: str) -> Optional[Dict[str, Any]]:
+        """
+        删除集合中的接口
+        
+        Args:
+            collection_id: 集合ID
+            interface_id: 接口ID
+        
+        Returns:
+            被删除的接口数据，集合或接口不存在、删除失败时返回None
+        """
+        try:
+            conn = self._get_conn()
+            with conn:
+                row = conn.execute(
+                    "SELECT data FROM interfaces WHERE collection_id = ? AND interface_id = ?",
+                    (collection_id, interface_id)
+                ).fetchone()
+                if row is None:
+                    logger.warning(f"接口不存在: {collection_id}/{interface_id}")
+                    return None
+                conn.execute(
+                    "DELETE FROM interfaces WHERE collection_id = ? AND interface_id = ?",
+                    (collection_id, interface_id)
+                )
+                deleted_interface = json.loads(row["data"])
+                self._touch_collection(conn, collection_id, removed=deleted_interface)
+            self._notify(INTERFACE, collection_id, [interface_id])
+            return deleted_interface
+        except Exception as e:
+            logger.error(f"删除接口失败: {e}")
+            return None
+    
+    def _touch_collection(self, conn: sqlite3.Connection, collection_id: str,
+                          removed: Optional[Dict[str, Any]] = None, added: Optional[Dict[str, Any]] = None):
+        """接口增删改后更新集合的修改时间和版本号，并按差量更新概要信息"""
+        updated_at = datetime.now().isoformat()
+        conn.execute(
+            "UPDATE collections SET updated_at = ?, row_version = row_version + 1 WHERE id = ?",
+            (updated_at, collection_id)
+        )
+        row = conn.execute("SELECT row_version FROM collections WHERE id = ?", (collection_id,)).fetchone()
+        self._patch_summary(conn, collection_id, updated_at, row["row_version"] if row else 1, removed, added)
+    
+    # ------------------------------------------------------------------
+    # 测试用例
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _python_fields(row: sqlite3.Row) -> Dict[str, Any]:
+        """将Python脚本元数据行转换为测试用例记录中的字段"""
+        return {
+            "python_script_path": row["script_path"],
+            "python_script_hash": row["script_hash"],
+            "python_script_size": row["script_size"],
+            "python_workflow_id": row["workflow_id"],
+            "python_generated_at": row["generated_at"],
+        }
+    
+    def _read_testcase(self, conn: sqlite3.Connection, collection_id: str, interface_id: str) -> Optional[Dict[str, Any]]:
+        """读取单个测试用例记录（合并Python脚本元数据，不包含脚本内容）"""
+        row = conn.execute(
+            "SELECT data FROM testcases WHERE collection_id = ? AND interface_id = ?",
+            (collection_id, interface_id)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        testcase = json.loads(row["data"])
+        script = conn.execute(
+            "SELECT * FROM python_scripts WHERE collection_id = ? AND interface_id = ?",
+            (collection_id, interface_id)
+        ).fetchone()
+        if script is not None:
+            testcase.update(self._python_fields(script))
+        return testcase
+    
+    @staticmethod
+    def _write_testcase(conn: sqlite3.Connection, collection_id: str, interface_id: str, testcase: Dict[str, Any]):
+        """写入单个测试用例记录，Python脚本字段单独存放在 python_scripts 表中"""
+        data = {k: v for k, v in testcase.items() if k not in _PYTHON_FIELDS}
+        conn.execute(
+            """
+            INSERT INTO testcases (collection_id, interface_id, data, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(collection_id, interface_id) DO UPDATE SET
+                data = excluded.data, created_at = excluded.created_at, updated_at = excluded.updated_at
+            """,
+            (collection_id, interface_id, _dumps(data), data.get("created_at"), data.get("updated_at"))
+        )
+    
+    def get_testcase_stamp(self, collection_id: str) -> tuple:
+        """
+        获取集合测试用例的变更标记，标记不变说明测试用例和Python脚本记录没有被修改，
+        供按测试用例状态派生的数据（如接口筛选索引）判断是否需要重建
+        
+        Args:
+            collection_id: 集合ID
+        
+        Returns:
+            (测试用例数, 最近更新时间, Python脚本数, 最近生成时间)
+        """
+        conn = self._get_conn()
+        testcases = conn.execute(
+            "SELECT COUNT(*), MAX(updated_at) FROM testcases WHERE collection_id = ?", (collection_id,)
+        ).fetchone()
+        scripts = conn.execute(
+            "SELECT COUNT(*), MAX(generated_at) FROM python_scripts WHERE collection_id = ?", (collection_id,)
+        ).fetchone()
+        return (testcases[0], testcases[1], scripts[0], scripts[1])
+    
+    def load_testcases(self) -> Dict[str, Any]:
+        """
+        加载所有测试用例数据
+        
+        Returns:
+            测试用例数据字典，键为 "{collection_id}_{interface_id}"
+        """
+        try:
+            conn = self._get_conn()
+            scripts = {
+                (r["collection_id"], r["interface_id"]): self._python_fields(r)
+                for r in conn.execute("SELECT * FROM python_scripts")
+            }
+            testcases = {}
+            for row in conn.execute("SELECT collection_id, interface_id, data FROM testcases"):
+                testcase = json.loads(row["data"])
+                testcase.update(scripts.get((row["collection_id"], row["interface_id"]), {}))
+                testcases[f"{row['collection_id']}_{row['interface_id']}"] = testcase
+            logger.info(f"成功加载 {len(testcases)} 个接口的测试用例")
+            return testcases
+        except Exception as e:
+            logger.error(f"加载测试用例失败: {e}")
+            return {}
+    
+    def save_testcases(self, testcases: Dict[str, Any]) -> bool:
+        """
+        保存全部测试用例数据（数据库中不在 testcases 内的测试用例会被删除）
+        
+        Args:
+            testcases: 测试用例数据字典
+        
+        Returns:
+            保存是否成功
+        """
+        try:
+            conn = self._get_conn()
+            with conn:
+                keep = set()
+                for testcase in testcases.values():
+                    collection_id = testcase.get("collection_id")
+                    interface_id = testcase.get("interface_id")
+                    if not collection_id or not interface_id:
+                        continue
+                    keep.add((collection_id, interface_id))
+                    self._write_testcase(conn, collection_id, interface_id, testcase)
+                
+                existing = conn.execute("SELECT collection_id, interface_id FROM testcases").fetchall()
+                removed = [(r["collection_id"], r["interface_id"]) for r in existing
+                           if (r["collection_id"], r["interface_id"]) not in keep]
+                if removed:
+                    conn.executemany("DELETE FROM testcases WHERE collection_id = ? AND interface_id = ?", removed)
+            
+            logger.info(f"成功保存 {len(testcases)} 个接口的测试用例到数据库")
+            self._notify(TESTCASE)
+            return True
+        except Exception as e:
+            logger.error(f"保存测试用例失败: {e}")
+            return False
+    
+    def save_testcase(self, collection_id: str, interface_id: str, yaml_content: str = None, json_content: str = None, workflow_id: str = None) -> bool:
+        """
+        保存测试用例
+        
+        Args:
+            collection_id: 集合ID
+            interface_id: 接口ID
+            yaml_content: YAML内容（可选）
+            json_content: JSON内容（可选）
+            workflow_id: 工作流ID（可选）
+        
+        Returns:
+            保存是否成功
+        """
+        try:
+            conn = self._get_conn()
+            with conn:
+                self._write_testcase(conn, collection_id, interface_id,
+                                     new_testcase_record(collection_id, interface_id, yaml_content, json_content, workflow_id))
+            self._notify(TESTCASE, collection_id, [interface_id])
+            return True
+        except Exception as e:
+            logger.error(f"保存测试用例失败: {e}")
+            return False
+    
+    def save_testcase_batch(self, collection_id: str, items: List[Dict[str, Any]]) -> bool:
+        """
+        批量保存同一集合的测试用例（在一个事务中写入）
+        
+        Args:
+            collection_id: 集合ID
+            items: 测试用例列表，每项包含 interface_id，以及可选的 yaml_content、json_content、workflow_id
+        
+        Returns:
+            保存是否成功
+        """
+        try:
+            conn = self._get_conn()
+            with conn:
+                for item in items:
+                    self._write_testcase(conn, collection_id, item["interface_id"], new_testcase_record(
+                        collection_id, item["interface_id"], item.get("yaml_content"), item.get("json_content"), item.get("workflow_id")
+                    ))
+            self._notify(TESTCASE, collection_id, [item["interface_id"] for item in items])
+            return True
+        except Exception as e:
+            logger.error(f"批量保存测试用例失败: {e}")
+            return False
+    
+    def get_testcase(self, collection_id: str, interface_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取测试用例
+        
+        Args:
+            collection_id: 集合ID
+            interface_id: 接口ID
+        
+        Returns:
+            测试用例数据，如果不存在返回None
+        """
+        return self._read_testcase(self._get_conn(), collection_id, interface_id)
+    
+    def has_testcase(self, collection_id: str, interface_id: str) -> bool:
+        """
+        检查是否存在测试用例
+        
+        Args:
+            collection_id: 集合ID
+            interface_id: 接口ID
+        
+        Returns:
+            是否存在测试用例
+        """
+        row = self._get_conn().execute(
+            "SELECT 1 FROM testcases WHERE collection_id = ? AND interface_id = ?",
+            (collection_id, interface_id)
+        ).fetchone()
+        return row is not None
+    
+    def get_testcase_statuses(self, collection_id: str, interface_ids) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取接口的测试用例状态（按批查询，不读取用例内容）
+        
+        Args:
+            collection_id: 集合ID
+            interface_ids: 接口ID列表
+        
+        Returns:
+            接口ID -> 状态字典（has_testcase、has_python_script、testcase_count、updated_at、python_generated_at）
+        """
+        conn = self._get_conn()
+        interface_ids = list(interface_ids)
+        found = {}
+        # 分批查询，避免超出SQLite的参数个数限制
+        for start in range(0, len(interface_ids), _BATCH_SIZE):
+            batch = interface_ids[start:start + _BATCH_SIZE]
+            rows = conn.execute(
+                f"""
+                SELECT t.interface_id, t.updated_at, p.script_path, p.generated_at,
+                    json_extract(t.data, '$.testcase_count') AS testcase_count,
+                    CASE WHEN json_extract(t.data, '$.testcase_count') IS NULL
+                        THEN json_extract(t.data, '$.json_content') END AS json_content
+                FROM testcases t
+                LEFT JOIN python_scripts p
+                    ON p.collection_id = t.collection_id AND p.interface_id = t.interface_id
+                WHERE t.collection_id = ? AND t.interface_id IN ({",".join("?" * len(batch))})
+                """,
+                [collection_id, *batch]
+            ).fetchall()
+            for row in rows:
+                found[row["interface_id"]] = row
+        
+        statuses = {}
+        for interface_id in interface_ids:
+            row = found.get(interface_id)
+            if row is None:
+                statuses[interface_id] = testcase_status(None)
+                continue
+            has_python_script = bool(row["script_path"]) and os.path.exists(row["script_path"])
+            statuses[interface_id] = testcase_status({
+                "testcase_count": row["testcase_count"],
+                "json_content": row["json_content"],
+                "updated_at": row["updated_at"],
+                "python_generated_at": row["generated_at"]
+            }, has_python_script)
+        return statuses
+    
+    def list_testcases(self, collection_id: str) -> List[str]:
+        """
+        列出集合下有测试用例的接口ID（走主键索引，不读取用例内容）
+        
+        Args:
+            collection_id: 集合ID
+        
+        Returns:
+            接口ID列表
+        """
+        rows = self._get_conn().execute(
+            "SELECT interface_id FROM testcases WHERE collection_id = ? ORDER BY rowid", (collection_id,)
+        )
+        return [row["interface_id"] for row in rows]
+    
+    def iter_testcases(self, collection_id: str) -> Iterator[Dict[str, Any]]:
+        """
+        逐条返回集合下的测试用例记录（游标逐行读取，不一次性加载全部结果）
+        
+        Python脚本内容需通过 get_python_script 读取
+        
+        Args:
+            collection_id: 集合ID
+        
+        Yields:
+            测试用例记录
+        """
+        rows = self._get_conn().execute(
+            """
+            SELECT t.data, p.script_path, p.script_hash, p.script_size, p.workflow_id, p.generated_at
+            FROM testcases t
+            LEFT JOIN python_scripts p
+                ON p.collection_id = t.collection_id AND p.interface_id = t.interface_id
+            WHERE t.collection_id = ?
+            ORDER BY t.rowid
+            """,
+            (collection_id,)
+        )
+        for row in rows:
+            testcase = json.loads(row["data"])
+            if row["script_path"] is not None:
+                testcase.update(self._python_fields(row))
+            yield testcase
+    
+    def delete_testcase(self, collection_id: str, interface_id: str) -> bool:
+        """
+        删除测试用例
+        
+        Args:
+            collection_id: 集合ID
+            interface_id: 接口ID
+        
+        Returns:
+            删除是否成功
+        """
+        conn = self._get_conn()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM testcases WHERE collection_id = ? AND interface_id = ?",
+                (collection_id, interface_id)
+            )
+            if cursor.rowcount == 0:
+                logger.warning(f"测试用例不存在: {collection_id}_{interface_id}")
+                return False
+            # 与 JSONStorage 一致：Python脚本元数据属于测试用例记录，一并删除（脚本文件保留）
+            conn.execute(
+                "DELETE FROM python_scripts WHERE collection_id = ? AND interface_id = ?",
+                (collection_id, interface_id)
+            )
+        self._notify(TESTCASE, collection_id, [interface_id])
+        return True
+    
+    # ------------------------------------------------------------------
+    # Python脚本
+    # ------------------------------------------------------------------
+    
+    def save_python_script(self, collection_id: str, interface_id: str, python_code: str, workflow_id: str = None) -> bool:
+        """
+        保存Python脚本到文件系统（按内容哈希去重），元数据写入 python_scripts 表
+        
+        Args:
+            collection_id: 集合ID
+            interface_id: 接口ID
+            python_code: Python代码内容
+            workflow_id: 工作流ID（可选）
+        
+        Returns:
+            保存是否成功
+        """
+        try:
+            with self.script_store.lock():
+                script = self.script_store.put(python_code)
+            
+                now = datetime.now().isoformat()
+                conn = self._get_conn()
+                with conn:
+                    previous = conn.execute(
+                        "SELECT script_hash, script_path FROM python_scripts WHERE collection_id = ? AND interface_id = ?",
+                        (collection_id, interface_id)
+                    ).fetchone()
+                    conn.execute(
+                        """
+                        INSERT INTO python_scripts
+                            (collection_id, interface_id, script_path, workflow_id, generated_at, code_length, script_hash, script_size)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(collection_id, interface_id) DO UPDATE SET
+                            script_path = excluded.script_path, workflow_id = excluded.workflow_id,
+                            generated_at = excluded.generated_at, code_length = excluded.code_length,
+                            script_hash = excluded.script_hash, script_size = excluded.script_size
+                        """,
+                        (collection_id, interface_id, script["path"], workflow_id, now, len(python_code),
+                         script["hash"], script["size"])
+                    )
+                    # 与 JSONStorage 一致：没有测试用例记录时创建一条空记录
+                    conn.execute(
+                        """
+                        INSERT INTO testcases (collection_id, interface_id, data, created_at, updated_at)
+                        VALUES (?, ?, ?, NULL, ?)
+                        ON CONFLICT(collection_id, interface_id) DO UPDATE SET updated_at = excluded.updated_at
+                        """,
+                        (collection_id, interface_id,
+                         _dumps({"collection_id": collection_id, "interface_id": interface_id, "updated_at": now}), now)
+                    )
+            
+                if previous is not None and previous["script_path"] != script["path"]:
+                    self._release_python_script(previous["script_hash"], previous["script_path"])
+            
+            self._notify(TESTCASE, collection_id, [interface_id])
+            logger.info(f"成功保存Python脚本: {script['path']} (代码长度: {len(python_code)})")
+            return True
+        except Exception as e:
+            logger.error(f"保存Python脚本失败: {e}")
+            return False
+    
+    def _release_python_script(self, script_hash: Optional[str], script_path: Optional[str]):
+        """删除不再被引用的脚本文件（调用方需持有脚本存储锁）"""
+        if script_hash:
+            row = self._get_conn().execute(
+                "SELECT 1 FROM python_scripts WHERE script_hash = ? LIMIT 1", (script_hash,)
+            ).fetchone()
+            if row is not None:
+                return
+        self.script_store.remove(script_hash, script_path)
+    
+    def get_python_script(self, collection_id: str, interface_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取已保存的Python脚本（按需从文件读取脚本内容）
+        
+        Args:
+            collection_id: 集合ID
+            interface_id: 接口ID
+        
+        Returns:
+            Python脚本信息字典，包含代码、文件路径等信息
+        """
+        conn = self._get_conn()
+        testcase_data = self._read_testcase(conn, collection_id, interface_id)
+        if testcase_data is None or "python_script_path" not in testcase_data:
+            return None
+        
+        python_code = self.script_store.read(testcase_data["python_script_path"])
+        if python_code is None:
+            return None
+        testcase_data["python_code"] = python_code
+        return testcase_data
+    
+    def has_python_script(self, collection_id: str, interface_id: str) -> bool:
+        """
+        检查是否存在已保存的Python脚本
+        
+        Args:
+            collection_id: 集合ID
+            interface_id: 接口ID
+        
+        Returns:
+            是否存在Python脚本
+        """
+        row = self._get_conn().execute(
+            "SELECT script_path FROM python_scripts WHERE collection_id = ? AND interface_id = ?",
+            (collection_id, interface_id)
+        ).fetchone()
+        return row is not None and os.path.exists(row["script_path"])
+    
+    def delete_python_script(self, collection_id: str, interface_id: str) -> bool:
+        """
+        删除Python脚本（脚本内容不再被其他接口引用时删除文件）
+        
+        Args:
+            collection_id: 集合ID
+            interface_id: 接口ID
+        
+        Returns:
+            删除是否成功
+        """
+        try:
+            conn = self._get_conn()
+            if not self.has_testcase(collection_id, interface_id):
+                return False
+            
+            with self.script_store.lock():
+                with conn:
+                    row = conn.execute(
+                        "SELECT script_hash, script_path FROM python_scripts WHERE collection_id = ? AND interface_id = ?",
+                        (collection_id, interface_id)
+                    ).fetchone()
+                    conn.execute(
+                        "DELETE FROM python_scripts WHERE collection_id = ? AND interface_id = ?",
+                        (collection_id, interface_id)
+                    )
+                if row is not None:
+                    self._release_python_script(row["script_hash"], row["script_path"])
+            self._notify(TESTCASE, collection_id, [interface_id])
+            return True
+        except Exception as e:
+            logger.error(f"删除Python脚本失败: {e}")
+            return False
+    
+    # ------------------------------------------------------------------
+    # 孤立数据清理
+    # ------------------------------------------------------------------
+    
+    def collect_garbage(self, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        清理孤立数据：集合或接口已删除的测试用例和Python脚本记录，以及没有被任何记录引用的Python脚本文件
+        
+        释放的字节数按被删除的测试用例和Python脚本记录的数据长度、被删除的脚本文件大小统计，
+        数据库文件本身不收缩（空间由后续写入复用）
+        
+        Args:
+            dry_run: 为True时只统计不删除
+        
+        Returns:
+            清理结果 {"testcases", "python_scripts", "blobs", "temp_files", "bytes_freed", "dry_run"}
+        """
+        report = {"testcases": 0, "python_scripts": 0, "blobs": 0, "temp_files": 0, "bytes_freed": 0, "dry_run": dry_run}
+        orphan = ("NOT EXISTS (SELECT 1 FROM interfaces i WHERE i.collection_id = {table}.collection_id "
+                  "AND i.interface_id = {table}.interface_id)")
+        
+        conn = self._get_conn()
+        # 持有脚本存储锁，保证统计引用与删除脚本文件之间不会有新脚本保存
+        with self.script_store.lock():
+            with conn:
+                row = conn.execute(
+                    f"SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM testcases WHERE {orphan.format(table='testcases')}"
+                ).fetchone()
+                report["testcases"] = row[0]
+                report["bytes_freed"] += row[1]
+                # Python脚本记录（JSON存储中属于测试用例记录，随测试用例分片缩小一并统计）
+                row = conn.execute(
+                    "SELECT COALESCE(SUM(LENGTH(collection_id) + LENGTH(interface_id) + LENGTH(script_path) + "
+                    "COALESCE(LENGTH(workflow_id), 0) + COALESCE(LENGTH(generated_at), 0) + "
+                    f"COALESCE(LENGTH(script_hash), 0)), 0) FROM python_scripts WHERE {orphan.format(table='python_scripts')}"
+                ).fetchone()
+                report["bytes_freed"] += row[0]
+                if not dry_run:
+                    conn.execute(f"DELETE FROM testcases WHERE {orphan.format(table='testcases')}")
+                    conn.execute(f"DELETE FROM python_scripts WHERE {orphan.format(table='python_scripts')}")
+            
+            # 预演时孤立记录尚未删除，不计入引用
+            rows = conn.execute(
+                "SELECT script_hash, script_path FROM python_scripts" +
+                (f" WHERE NOT {orphan.format(table='python_scripts')}" if dry_run else "")
+            ).fetchall()
+            swept = self.script_store.sweep(
+                {row["script_hash"] for row in rows if row["script_hash"]},
+                {row["script_path"] for row in rows}, dry_run
+            )
+            report["python_scripts"] = swept["files"]
+            report["bytes_freed"] += swept["bytes"]
+        
+        if report["testcases"] and not dry_run:
+            self._notify(TESTCASE)
+        logger.info(f"孤立数据清理完成: {report}")
+        return report
+
+
+def migrate_from_json(source, target: SQLiteStorage) -> Dict[str, int]:
+    """
+    一次性将 JSONStorage 中的集合和测试用例迁移到 SQLiteStorage
+    
+    Args:
+        source: JSONDataReader（只读，不修改JSON数据目录）或 JSONStorage 实例
+        target: SQLiteStorage 实例
+    
+    Returns:
+        迁移数量统计 {"collections": n, "interfaces": n, "testcases": n, "python_scripts": n}
+    """
+    collections = source.load_collections()
+    testcases = source.load_testcases()
+    stats = {"collections": 0, "interfaces": 0, "testcases": 0, "python_scripts": 0}
+    
+    conn = target._get_conn()
+    with conn:
+        for collection_id, collection_data in collections.items():
+            # 旧版单文件中的集合内嵌了原始文档
+            raw_doc = source.get_raw_doc(collection_id) if "raw_doc" not in collection_data else None
+            if raw_doc is not None:
+                collection_data = dict(collection_data, raw_doc=raw_doc)
+            target._write_collection(conn, collection_id, collection_data)
+            stats["collections"] += 1
+            stats["interfaces"] += len(collection_data.get("interfaces", []))
+        
+        for testcase_key, testcase in testcases.items():
+            collection_id = testcase.get("collection_id")
+            interface_id = testcase.get("interface_id")
+            if not collection_id or not interface_id:
+                logger.warning(f"跳过缺少 collection_id/interface_id 的测试用例: {testcase_key}")
+                continue
+            target._write_testcase(conn, collection_id, interface_id, testcase)
+            stats["testcases"] += 1
+            
+            script = {
+                "path": testcase.get("python_script_path"),
+                "hash": testcase.get("python_script_hash"),
+                "size": testcase.get("python_script_size")
+            }
+            if "python_code" in testcase:
+                # 旧版记录内嵌脚本内容，写入脚本存储
+                with target.script_store.lock():
+                    script = target.script_store.put(testcase["python_code"])
+            if script["path"]:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO python_scripts
+                        (collection_id, interface_id, script_path, workflow_id, generated_at, code_length, script_hash, script_size)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (collection_id, interface_id, script["path"], testcase.get("python_workflow_id"),
+                     testcase.get("python_generated_at"),
+                     len(testcase["python_code"]) if "python_code" in testcase else None,
+                     script["hash"], script["size"])
+                )
+                stats["python_scripts"] += 1
+    
+    logger.info(f"JSON数据迁移到SQLite完成: {stats}")
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+    from app.storage import JSONDataReader
+    
+    arg_parser = argparse.ArgumentParser(description="将JSON数据目录中的集合和测试用例迁移到SQLite数据库")
+    arg_parser.add_argument("--data-dir", default="data", help="JSON数据目录（默认: data）")
+    arg_parser.add_argument("--db", default=None, help="SQLite数据库路径（默认: <data-dir>/storage.db）")
+    args = arg_parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    db_path = args.db or os.path.join(args.data_dir, "storage.db")
+    result = migrate_from_json(JSONDataReader(args.data_dir), SQLiteStorage(db_path, storage_dir=args.data_dir))
+    print(f"迁移完成: {result}")
@@ -14,6 +14,14 @@ let activeGenerations = 0; // 当前活跃的生成任务数
 const MAX_CONCURRENT_GENERATIONS = 5; // 最大并发数
 const MAX_RETRY_TIMES = 3; // 最大重试次数
 const GENERATION_TIMEOUT = 120000; // 生成超时时间（120秒）
+const GENERATION_POLL_INTERVAL = 1500; // 查询生成任务状态的间隔（毫秒）
+const INTERFACE_PAGE_SIZE = 200; // 接口列表每页数量，滚动到底部时加载下一页
+const INTERFACE_LIST_FIELDS = 'method,path,summary,tags,deprecated'; // 接口列表需要的字段（不含较长的描述）
+const COLLECTION_LIST_FIELDS = 'title,version,interface_count,module_count'; // 集合列表需要的字段
+let interfacesCursor = null; // 接口列表下一页的游标，为null表示已全部加载
+let interfacesPagePromise = null; // 正在加载的下一页请求
+let interfacesPageObserver = null; // 监听列表底部的加载标记
+let filterSequence = 0; // 搜索请求序号，用于丢弃过期的搜索结果
 
 // DOM元素
 const homeSection = document.getElementById('homeSection');
@@ -158,7 +166,7 @@ function showResultSection() {
 // 加载所有集合列表
 async function loadCollections() {
     try {
-        const response = await fetch('/api/collections');
+        const response = await fetch(`/api/collections?fields=${COLLECTION_LIST_FIELDS}`);
         const data = await response.json();
 
         if (response.ok) {
@@ -212,63 +220,9 @@ function displayCollections(collections) {
     `).join('');
 }
 
-// 处理集合卡片点击事件 - 预加载测试用例状态
+// 处理集合卡片点击事件
+// 接口列表分页加载，每页渲染后批量查询该页接口的测试用例状态，无需预先加载整个集合
 async function handleCollectionClick(collectionId) {
-    console.log(`🔍 预加载集合 ${collectionId} 的测试用例状态...`);
-    
-    try {
-        // 先获取该集合的所有接口
-        const interfacesResponse = await fetch(`/api/collection/${collectionId}/interfaces`);
-        if (!interfacesResponse.ok) {
-            console.error('获取接口列表失败');
-            return;
-        }
-        
-        const interfacesData = await interfacesResponse.json();
-        const interfaces = interfacesData.interfaces || [];
-        
-        if (interfaces.length === 0) {
-            console.log('该集合没有接口');
-            viewCollection(collectionId);
-            return;
-        }
-        
-        // 提取所有接口ID
-        const interfaceIds = interfaces.map(iface => iface.interface_id);
-        
-        console.log(`📋 找到 ${interfaceIds.length} 个接口，开始批量查询测试用例状态...`);
-        
-        // 批量查询测试用例状态
-        const statusResponse = await fetch('/api/batch-testcase-status', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                collection_id: collectionId,
-                interface_ids: interfaceIds
-            })
-        });
-        
-        if (statusResponse.ok) {
-            const statusData = await statusResponse.json();
-            console.log(`✅ 成功预加载 ${statusData.has_testcase_count}/${statusData.total_count} 个测试用例状态`);
-            
-            // 将状态缓存到全局变量
-            if (statusData.status_map) {
-                Object.entries(statusData.status_map).forEach(([interfaceId, hasTestcase]) => {
-                    const cacheKey = `${collectionId}_${interfaceId}`;
-                    testcaseStatusCache.set(cacheKey, hasTestcase);
-                });
-            }
-        } else {
-            console.warn('批量查询测试用例状态失败');
-        }
-    } catch (error) {
-        console.error('预加载测试用例状态出错:', error);
-    }
-    
-    // 无论预加载是否成功，都继续查看集合
     viewCollection(collectionId);
 }
 
@@ -356,11 +310,13 @@ async function uploadFile() {
 
 async function loadInterfaces(collectionId) {
     try {
-        const response = await fetch(`/api/collection/${collectionId}/interfaces`);
+        const response = await fetch(`/api/collection/${collectionId}/interfaces?limit=${INTERFACE_PAGE_SIZE}&fields=${INTERFACE_LIST_FIELDS}`);
         const data = await response.json();
 
         if (response.ok) {
             allInterfaces = data.interfaces;
+            interfacesCursor = data.next_cursor || null;
+            interfacesPagePromise = null;
             displayCollectionInfo();
             displayInterfaces(allInterfaces);
             
@@ -377,6 +333,83 @@ async function loadInterfaces(collectionId) {
     }
 }
 
+// 加载接口列表的下一页，列表模式且未在搜索时直接追加到列表末尾
+async function loadMoreInterfaces() {
+    if (!interfacesCursor) return;
+    if (interfacesPagePromise) return interfacesPagePromise;
+    
+    const collectionId = currentCollection.collection_id;
+    interfacesPagePromise = (async () => {
+        const response = await fetch(`/api/collection/${collectionId}/interfaces?limit=${INTERFACE_PAGE_SIZE}&fields=${INTERFACE_LIST_FIELDS}&cursor=${encodeURIComponent(interfacesCursor)}`);
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error);
+        }
+        // 加载期间已切换到其他集合
+        if (!currentCollection || currentCollection.collection_id !== collectionId) return;
+        
+        const page = data.interfaces || [];
+        allInterfaces = allInterfaces.concat(page);
+        interfacesCursor = data.next_cursor || null;
+        
+        const sentinel = document.getElementById('interfacesSentinel');
+        if (sentinel) {
+            sentinel.insertAdjacentHTML('beforebegin', displayInterfacesList(page));
+            if (!interfacesCursor) {
+                stopObservingInterfacePages();
+            }
+            await batchCheckTestcaseStatus(page.map(iface => iface.interface_id));
+        }
+    })();
+    
+    try {
+        await interfacesPagePromise;
+    } catch (error) {
+        showError(`❌ 加载接口失败: ${error.message}`);
+    } finally {
+        interfacesPagePromise = null;
+    }
+}
+
+// 加载剩余的全部接口（模块分组、搜索、自动生成需要完整的接口列表）
+async function loadAllInterfaces() {
+    while (interfacesCursor) {
+        const cursor = interfacesCursor;
+        await loadMoreInterfaces();
+        // 加载失败时游标不变，避免无限重试
+        if (interfacesCursor === cursor) break;
+    }
+}
+
+// 监听列表底部的加载标记，滚动到底部时加载下一页
+function observeInterfacePages() {
+    stopObservingInterfacePages();
+    const sentinel = document.getElementById('interfacesSentinel');
+    if (!sentinel) return;
+    
+    if (!('IntersectionObserver' in window)) {
+        loadAllInterfaces();
+        return;
+    }
+    interfacesPageObserver = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) {
+            loadMoreInterfaces();
+        }
+    }, { rootMargin: '400px' });
+    interfacesPageObserver.observe(sentinel);
+}
+
+function stopObservingInterfacePages() {
+    if (interfacesPageObserver) {
+        interfacesPageObserver.disconnect();
+        interfacesPageObserver = null;
+    }
+    const sentinel = document.getElementById('interfacesSentinel');
+    if (sentinel && !interfacesCursor) {
+        sentinel.remove();
+    }
+}
+
 function displayCollectionInfo() {
     // 更新页面标题为集合名称
     const collectionTitleElement = document.getElementById('collectionTitle');
@@ -384,23 +417,8 @@ function displayCollectionInfo() {
         collectionTitleElement.textContent = `📋 ${currentCollection.title}`;
     }
     
-    // 计算模块数量（从接口的tags中提取唯一模块）
-    const modules = new Set();
-    allInterfaces.forEach(iface => {
-        if (iface.tags && iface.tags.length > 0) {
-            iface.tags.forEach(tag => modules.add(tag));
-        }
-    });
-    const moduleCount = modules.size;
-    
-    // 计算已有测试用例数量
-    let testcaseCount = 0;
-    allInterfaces.forEach(iface => {
-        const cacheKey = `${currentCollection.collection_id}_${iface.interface_id}`;
-        if (testcaseStatusCache.get(cacheKey)) {
-            testcaseCount++;
-        }
-    });
+    // 模块数量取自集合概要（接口列表分页加载，可能尚未加载完整）
+    const moduleCount = currentCollection.module_count || 0;
 
     collectionInfo.innerHTML = `
         <div class="info-grid">
@@ -422,14 +440,14 @@ function displayCollectionInfo() {
             </div>
             <div class="info-item">
                 <div class="info-label">已有测试用例数</div>
-                <div class="info-value" id="testcaseCountValue">${testcaseCount}</div>
+                <div class="info-value" id="testcaseCountValue">-</div>
             </div>
         </div>
     `;
 }
 
 // 切换显示模式
-function toggleDisplayMode(mode) {
+async function toggleDisplayMode(mode) {
     displayMode = mode;
     
     // 更新按钮状态
@@ -446,7 +464,10 @@ function toggleDisplayMode(mode) {
         }
     }
     
-    // 重新显示接口列表
+    // 重新显示接口列表（模块分组需要完整的接口列表）
+    if (mode === 'module') {
+        await loadAllInterfaces();
+    }
     displayInterfaces(allInterfaces);
 }
 
@@ -507,7 +528,18 @@ async function displayInterfaces(interfaces) {
         interfacesHTML = displayInterfacesList(interfaces);
     }
 
-    interfacesList.innerHTML = batchToolbar + interfacesHTML;
+    // 列表模式下显示完整列表且还有未加载的接口时，在末尾放置加载标记
+    const hasMorePages = displayMode === 'list' && interfaces === allInterfaces && interfacesCursor;
+    const sentinelHTML = hasMorePages
+        ? '<div id="interfacesSentinel" class="interfaces-sentinel" style="text-align: center; color: #999; padding: 10px;">加载更多接口...</div>'
+        : '';
+
+    interfacesList.innerHTML = batchToolbar + interfacesHTML + sentinelHTML;
+    if (hasMorePages) {
+        observeInterfacePages();
+    } else {
+        stopObservingInterfacePages();
+    }
     
     // 优化：批量检查所有接口的测试用例状态，而不是逐个请求
     await batchCheckTestcaseStatus(interfaces.map(iface => iface.interface_id));
@@ -962,7 +994,97 @@ function renderInterfaceDetails(iface) {
     return html;
 }
 
-async function generateTestCases(interfaceId) {
+// 提交测试用例生成任务并等待结束，返回与生成结果相同结构的数据：
+// { success, json_content, original_content, workflow_id, saved } 或 { success: false, error }
+// refresh 为 true 时忽略服务端缓存的生成结果
+async function runGenerationJob(collectionId, interfaceId, refresh = false) {
+    const response = await fetch(`/api/generate-json/${collectionId}/${interfaceId}${refresh ? '?refresh=true' : ''}`, {
+        method: 'POST'
+    });
+    const data = await response.json();
+    if (!response.ok) {
+        return { success: false, error: data.error || '提交生成任务失败' };
+    }
+    
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, GENERATION_POLL_INTERVAL));
+        const statusResponse = await fetch(`/api/generation-jobs/${data.job_id}`);
+        const statusData = await statusResponse.json();
+        if (!statusResponse.ok) {
+            return { success: false, error: statusData.error || '查询生成任务失败' };
+        }
+        
+        const job = statusData.job;
+        if (job.status === 'succeeded') {
+            return { success: true, ...job.result };
+        }
+        if (job.status === 'failed') {
+            return { success: false, error: job.error };
+        }
+    }
+}
+
+// 以流式方式（SSE）生成测试用例，每收到一个事件调用 onEvent(name, data)，
+// 返回与 runGenerationJob 相同结构的数据；浏览器不支持读取响应流时退回到后台任务方式
+async function streamGeneration(collectionId, interfaceId, onEvent, refresh = false) {
+    const response = await fetch(`/api/generate-json-stream/${collectionId}/${interfaceId}${refresh ? '?refresh=true' : ''}`, {
+        method: 'POST',
+        headers: { 'Accept': 'text/event-stream' }
+    });
+    if (!response.ok) {
+        const data = await response.json().catch(() => ({}));
+        return { success: false, error: data.error || '生成请求失败' };
+    }
+    if (!response.body || typeof TextDecoder === 'undefined') {
+        return runGenerationJob(collectionId, interfaceId, refresh);
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder('utf-8');
+    let buffer = '';
+    let result = null;
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+        
+        // 事件之间以空行分隔
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let name = 'message';
+            const dataLines = [];
+            block.split('\n').forEach(line => {
+                if (line.startsWith('event:')) {
+                    name = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    dataLines.push(line.slice(5).trimStart());
+                }
+            });
+            if (dataLines.length === 0) {
+                continue;
+            }
+            
+            const data = JSON.parse(dataLines.join('\n'));
+            if (onEvent) {
+                onEvent(name, data);
+            }
+            if (name === 'done' || name === 'error') {
+                result = data;
+            }
+        }
+        
+        if (done) {
+            break;
+        }
+    }
+    
+    return result || { success: false, error: '生成过程中连接中断' };
+}
+
+async function generateTestCases(interfaceId, refresh = false) {
     // 防止重复点击
     const generateBtn = document.querySelector(`#actions-${interfaceId} .btn-primary`);
     if (generateBtn && generateBtn.disabled) {
@@ -976,13 +1098,16 @@ async function generateTestCases(interfaceId) {
     showLoading('正在生成测试用例...');
 
     try {
-        const response = await fetch(`/api/generate-json/${currentCollection.collection_id}/${interfaceId}`, {
-            method: 'POST'
-        });
-
-        const data = await response.json();
+        let receivedCount = 0;
+        const data = await streamGeneration(currentCollection.collection_id, interfaceId, (event) => {
+            // 每收到一个完整的测试用例就更新进度提示
+            if (event === 'testcase') {
+                receivedCount += 1;
+                showLoading(`正在生成测试用例... 已生成 ${receivedCount} 个`);
+            }
+        }, refresh);
 
-        if (response.ok) {
+        if (data.success) {
             // 清除该接口的缓存
             clearTestcaseStatusCache(interfaceId);
             
@@ -1032,9 +1157,24 @@ function clearTestcaseStatusCache(interfaceId = null) {
 }
 
 // 更新已有测试用例数量显示
-function updateTestcaseCount() {
+async function updateTestcaseCount() {
     if (!currentCollection || !allInterfaces) return;
     
+    if (interfacesCursor) {
+        // 接口尚未全部加载，从服务端的筛选计数中获取
+        try {
+            const response = await fetch(`/api/collection/${currentCollection.collection_id}/interfaces?facets=true&limit=1&fields=method`);
+            const data = await response.json();
+            const testcaseCountElement = document.getElementById('testcaseCountValue');
+            if (response.ok && testcaseCountElement) {
+                testcaseCountElement.textContent = data.facets.has_testcase.true || 0;
+            }
+        } catch (error) {
+            console.error('获取测试用例数量失败:', error);
+        }
+        return;
+    }
+    
     // 计算已有测试用例数量
     let testcaseCount = 0;
     allInterfaces.forEach(iface => {
@@ -1259,7 +1399,7 @@ async function regenerateYAML(interfaceId) {
         return;
     }
     closeModal();
-    await generateTestCases(interfaceId);
+    await generateTestCases(interfaceId, true);
 }
 
 function saveYAML() {
@@ -1300,14 +1440,14 @@ async function downloadYAML() {
     }
 }
 
-async function generatePythonFromYAML() {
+async function generatePythonFromYAML(refresh = false) {
     const editor = document.getElementById('yamlEditor');
     const yamlContent = editor.value;
 
     showLoading('正在生成Python脚本...');
 
     try {
-        const response = await fetch('/api/generate-python', {
+        const response = await fetch(`/api/generate-python${refresh ? '?refresh=true' : ''}`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -1372,7 +1512,7 @@ async function regeneratePython() {
         return;
     }
     closeModal();
-    await generatePythonFromYAML();
+    await generatePythonFromYAML(true);
 }
 
 function savePython() {
@@ -1499,14 +1639,20 @@ async function saveInterfaceChanges(interfaceId) {
     // 确保保留原ID
     updatedInterface.id = interfaceId;
 
+    // 带上打开编辑器时的接口版本号，期间接口被他人修改时服务端返回412，避免覆盖对方的修改
+    const headers = {
+        'Content-Type': 'application/json'
+    };
+    if (currentInterface && currentInterface.id === interfaceId) {
+        headers['If-Match'] = `"${currentInterface._version || 1}"`;
+    }
+
     showLoading('正在保存...');
 
     try {
         const response = await fetch(`/api/interface/${currentCollection.collection_id}/${interfaceId}`, {
             method: 'PUT',
-            headers: {
-                'Content-Type': 'application/json'
-            },
+            headers: headers,
             body: JSON.stringify({
                 interface: updatedInterface
             })
@@ -1527,6 +1673,8 @@ async function saveInterfaceChanges(interfaceId) {
             
             // 刷新接口列表
             await loadInterfaces(currentCollection.collection_id);
+        } else if (response.status === 412) {
+            showError(`❌ 保存失败: ${data.error}（当前版本: ${data.current_version}）`);
         } else {
             showError(`❌ 保存失败: ${data.error}`);
         }
@@ -1537,12 +1685,17 @@ async function saveInterfaceChanges(interfaceId) {
     }
 }
 
-function filterInterfaces(keyword) {
+async function filterInterfaces(keyword) {
+    const sequence = ++filterSequence;
     if (!keyword.trim()) {
         displayInterfaces(allInterfaces);
         return;
     }
 
+    // 搜索需要完整的接口列表
+    await loadAllInterfaces();
+    if (sequence !== filterSequence) return;
+
     const lowerKeyword = keyword.toLowerCase();
     
     // 检查是否是特殊筛选关键词
@@ -1560,8 +1713,24 @@ function filterInterfaces(keyword) {
         return;
     }
 
+    // 描述不在列表字段中，通过搜索接口匹配
+    const matchedIds = new Set();
+    try {
+        const response = await fetch(`/api/search?q=${encodeURIComponent(keyword)}&collection_id=${currentCollection.collection_id}&limit=500`);
+        const data = await response.json();
+        if (response.ok) {
+            (data.results || []).forEach(result => matchedIds.add(result.interface_id));
+        }
+    } catch (error) {
+        console.error('搜索接口失败:', error);
+    }
+    if (sequence !== filterSequence) return;
+
     // 普通搜索：支持路径、名称、描述、标签、接口ID、模块名称
     const filtered = allInterfaces.filter(iface => {
+        if (matchedIds.has(iface.interface_id)) {
+            return true;
+        }
         // 构建搜索文本，包含所有可搜索字段
         const searchFields = [
             iface.path || '',
@@ -1751,22 +1920,12 @@ async function generateTestCasesForInterface(interfaceId) {
     }
     
     try {
-        const url = `/api/generate-json/${currentCollection.collection_id}/${interfaceId}`;
-        console.log(`[批量生成] 请求URL: ${url}`);
-        
-        const response = await fetch(url, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            }
-        });
+        console.log(`[批量生成] 提交生成任务: ${interfaceId}`);
         
-        console.log(`[批量生成] 接口 ${interfaceId} 响应状态: ${response.status}`);
-        
-        const data = await response.json();
+        const data = await runGenerationJob(currentCollection.collection_id, interfaceId);
         const duration = Date.now() - startTime;
         
-        if (response.ok && data.success) {
+        if (data.success) {
             console.log(`[批量生成] ✅ 接口 ${interfaceId} 生成成功 (耗时: ${duration}ms)`);
             return { success: true, interfaceId, data, duration };
         } else {
@@ -2237,13 +2396,9 @@ async function batchGenerateTestCases() {
         }
         
         try {
-            const response = await fetch(`/api/generate-json/${currentCollection.collection_id}/${interfaceId}`, {
-                method: 'POST'
-            });
+            const data = await runGenerationJob(currentCollection.collection_id, interfaceId);
             
-            const data = await response.json();
-            
-            if (response.ok && data.success) {
+            if (data.success) {
                 successCount++;
                 // 清除该接口的缓存
                 clearTestcaseStatusCache(interfaceId);
@@ -2569,6 +2724,9 @@ async function startAutoGeneration(manualTrigger = false) {
         return;
     }
     
+    // 自动生成需要完整的接口列表
+    await loadAllInterfaces();
+    
     if (!allInterfaces || allInterfaces.length === 0) {
         showError('❌ 没有可生成的接口');
         return;
@@ -2647,9 +2805,7 @@ async function generateTestCaseWithRetry(task) {
         });
         
         // 创建生成Promise
-        const generatePromise = fetch(`/api/generate-json/${currentCollection.collection_id}/${interfaceId}`, {
-            method: 'POST'
-        }).then(response => response.json());
+        const generatePromise = runGenerationJob(currentCollection.collection_id, interfaceId);
         
         // 竞速：哪个先完成就用哪个
         const data = await Promise.race([generatePromise, timeoutPromise]);
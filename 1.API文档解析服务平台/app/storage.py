@@ -1,89 +1,742 @@
 """
 数据持久化存储模块
 使用JSON文件存储解析的API文档数据，确保服务重启后数据不丢失
+
+存储布局（按集合分片）:
+    data/collections/_manifest.json   集合清单（标题、版本、base_url、接口数等概要）
+    data/collections/<collection_id>.json   单个集合的接口等常用数据
+    data/blobs/<collection_id>.json.gz      原始文档等很少读取的大字段（gzip压缩，按需加载）
+    data/testcases/<collection_id>.json     单个集合下所有接口的测试用例
+    data/testcases/<collection_id>.journal  测试用例修改日志（仅日志模式，每行一条追加记录，超过阈值后压缩进快照）
+    data/python_scripts/objects/<sha256>.py 生成的Python脚本（按内容去重）
+
+读取集合列表只需解析清单，读取单个集合或其测试用例只需解析对应分片
+
+数据文件的落盘格式（缩进JSON / 紧凑JSON / MessagePack）由 storage_format 决定，读取时自动识别，见 app.codec
 """
-import json
+import atexit
+import gzip
 import os
+import re
+import tempfile
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Iterator
 import logging
 
+from app import codec
+from app.collection_summary import build_summary, update_summary, testcase_status, new_testcase_record
+from app.file_lock import FileLock
+from app.script_store import ScriptStore
+from app.storage_events import ChangeNotifier, COLLECTION, INTERFACE, TESTCASE
+from app.versioning import check_version, bump_version, stamp_interface_versions
+
 logger = logging.getLogger(__name__)
 
-class JSONStorage:
+# 集合ID会作为分片文件名，只允许安全字符，防止路径穿越
+_SAFE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
+
+# 各数据段写入文件时 _metadata 中的计数字段
+_COUNT_FIELDS = {
+    "collections": ("collection_count", len),
+    "collection": ("interface_count", lambda c: len(c.get("interfaces", []))),
+    "testcases": ("testcase_count", len),
+}
+
+# 测试用例记录中的Python脚本字段
+_PYTHON_FIELDS = ("python_code", "python_script_path", "python_script_hash", "python_script_size",
+                  "python_workflow_id", "python_generated_at")
+
+# 冷数据字段：体积大且没有接口在常规请求中读取，单独压缩存放，不进入集合分片和缓存
+_COLD_FIELDS = ("raw_doc",)
+
+class JSONStorage(ChangeNotifier):
     """JSON文件存储管理器"""
     
-    def __init__(self, storage_dir: str = "data"):
+    MANIFEST_FILENAME = "_manifest.json"
+    
+    # 日志模式下测试用例日志超过该大小（字节）时在后台压缩进快照
+    JOURNAL_COMPACT_BYTES = 1024 * 1024
+    
+    # 内存缓存默认上限（字节）
+    CACHE_MAX_BYTES = 256 * 1024 * 1024
+    
+    def __init__(self, storage_dir: str = "data", write_behind_delay: float = 0,
+                 testcase_journal: bool = False, journal_compact_bytes: Optional[int] = None,
+                 storage_format: str = "json", cache_max_bytes: Optional[int] = None):
         """
         初始化存储管理器
         
         Args:
             storage_dir: 存储目录路径
+            write_behind_delay: 延迟写入窗口（秒）。大于0时开启延迟写入模式，
+                窗口内的多次修改合并为一次落盘；为0时每次保存立即写入文件。
+                延迟写入的数据对其他进程不可见，多进程部署时应保持为0
+            testcase_journal: 是否开启测试用例日志模式。开启后单个测试用例/Python脚本的修改
+                只向 <collection_id>.journal 追加一条记录，不再重写整个测试用例分片；
+                日志超过 journal_compact_bytes 后由后台线程压缩为新的快照。测试用例不参与延迟写入
+            journal_compact_bytes: 触发日志压缩的大小（字节），默认 JOURNAL_COMPACT_BYTES
+            storage_format: 数据文件的落盘格式：json（缩进，默认）、compact（紧凑JSON）或 msgpack，
+                读取时自动识别，已有文件在下次保存时转换为新格式
+            cache_max_bytes: 内存缓存上限（字节，按数据文件大小估算），超出时淘汰最久未使用的数据，
+                默认 CACHE_MAX_BYTES，为0时不限制
+        
+        Raises:
+            ValueError: 落盘格式不支持或缺少对应的依赖
         """
+        codec.check_format(storage_format)
+        self.storage_format = storage_format
         self.storage_dir = storage_dir
+        self.collections_dir = os.path.join(storage_dir, "collections")
+        self.testcases_dir = os.path.join(storage_dir, "testcases")
+        self.blobs_dir = os.path.join(storage_dir, "blobs")
+        self.script_store = ScriptStore(os.path.join(storage_dir, "python_scripts"))
+        self.manifest_file = os.path.join(self.collections_dir, self.MANIFEST_FILENAME)
+        
+        # 旧版单文件布局，启动时自动迁移为分片布局
         self.data_file = os.path.join(storage_dir, "collections.json")
         self.testcases_file = os.path.join(storage_dir, "testcases.json")
-        self._ensure_storage_dir()
         
+        # 内存缓存（LRU）：文件路径 -> {"stamp": (mtime_ns, size), "data": 解码后的数据}
+        # 写入时同步更新，文件的mtime/size变化时（例如被外部修改）自动重新加载；
+        # 占用按数据文件大小估算，超过 cache_max_bytes 时淘汰最久未使用的条目
+        self._cache_lock = threading.RLock()
+        self._file_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.cache_max_bytes = self.CACHE_MAX_BYTES if cache_max_bytes is None else cache_max_bytes
+        self._cache_bytes = 0
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._cache_evictions = 0
+        
+        # 接口索引：集合ID -> (接口列表对象, {接口ID: 列表位置})，接口列表被替换时重建
+        self._interface_indexes: Dict[str, tuple] = {}
+        
+        # 跨进程文件锁（每个分片一把）：读取时加共享锁，读-改-写时加排他锁
+        # 加锁顺序固定为 脚本存储锁 -> 测试用例分片锁 -> 集合分片锁 -> 清单锁 -> 缓存锁，避免死锁
+        self._file_locks: Dict[str, FileLock] = {}
+        self._file_locks_guard = threading.Lock()
+        
+        # 延迟写入：文件路径 -> (数据段名, 待写入数据)
+        self.write_behind_delay = write_behind_delay
+        self._pending_writes: Dict[str, tuple] = {}
+        self._flush_timer: Optional[threading.Timer] = None
+        self._flush_lock = threading.Lock()
+        if write_behind_delay > 0:
+            atexit.register(self.flush)
+        
+        # 测试用例日志：集合ID -> {"snapshot": 快照文件标识, "offset": 已重放的日志字节数, "data": 测试用例}
+        self.testcase_journal = testcase_journal
+        self.journal_compact_bytes = journal_compact_bytes or self.JOURNAL_COMPACT_BYTES
+        self._journal_states: Dict[str, Dict[str, Any]] = {}
+        self._compacting = set()
+        
+        # 数据变更监听器（见 add_listener）
+        self._listeners = []
+        
+        self._ensure_storage_dir()
+        self._migrate_legacy_layout()
+        if not testcase_journal:
+            # 关闭日志模式后，将之前遗留的日志合并进快照，避免修改丢失
+            self._fold_journals()
+    
     def _ensure_storage_dir(self):
         """确保存储目录存在"""
-        if not os.path.exists(self.storage_dir):
-            os.makedirs(self.storage_dir)
-            logger.info(f"创建存储目录: {self.storage_dir}")
+        for directory in (self.storage_dir, self.collections_dir, self.testcases_dir, self.blobs_dir):
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+                logger.info(f"创建存储目录: {directory}")
     
-    def load_collections(self) -> Dict[str, Any]:
+    # ------------------------------------------------------------------
+    # 通用读写：缓存、文件锁、原子写入、延迟写入
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _file_stamp(path: str) -> Optional[tuple]:
+        """获取文件的 (mtime_ns, size) 标识，文件不存在时返回None"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def _get_cached(self, path: str) -> Optional[Any]:
         """
-        从文件加载所有集合数据
+        读取缓存数据，文件标识与缓存一致时命中
+        
+        Args:
+            path: 数据文件路径
         
         Returns:
-            集合数据字典
+            缓存的数据，未命中返回None
         """
-        if not os.path.exists(self.data_file):
-            logger.info("数据文件不存在，返回空字典")
-            return {}
+        with self._cache_lock:
+            pending = self._pending_writes.get(path)
+            if pending is not None:
+                # 尚未落盘的数据以内存为准
+                self._cache_hits += 1
+                return pending[1]
+            entry = self._file_cache.get(path)
+            if entry is not None:
+                if entry["stamp"] == self._file_stamp(path):
+                    self._file_cache.move_to_end(path)
+                    self._cache_hits += 1
+                    return entry["data"]
+                # 文件已被修改，丢弃过期数据
+                self._drop_cached(path)
+            self._cache_misses += 1
+            return None
+    
+    def _set_cached(self, path: str, data: Any, stamp: Optional[tuple] = None):
+        """
+        写入缓存
+        
+        Args:
+            path: 数据文件路径
+            data: 解码后的数据
+            stamp: 文件标识，不传则取当前文件状态
+        """
+        stamp = stamp or self._file_stamp(path)
+        with self._cache_lock:
+            # 替换缓存数据时保留接口索引，接口列表对象变化时索引会自行重建
+            self._drop_cached(path, keep_index=True)
+            # 单个文件超过缓存上限时不缓存
+            if stamp is None or 0 < self.cache_max_bytes < stamp[1]:
+                return
+            self._file_cache[path] = {"stamp": stamp, "data": data}
+            self._cache_bytes += stamp[1]
+            
+            while 0 < self.cache_max_bytes < self._cache_bytes:
+                evicted = next(iter(self._file_cache))
+                self._drop_cached(evicted)
+                self._cache_evictions += 1
+    
+    def _drop_cached(self, path: str, keep_index: bool = False):
+        """
+        从缓存中移除指定文件的数据
+        
+        Args:
+            path: 数据文件路径
+            keep_index: 为False时，集合分片被移除后一并丢弃其接口索引，避免索引继续占用被淘汰的接口列表
+        """
+        with self._cache_lock:
+            entry = self._file_cache.pop(path, None)
+            if entry is None:
+                return
+            self._cache_bytes -= entry["stamp"][1]
+            if not keep_index and os.path.dirname(path) == self.collections_dir:
+                self._interface_indexes.pop(os.path.basename(path)[:-len(".json")], None)
+    
+    def _invalidate_cache(self, path: str):
+        """使指定文件的缓存失效"""
+        self._drop_cached(path)
+    
+    def _atomic_write(self, path: str, content):
+        """
+        原子写入文件：先写入同目录下的临时文件并刷盘，再通过 os.replace 替换目标文件，
+        写入过程中崩溃不会破坏原文件
+        
+        Args:
+            path: 目标文件路径
+            content: 文件内容（str 按UTF-8文本写入，bytes 按二进制写入）
+        """
+        directory = os.path.dirname(path) or "."
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+        try:
+            binary = isinstance(content, bytes)
+            with os.fdopen(fd, 'wb' if binary else 'w', encoding=None if binary else 'utf-8') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp创建的文件权限为0600，沿用原文件的权限
+            mode = os.stat(path).st_mode if os.path.exists(path) else 0o644
+            os.chmod(tmp_path, mode & 0o777)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    def _file_lock(self, path: str) -> FileLock:
+        """获取（必要时创建）数据文件对应的文件锁"""
+        with self._file_locks_guard:
+            lock = self._file_locks.get(path)
+            if lock is None:
+                lock = self._file_locks[path] = FileLock(path)
+            return lock
+    
+    def _exclusive(self, path: str):
+        """
+        获取数据文件的排他锁，用于 加载-修改-保存 的完整过程，
+        锁内加载会通过mtime校验读到其他进程的最新写入
+        
+        Args:
+            path: 数据文件路径
+        """
+        return self._file_lock(path).acquire(exclusive=True)
+    
+    def _load_store(self, path: str, section: str) -> Optional[Any]:
+        """
+        加载数据文件中的数据段（优先使用内存缓存）
+        
+        Args:
+            path: 数据文件路径
+            section: 数据段名
+        
+        Returns:
+            数据段内容，文件不存在或解析失败时返回None
+        """
+        cached = self._get_cached(path)
+        if cached is not None:
+            return cached
+        
+        with self._file_lock(path).acquire(exclusive=False):
+            stamp = self._file_stamp(path)
+            if stamp is None:
+                return None
+            
+            try:
+                with open(path, 'rb') as f:
+                    data = codec.loads(f.read()).get(section)
+            except Exception as e:
+                logger.error(f"加载数据文件失败: {path}: {e}")
+                return None
+            
+            if not isinstance(data, dict):
+                logger.warning(f"未知的数据格式: {path} ({type(data)})")
+                return None
+            
+            self._set_cached(path, data, stamp)
+            return data
+    
+    def _write_store(self, path: str, section: str, data: Dict[str, Any]):
+        """
+        将数据段连同元数据原子写入文件，并写穿缓存
+        
+        Args:
+            path: 数据文件路径
+            section: 数据段名（collections / collection / testcases）
+            data: 数据字典
+        """
+        count_field, count = _COUNT_FIELDS[section]
+        with self._exclusive(path):
+            with self._cache_lock:
+                # 在锁内完成序列化，避免序列化过程中数据被其他线程修改
+                content = codec.dumps({
+                    "_metadata": {
+                        "last_updated": datetime.now().isoformat(),
+                        count_field: count(data)
+                    },
+                    section: data
+                }, self.storage_format)
+            
+            self._atomic_write(path, content)
+            
+            # 写穿缓存，后续读取无需重新解析文件
+            self._set_cached(path, data)
+    
+    def _save_store(self, path: str, section: str, data: Dict[str, Any]) -> bool:
+        """
+        保存数据段：延迟写入模式下只登记待写入数据并安排刷盘，否则立即写入
+        
+        Args:
+            path: 数据文件路径
+            section: 数据段名（collections / collection / testcases）
+            data: 数据字典
+        
+        Returns:
+            保存是否成功
+        """
+        if self.write_behind_delay <= 0:
+            try:
+                self._write_store(path, section, data)
+                return True
+            except Exception as e:
+                # 调用方可能已修改缓存中的对象，保存失败时丢弃缓存，下次从文件重新加载
+                self._invalidate_cache(path)
+                logger.error(f"保存数据文件失败: {path}: {e}")
+                return False
+        
+        with self._cache_lock:
+            self._pending_writes[path] = (section, data)
+            if self._flush_timer is None:
+                # 窗口从第一次修改开始计时，保证数据最迟在一个窗口后落盘
+                self._flush_timer = threading.Timer(self.write_behind_delay, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+        return True
+    
+    def _delete_store(self, path: str):
+        """
+        删除数据文件，同时丢弃其缓存和未落盘的数据
+        
+        Args:
+            path: 数据文件路径
+        """
+        with self._exclusive(path):
+            with self._cache_lock:
+                self._pending_writes.pop(path, None)
+                self._drop_cached(path)
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def flush(self) -> bool:
+        """
+        立即将延迟写入的数据落盘（服务关闭时会自动调用）
+        
+        Returns:
+            是否全部写入成功
+        """
+        with self._flush_lock:
+            with self._cache_lock:
+                # 写入完成前数据仍留在待写入表中，期间的读取和修改都以内存为准
+                pending = dict(self._pending_writes)
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+            
+            success = True
+            for path, entry in pending.items():
+                try:
+                    self._write_store(path, *entry)
+                    logger.info(f"延迟写入完成: {path}")
+                except Exception as e:
+                    success = False
+                    logger.error(f"延迟写入失败: {path}: {e}")
+                    continue
+                with self._cache_lock:
+                    # 写入期间又登记了新数据时保留，等待下次刷盘
+                    if self._pending_writes.get(path) is entry:
+                        del self._pending_writes[path]
+            return success
+    
+    def get_lock_stats(self) -> Dict[str, Any]:
+        """
+        获取文件锁等待时间统计（按目录汇总各分片的锁）
         
+        Returns:
+            目录名 -> 等待时间统计
+        """
+        with self._file_locks_guard:
+            locks = list(self._file_locks.items())
+        
+        grouped: Dict[str, Dict[str, Any]] = {}
+        for path, lock in locks:
+            name = os.path.relpath(os.path.dirname(path), self.storage_dir)
+            stats = lock.get_stats()
+            group = grouped.setdefault(name, {"lock_count": 0, "acquire_count": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0})
+            group["lock_count"] += 1
+            group["acquire_count"] += stats["acquire_count"]
+            group["total_wait_ms"] = round(group["total_wait_ms"] + stats["total_wait_ms"], 3)
+            group["max_wait_ms"] = max(group["max_wait_ms"], stats["max_wait_ms"])
+        
+        for group in grouped.values():
+            group["avg_wait_ms"] = round(group["total_wait_ms"] / group["acquire_count"], 3) if group["acquire_count"] else 0.0
+        return grouped
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+        
+        Returns:
+            包含命中数、未命中数、命中率、缓存条目数、占用字节数（估算）、上限和淘汰次数的字典
+        """
+        with self._cache_lock:
+            total = self._cache_hits + self._cache_misses
+            return {
+                "hits": self._cache_hits,
+                "misses": self._cache_misses,
+                "hit_ratio": round(self._cache_hits / total, 4) if total else 0.0,
+                "entries": len(self._file_cache),
+                "resident_bytes": self._cache_bytes,
+                "max_bytes": self.cache_max_bytes,
+                "evictions": self._cache_evictions,
+                "journal_entries": len(self._journal_states)
+            }
+    
+    # ------------------------------------------------------------------
+    # 分片布局
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _is_valid_id(collection_id: str) -> bool:
+        """检查集合ID是否可以安全地作为文件名"""
+        return bool(collection_id) and bool(_SAFE_ID_PATTERN.match(collection_id))
+    
+    def _collection_path(self, collection_id: str) -> Optional[str]:
+        """集合分片文件路径，ID不合法时返回None"""
+        if not self._is_valid_id(collection_id):
+            return None
+        return os.path.join(self.collections_dir, f"{collection_id}.json")
+    
+    def _testcase_path(self, collection_id: str) -> Optional[str]:
+        """测试用例分片文件路径，ID不合法时返回None"""
+        if not self._is_valid_id(collection_id):
+            return None
+        return os.path.join(self.testcases_dir, f"{collection_id}.json")
+    
+    def _journal_path(self, collection_id: str) -> Optional[str]:
+        """测试用例日志文件路径，ID不合法时返回None"""
+        if not self._is_valid_id(collection_id):
+            return None
+        return os.path.join(self.testcases_dir, f"{collection_id}.journal")
+    
+    @staticmethod
+    def _list_shards(directory: str, suffix: str = ".json"):
+        """列出目录下所有分片对应的集合ID"""
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            name[:-len(suffix)] for name in os.listdir(directory)
+            if name.endswith(suffix) and not name.startswith("_")
+        )
+    
+    def _testcase_shards(self):
+        """列出所有有测试用例数据（快照或日志）的集合ID"""
+        return sorted(set(self._list_shards(self.testcases_dir)) | set(self._list_shards(self.testcases_dir, ".journal")))
+    
+    @staticmethod
+    def _split_testcase_key(testcase_key: str, testcase: Dict[str, Any]) -> tuple:
+        """从测试用例记录（或其键 "{collection_id}_{interface_id}"）中取出集合ID和接口ID"""
+        collection_id = testcase.get("collection_id")
+        interface_id = testcase.get("interface_id")
+        if not collection_id or not interface_id:
+            collection_id, _, interface_id = testcase_key.partition("_")
+        return collection_id, interface_id
+    
+    @staticmethod
+    def _read_legacy_file(path: str, section: str) -> Dict[str, Any]:
+        """读取旧版单文件布局中的数据段"""
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                # 返回collections字段的内容，而不是整个数据结构
-                collections = data.get('collections', {})
-                logger.info(f"成功加载 {len(collections)} 个集合")
-                return collections
+            with open(path, 'rb') as f:
+                data = codec.loads(f.read()).get(section, {})
         except Exception as e:
-            logger.error(f"加载数据文件失败: {e}")
+            logger.error(f"读取旧版数据文件失败: {path}: {e}")
+            return {}
+        if isinstance(data, list):
+            # 数组格式无法直接用于键值存储
+            logger.info(f"检测到数组格式的旧版数据，包含 {len(data)} 条记录，已跳过")
             return {}
+        return data if isinstance(data, dict) else {}
+    
+    def _migrate_legacy_layout(self):
+        """
+        将旧版 collections.json / testcases.json 拆分为分片布局，
+        迁移完成后旧文件重命名为 *.migrated 保留备份
+        """
+        # 多个进程同时启动时只有一个执行迁移；迁移锁独立于清单锁，
+        # 迁移过程中写入分片不会与 分片锁 -> 清单锁 的加锁顺序冲突
+        with self._exclusive(os.path.join(self.storage_dir, "_migration")):
+            if os.path.exists(self.data_file):
+                collections = self._read_legacy_file(self.data_file, "collections")
+                manifest = dict(self.load_manifest())
+                for collection_id, collection_data in collections.items():
+                    path = self._collection_path(collection_id)
+                    if path is None:
+                        logger.warning(f"集合ID不合法，跳过迁移: {collection_id}")
+                        continue
+                    hot, cold = self._split_cold(collection_data)
+                    if cold:
+                        self._write_blob(collection_id, cold)
+                    self._write_store(path, "collection", hot)
+                    manifest[collection_id] = build_summary(hot)
+                self._write_store(self.manifest_file, "collections", manifest)
+                os.replace(self.data_file, self.data_file + ".migrated")
+                logger.info(f"已将 {len(collections)} 个集合迁移为分片存储")
+            elif self._list_shards(self.collections_dir) and self._manifest_outdated():
+                # 清单丢失或缺少统计字段（旧版清单）时根据分片重建
+                manifest = {}
+                for collection_id in self._list_shards(self.collections_dir):
+                    collection_data = self._load_store(self._collection_path(collection_id), "collection")
+                    if collection_data is not None:
+                        manifest[collection_id] = build_summary(collection_data)
+                self._write_store(self.manifest_file, "collections", manifest)
+                logger.info(f"已根据分片重建集合清单: {len(manifest)} 个集合")
+            
+            if os.path.exists(self.testcases_file):
+                testcases = self._read_legacy_file(self.testcases_file, "testcases")
+                by_collection: Dict[str, Dict[str, Any]] = {}
+                for testcase_key, testcase in testcases.items():
+                    collection_id, _ = self._split_testcase_key(testcase_key, testcase)
+                    by_collection.setdefault(collection_id, {})[testcase_key] = testcase
+                    if "python_code" in testcase:
+                        # 旧版记录内嵌脚本内容，移到脚本存储中，旧的按接口保存的脚本文件一并删除
+                        with self.script_store.lock():
+                            script = self.script_store.put(testcase.pop("python_code"))
+                            legacy_path = testcase.get("python_script_path")
+                            if legacy_path and legacy_path != script["path"]:
+                                self.script_store.remove(None, legacy_path)
+                        testcase.update({
+                            "python_script_path": script["path"],
+                            "python_script_hash": script["hash"],
+                            "python_script_size": script["size"]
+                        })
+                for collection_id, shard in by_collection.items():
+                    path = self._testcase_path(collection_id)
+                    if path is None:
+                        logger.warning(f"集合ID不合法，跳过迁移: {collection_id}")
+                        continue
+                    with self._exclusive(path):
+                        merged = dict(self._load_store(path, "testcases") or {})
+                        merged.update(shard)
+                        self._write_store(path, "testcases", merged)
+                os.replace(self.testcases_file, self.testcases_file + ".migrated")
+                logger.info(f"已将 {len(testcases)} 个接口的测试用例迁移为分片存储")
+    
+    def _blob_path(self, collection_id: str) -> Optional[str]:
+        """冷数据文件路径，ID不合法时返回None"""
+        if not self._is_valid_id(collection_id):
+            return None
+        return os.path.join(self.blobs_dir, f"{collection_id}.json.gz")
+    
+    @staticmethod
+    def _split_cold(collection_data: Dict[str, Any]) -> tuple:
+        """
+        拆分集合数据中的常用字段和冷数据字段
+        
+        Args:
+            collection_data: 集合数据（不会被修改）
+        
+        Returns:
+            (常用数据, 冷数据) 二元组，冷数据为空字典表示没有冷数据字段
+        """
+        hot = {k: v for k, v in collection_data.items() if k not in _COLD_FIELDS}
+        cold = {k: collection_data[k] for k in _COLD_FIELDS if k in collection_data}
+        return hot, cold
+    
+    def _write_blob(self, collection_id: str, cold: Dict[str, Any]):
+        """压缩写入集合的冷数据（调用方需持有集合分片的排他锁）"""
+        content = codec.dumps(cold, "msgpack" if self.storage_format == "msgpack" else "compact")
+        self._atomic_write(self._blob_path(collection_id), gzip.compress(content, compresslevel=6))
+    
+    def _save_collection_shard(self, collection_id: str, collection_data: Dict[str, Any]) -> bool:
+        """
+        保存集合：冷数据字段写入压缩文件，其余字段写入集合分片
+        （调用方需持有集合分片的排他锁）
+        
+        Args:
+            collection_id: 集合ID
+            collection_data: 集合数据，不含冷数据字段时保留已有的冷数据
+        
+        Returns:
+            保存是否成功
+        """
+        hot, cold = self._split_cold(collection_data)
+        if cold:
+            try:
+                self._write_blob(collection_id, cold)
+            except Exception as e:
+                logger.error(f"保存集合冷数据失败: {collection_id}: {e}")
+                return False
+        return self._save_store(self._collection_path(collection_id), "collection", hot)
+    
+    def _delete_collection_shard(self, collection_id: str):
+        """删除集合分片及其冷数据文件"""
+        path = self._collection_path(collection_id)
+        with self._exclusive(path):
+            self._delete_store(path)
+            blob_path = self._blob_path(collection_id)
+            if os.path.exists(blob_path):
+                os.remove(blob_path)
+    
+    def _manifest_outdated(self) -> bool:
+        """清单文件不存在，或其中的概要信息缺少统计字段"""
+        if not os.path.exists(self.manifest_file):
+            return True
+        return any("tag_counts" not in summary for summary in self.load_manifest().values())
+    
+    def _update_manifest(self, collection_id: str, summary: Optional[Dict[str, Any]]) -> bool:
+        """
+        更新集合清单中的一条记录
+        
+        Args:
+            collection_id: 集合ID
+            summary: 概要信息，为None时从清单中移除
+        
+        Returns:
+            保存是否成功
+        """
+        with self._exclusive(self.manifest_file):
+            manifest = self.load_manifest()
+            if summary is None:
+                manifest.pop(collection_id, None)
+            else:
+                manifest[collection_id] = summary
+            return self._save_store(self.manifest_file, "collections", manifest)
+    
+    def load_manifest(self) -> Dict[str, Any]:
+        """
+        加载集合清单（集合ID -> 概要信息）
+        
+        注意：返回的字典与缓存共享，不要直接修改
+        
+        Returns:
+            集合清单字典
+        """
+        manifest = self._load_store(self.manifest_file, "collections")
+        return manifest if manifest is not None else {}
+    
+    # ------------------------------------------------------------------
+    # 集合
+    # ------------------------------------------------------------------
+    
+    def load_collections(self) -> Dict[str, Any]:
+        """
+        加载所有集合数据（逐个读取分片，优先使用内存缓存，不包含 raw_doc 等冷数据字段）
+        
+        注意：返回的集合对象与缓存共享，修改后须通过 save_collections 等方法保存
+        
+        Returns:
+            集合数据字典
+        """
+        collections = {}
+        for collection_id in self.load_manifest():
+            collection_data = self.get_collection(collection_id)
+            if collection_data is not None:
+                collections[collection_id] = collection_data
+        logger.info(f"成功加载 {len(collections)} 个集合")
+        return collections
     
     def save_collections(self, collections: Dict[str, Any]) -> bool:
         """
-        保存集合数据到文件
+        保存全部集合数据（原子写入；延迟写入模式下合并到下一次刷盘），
+        不在 collections 中的已有集合分片会被删除
         
         Args:
             collections: 集合数据字典
-            
+        
         Returns:
             保存是否成功
         """
         try:
-            # 添加时间戳和元数据
-            data_to_save = {
-                "_metadata": {
-                    "last_updated": datetime.now().isoformat(),
-                    "collection_count": len(collections)
-                },
-                "collections": collections
-            }
+            success = True
+            manifest = {}
+            for collection_id, collection_data in collections.items():
+                path = self._collection_path(collection_id)
+                if path is None:
+                    logger.warning(f"集合ID不合法，跳过保存: {collection_id}")
+                    continue
+                with self._exclusive(path):
+                    success = self._save_collection_shard(collection_id, collection_data) and success
+                manifest[collection_id] = build_summary(collection_data)
             
-            # 写入文件
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(data_to_save, f, ensure_ascii=False, indent=2)
+            for collection_id in self._list_shards(self.collections_dir):
+                if collection_id not in manifest:
+                    self._delete_collection_shard(collection_id)
             
-            logger.info(f"成功保存 {len(collections)} 个集合到文件")
-            return True
+            with self._exclusive(self.manifest_file):
+                success = self._save_store(self.manifest_file, "collections", manifest) and success
             
+            logger.info(f"成功保存 {len(collections)} 个集合到文件")
+            return success
+        
         except Exception as e:
             logger.error(f"保存数据文件失败: {e}")
             return False
+        finally:
+            self._notify(COLLECTION)
     
     def add_collection(self, collection_data: Dict[str, Any]) -> str:
         """
@@ -91,170 +744,737 @@ class JSONStorage:
         
         Args:
             collection_data: 集合数据
-            
+        
         Returns:
             集合ID
         """
-        collections = self.load_collections()
         collection_id = str(uuid.uuid4())
         
         # 添加创建时间
         collection_data["_created_at"] = datetime.now().isoformat()
         collection_data["_id"] = collection_id
+        collection_data["_version"] = 1
         
-        collections[collection_id] = collection_data
-        
-        if self.save_collections(collections):
-            logger.info(f"成功添加集合: {collection_id}")
-            return collection_id
-        else:
+        path = self._collection_path(collection_id)
+        with self._exclusive(path):
+            saved = self._save_collection_shard(collection_id, collection_data) and \
+                self._update_manifest(collection_id, build_summary(collection_data))
+        if not saved:
             raise Exception("保存集合失败")
+        
+        logger.info(f"成功添加集合: {collection_id}")
+        self._notify(COLLECTION, collection_id)
+        return collection_id
     
     def get_collection(self, collection_id: str) -> Optional[Dict[str, Any]]:
         """
-        获取指定集合
+        获取指定集合（只读取该集合的分片，不包含 raw_doc 等冷数据字段）
         
         Args:
             collection_id: 集合ID
-            
+        
         Returns:
             集合数据，如果不存在返回None
         """
-        collections = self.load_collections()
-        return collections.get(collection_id)
+        path = self._collection_path(collection_id)
+        if path is None:
+            return None
+        return self._load_store(path, "collection")
     
-    def update_collection(self, collection_id: str, collection_data: Dict[str, Any]) -> bool:
+    def get_raw_doc(self, collection_id: str) -> Optional[Dict[str, Any]]:
         """
-        更新集合数据
+        按需读取集合的原始文档（从压缩的冷数据文件中解压，不经过缓存）
+        
+        Args:
+            collection_id: 集合ID
+        
+        Returns:
+            原始文档，集合不存在或没有原始文档时返回None
+        """
+        blob_path = self._blob_path(collection_id)
+        if blob_path is None:
+            return None
+        
+        with self._file_lock(self._collection_path(collection_id)).acquire(exclusive=False):
+            if not os.path.exists(blob_path):
+                return None
+            try:
+                with gzip.open(blob_path, 'rb') as f:
+                    return codec.loads(f.read()).get("raw_doc")
+            except Exception as e:
+                logger.error(f"读取集合冷数据失败: {blob_path}: {e}")
+                return None
+    
+    def update_collection(self, collection_id: str, collection_data: Dict[str, Any],
+                          expected_version: Optional[int] = None) -> bool:
+        """
+        更新集合数据（集合版本号加1，内容有变化的接口版本号加1）
         
         Args:
             collection_id: 集合ID
             collection_data: 新的集合数据
-            
+            expected_version: 期望的集合版本号，为None时不检查
+        
         Returns:
             更新是否成功
+        
+        Raises:
+            VersionConflict: 集合的当前版本与 expected_version 不一致
         """
-        collections = self.load_collections()
+        path = self._collection_path(collection_id)
+        if path is None:
+            logger.warning(f"集合不存在: {collection_id}")
+            return False
+        
+        with self._exclusive(path):
+            existing = self._load_store(path, "collection")
+            
+            if existing is None:
+                logger.warning(f"集合不存在: {collection_id}")
+                return False
+            check_version(existing, expected_version)
+            
+            # 保留创建时间和ID
+            collection_data["_created_at"] = existing.get("_created_at")
+            collection_data["_id"] = collection_id
+            collection_data["_updated_at"] = datetime.now().isoformat()
+            bump_version(collection_data, existing)
+            stamp_interface_versions(existing.get("interfaces"), collection_data.get("interfaces", []))
+            
+            saved = self._save_collection_shard(collection_id, collection_data) and \
+                self._update_manifest(collection_id, build_summary(collection_data))
+        if saved:
+            self._notify(COLLECTION, collection_id)
+        return saved
+    
+    def delete_collection(self, collection_id: str, cascade: bool = False) -> bool:
+        """
+        删除集合
+        
+        Args:
+            collection_id: 集合ID
+            cascade: 是否同时删除该集合的测试用例和不再被引用的Python脚本文件
         
-        if collection_id not in collections:
+        Returns:
+            删除是否成功
+        """
+        path = self._collection_path(collection_id)
+        if path is None or not self.collection_exists(collection_id):
             logger.warning(f"集合不存在: {collection_id}")
             return False
         
-        # 保留创建时间和ID
-        collection_data["_created_at"] = collections[collection_id].get("_created_at")
-        collection_data["_id"] = collection_id
+        try:
+            with self._exclusive(path):
+                self._delete_collection_shard(collection_id)
+                with self._cache_lock:
+                    self._interface_indexes.pop(collection_id, None)
+                if not self._update_manifest(collection_id, None):
+                    return False
+            self._notify(COLLECTION, collection_id)
+            # 级联删除在释放集合分片锁后进行，保持 脚本存储锁 -> 分片锁 的加锁顺序
+            return not cascade or self._delete_collection_testcases(collection_id)
+        except Exception as e:
+            logger.error(f"删除集合失败: {e}")
+            return False
+    
+    def get_all_collections(self) -> Dict[str, Any]:
+        """
+        获取所有集合
+        
+        Returns:
+            所有集合数据
+        """
+        return self.load_collections()
+    
+    def collection_exists(self, collection_id: str) -> bool:
+        """
+        检查集合是否存在（只读取集合清单）
+        
+        Args:
+            collection_id: 集合ID
+        
+        Returns:
+            是否存在
+        """
+        return collection_id in self.load_manifest()
+    
+    def get_collection_summaries(self) -> Dict[str, Any]:
+        """
+        获取所有集合的概要信息（只读取集合清单）
+        
+        Returns:
+            集合ID -> 概要信息（title、description、version、base_url、interface_count、module_count、
+            tag_counts、method_counts、deprecated_count、_updated_at、_version）
+        """
+        return self.load_manifest()
+    
+    def get_collections_stamp(self) -> Optional[tuple]:
+        """
+        获取全部集合的变更标记（集合清单的文件标识，任一集合被新增、删除或修改后都会变化），
+        供派生的索引判断是否需要对比各集合的概要
+        
+        Returns:
+            清单文件标识，清单不存在时返回None
+        """
+        return self._snapshot_stamp(self.manifest_file)
+    
+    def get_collection_summary(self, collection_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取指定集合的概要信息（只读取集合清单）
+        
+        Args:
+            collection_id: 集合ID
+        
+        Returns:
+            概要信息，如果不存在返回None
+        """
+        return self.load_manifest().get(collection_id)
+    
+    # ------------------------------------------------------------------
+    # 接口
+    # ------------------------------------------------------------------
+    
+    def _interface_position(self, collection_id: str, collection_data: Dict[str, Any], interface_id: str) -> Optional[int]:
+        """
+        通过接口索引查找接口在集合接口列表中的位置
+        
+        Args:
+            collection_id: 集合ID
+            collection_data: 集合数据
+            interface_id: 接口ID
+        
+        Returns:
+            列表位置，接口不存在返回None
+        """
+        interfaces = collection_data.get("interfaces", [])
+        with self._cache_lock:
+            entry = self._interface_indexes.get(collection_id)
+            # 接口列表被替换或在索引之外被增删时重建索引
+            if entry is None or entry[0] is not interfaces or len(entry[1]) != len(interfaces):
+                index: Dict[str, int] = {}
+                for position, interface in enumerate(interfaces):
+                    index.setdefault(interface.get("id"), position)
+                entry = self._interface_indexes[collection_id] = (interfaces, index)
+            
+            position = entry[1].get(interface_id)
+            if position is not None and interfaces[position].get("id") != interface_id:
+                # 列表被原地修改过，丢弃索引后重新查找
+                self._interface_indexes.pop(collection_id, None)
+                return self._interface_position(collection_id, collection_data, interface_id)
+            return position
+    
+    def _save_interfaces(self, collection_id: str, collection_data: Dict[str, Any],
+                         removed: Optional[Dict[str, Any]] = None, added: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        保存接口修改后的集合（集合版本号加1），并按差量更新清单中的概要信息（调用方需持有集合分片的排他锁）
+        
+        Args:
+            collection_id: 集合ID
+            collection_data: 修改后的集合数据
+            removed: 被移除（或修改前）的接口
+            added: 新增（或修改后）的接口
+        
+        Returns:
+            保存是否成功
+        """
         collection_data["_updated_at"] = datetime.now().isoformat()
+        bump_version(collection_data)
+        if not self._save_collection_shard(collection_id, collection_data):
+            return False
         
-        collections[collection_id] = collection_data
+        with self._exclusive(self.manifest_file):
+            manifest = self.load_manifest()
+            manifest[collection_id] = update_summary(manifest.get(collection_id), collection_data, removed, added)
+            return self._save_store(self.manifest_file, "collections", manifest)
+    
+    def get_interface(self, collection_id: str, interface_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取指定接口（通过接口索引定位，无需遍历接口列表）
         
-        return self.save_collections(collections)
+        Args:
+            collection_id: 集合ID
+            interface_id: 接口ID
+        
+        Returns:
+            接口数据，集合或接口不存在返回None
+        """
+        collection_data = self.get_collection(collection_id)
+        if collection_data is None:
+            return None
+        
+        position = self._interface_position(collection_id, collection_data, interface_id)
+        if position is None:
+            return None
+        return collection_data["interfaces"][position]
     
-    def delete_collection(self, collection_id: str) -> bool:
+    def get_interface_page(self, collection_id: str, limit: int, after: Optional[tuple] = None) -> Optional[Dict[str, Any]]:
         """
-        删除集合
+        按集合中的顺序分页获取接口（通过接口索引定位上一页的最后一个接口）
+        
+        Args:
+            collection_id: 集合ID
+            limit: 每页数量
+            after: 上一页最后一个接口的 (接口ID, 列表位置)，为None时从第一个接口开始；
+                   该接口已被删除时从原位置继续
+        
+        Returns:
+            {"interfaces": 当前页接口, "next": 下一页的 (接口ID, 列表位置)，没有更多接口时为None}，
+            集合不存在返回None
+        """
+        collection_data = self.get_collection(collection_id)
+        if collection_data is None:
+            return None
+        
+        interfaces = collection_data.get("interfaces", [])
+        start = 0
+        if after is not None:
+            position = self._interface_position(collection_id, collection_data, after[0])
+            start = position + 1 if position is not None else max(0, min(after[1], len(interfaces)))
+        
+        page = interfaces[start:start + limit]
+        end = start + len(page)
+        return {
+            "interfaces": page,
+            "next": (page[-1].get("id"), end - 1) if page and end < len(interfaces) else None
+        }
+    
+    def update_interface(self, collection_id: str, interface_id: str, interface_data: Dict[str, Any],
+                         expected_version: Optional[int] = None) -> bool:
+        """
+        更新指定接口（保留接口ID，接口版本号加1）
+        
+        通过接口索引直接定位，但集合分片是一个整体文件，保存时仍会重写整个分片（耗时与集合大小成正比）；
+        接口多且编辑频繁的集合应使用 SQLiteStorage，只写入被修改接口的行
         
         Args:
             collection_id: 集合ID
+            interface_id: 接口ID
+            interface_data: 新的接口数据
+            expected_version: 期望的接口版本号，为None时不检查
+        
+        Returns:
+            更新是否成功，集合或接口不存在时返回False
+        
+        Raises:
+            VersionConflict: 接口的当前版本与 expected_version 不一致
+        """
+        path = self._collection_path(collection_id)
+        if path is None:
+            return False
+        
+        with self._exclusive(path):
+            collection_data = self._load_store(path, "collection")
+            if collection_data is None:
+                logger.warning(f"集合不存在: {collection_id}")
+                return False
+            
+            position = self._interface_position(collection_id, collection_data, interface_id)
+            if position is None:
+                logger.warning(f"接口不存在: {collection_id}/{interface_id}")
+                return False
+            
+            old_interface = collection_data["interfaces"][position]
+            check_version(old_interface, expected_version)
             
+            interface_data["id"] = interface_id
+            bump_version(interface_data, old_interface)
+            collection_data["interfaces"][position] = interface_data
+            saved = self._save_interfaces(collection_id, collection_data, removed=old_interface, added=interface_data)
+        if saved:
+            self._notify(INTERFACE, collection_id, [interface_id])
+        return saved
+    
+    def add_interface(self, collection_id: str, interface_data: Dict[str, Any]) -> bool:
+        """
+        向集合末尾添加接口
+        
+        Args:
+            collection_id: 集合ID
+            interface_data: 接口数据，须包含 id
+        
         Returns:
-            删除是否成功
+            添加是否成功，集合不存在时返回False
         """
-        collections = self.load_collections()
+        path = self._collection_path(collection_id)
+        if path is None:
+            return False
         
-        if collection_id not in collections:
-            logger.warning(f"集合不存在: {collection_id}")
+        with self._exclusive(path):
+            collection_data = self._load_store(path, "collection")
+            if collection_data is None:
+                logger.warning(f"集合不存在: {collection_id}")
+                return False
+            
+            interface_data["_version"] = 1
+            interfaces = collection_data.setdefault("interfaces", [])
+            interfaces.append(interface_data)
+            with self._cache_lock:
+                entry = self._interface_indexes.get(collection_id)
+                if entry is not None and entry[0] is interfaces:
+                    entry[1].setdefault(interface_data.get("id"), len(interfaces) - 1)
+            saved = self._save_interfaces(collection_id, collection_data, added=interface_data)
+        if saved:
+            self._notify(INTERFACE, collection_id, [interface_data.get("id")])
+        return saved
+    
+    def delete_interface(self, collection_id: str, interface_id: str) -> Optional[Dict[str, Any]]:
+        """
+        删除集合中的接口
+        
+        Args:
+            collection_id: 集合ID
+            interface_id: 接口ID
+        
+        Returns:
+            被删除的接口数据，集合或接口不存在、保存失败时返回None
+        """
+        path = self._collection_path(collection_id)
+        if path is None:
+            return None
+        
+        with self._exclusive(path):
+            collection_data = self._load_store(path, "collection")
+            if collection_data is None:
+                logger.warning(f"集合不存在: {collection_id}")
+                return None
+            
+            position = self._interface_position(collection_id, collection_data, interface_id)
+            if position is None:
+                logger.warning(f"接口不存在: {collection_id}/{interface_id}")
+                return None
+            
+            deleted_interface = collection_data["interfaces"].pop(position)
+            with self._cache_lock:
+                # 删除会使后续接口的位置前移，下次查找时重建索引
+                self._interface_indexes.pop(collection_id, None)
+            if not self._save_interfaces(collection_id, collection_data, removed=deleted_interface):
+                return None
+        self._notify(INTERFACE, collection_id, [interface_id])
+        return deleted_interface
+    
+    # ------------------------------------------------------------------
+    # 测试用例日志（追加写入 + 后台压缩）
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _snapshot_stamp(path: str) -> Optional[tuple]:
+        """快照文件标识（含inode，快照被原子替换后一定变化），文件不存在时返回None"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    
+    def _load_journaled(self, collection_id: str) -> Dict[str, Any]:
+        """
+        日志模式下加载测试用例：读取快照并重放日志，之后每次只重放新追加的日志记录
+        
+        快照被替换（本进程或其他进程完成压缩）时重新读取快照并从头重放
+        
+        Args:
+            collection_id: 集合ID
+        
+        Returns:
+            测试用例数据字典（与内存状态共享）
+        """
+        path = self._testcase_path(collection_id)
+        journal_path = self._journal_path(collection_id)
+        
+        with self._file_lock(path).acquire(exclusive=False):
+            snapshot_stamp = self._snapshot_stamp(path)
+            journal_size = os.path.getsize(journal_path) if os.path.exists(journal_path) else 0
+            
+            with self._cache_lock:
+                state = self._journal_states.get(collection_id)
+                if state is not None and state["snapshot"] == snapshot_stamp and journal_size >= state["offset"]:
+                    self._cache_hits += 1
+                else:
+                    self._cache_misses += 1
+                    state = None
+            
+            if state is None:
+                state = {"snapshot": snapshot_stamp, "offset": 0, "data": self._read_testcase_snapshot(path)}
+            if journal_size > state["offset"]:
+                state["offset"] = self._replay_journal(journal_path, state["offset"], state["data"])
+            
+            with self._cache_lock:
+                self._journal_states[collection_id] = state
+            return state["data"]
+    
+    @staticmethod
+    def _read_testcase_snapshot(path: str) -> Dict[str, Any]:
+        """读取测试用例快照文件，文件不存在或解析失败时返回空字典"""
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'rb') as f:
+                data = codec.loads(f.read()).get("testcases")
+        except Exception as e:
+            logger.error(f"加载数据文件失败: {path}: {e}")
+            return {}
+        if not isinstance(data, dict):
+            logger.warning(f"未知的数据格式: {path} ({type(data)})")
+            return {}
+        return data
+    
+    @staticmethod
+    def _replay_journal(journal_path: str, offset: int, testcases: Dict[str, Any]) -> int:
+        """
+        从指定位置开始重放日志记录（原地修改 testcases）
+        
+        Args:
+            journal_path: 日志文件路径
+            offset: 开始重放的字节位置
+            testcases: 测试用例数据字典
+        
+        Returns:
+            已重放到的字节位置；末尾未写完的记录（写入时崩溃）不计入，下次追加前会被截断
+        """
+        with open(journal_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = codec.loads(line)
+                except ValueError:
+                    logger.warning(f"测试用例日志记录损坏，忽略其后的记录: {journal_path} (位置 {offset})")
+                    break
+                if entry.get("op") == "delete":
+                    testcases.pop(entry["key"], None)
+                else:
+                    testcases[entry["key"]] = entry["value"]
+                offset += len(line)
+        return offset
+    
+    def _save_testcase_change(self, collection_id: str, testcase_key: str, testcases: Dict[str, Any]) -> bool:
+        """
+        保存单个测试用例的修改（调用方需持有分片排他锁，且 testcases 已包含该修改）：
+        日志模式下只追加一条记录，否则重写整个测试用例分片
+        
+        Args:
+            collection_id: 集合ID
+            testcase_key: 被修改的测试用例键
+            testcases: 修改后的测试用例数据字典
+        
+        Returns:
+            保存是否成功
+        """
+        if not self.testcase_journal:
+            return self._save_collection_testcases(collection_id, testcases)
+        
+        record = testcases.get(testcase_key)
+        entry = {"op": "put", "key": testcase_key, "value": record} if record is not None else {"op": "delete", "key": testcase_key}
+        # 日志按行分隔，始终使用紧凑JSON
+        line = codec.dumps(entry, "compact") + b"\n"
+        journal_path = self._journal_path(collection_id)
+        
+        try:
+            with self._exclusive(self._testcase_path(collection_id)):
+                with self._cache_lock:
+                    state = self._journal_states.get(collection_id)
+                if state is None:
+                    self._load_journaled(collection_id)
+                    state = self._journal_states[collection_id]
+                
+                with open(journal_path, 'ab') as f:
+                    if f.tell() > state["offset"]:
+                        # 丢弃上次崩溃时未写完的记录
+                        f.truncate(state["offset"])
+                    f.write(line)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    state["offset"] = f.tell()
+            
+            if state["offset"] >= self.journal_compact_bytes:
+                self._schedule_compaction(collection_id)
+            return True
+        except Exception as e:
+            # 调用方已修改内存中的数据，追加失败时丢弃内存状态，下次从文件重新加载
+            self._discard_journal_state(collection_id)
+            logger.error(f"追加测试用例日志失败: {journal_path}: {e}")
             return False
+    
+    def _write_testcase_snapshot(self, collection_id: str, testcases: Dict[str, Any]):
+        """
+        将测试用例整体写为新的快照并清空日志（调用方需持有分片排他锁）
+        
+        先替换快照再删除日志：两步之间崩溃时，旧日志在新快照上重放的结果不变
+        
+        Args:
+            collection_id: 集合ID
+            testcases: 测试用例数据字典
+        """
+        path = self._testcase_path(collection_id)
+        journal_path = self._journal_path(collection_id)
+        if testcases:
+            self._write_store(path, "testcases", testcases)
+        elif os.path.exists(path):
+            os.remove(path)
+        if os.path.exists(journal_path):
+            os.remove(journal_path)
         
-        del collections[collection_id]
+        with self._cache_lock:
+            # 日志模式下测试用例由日志状态缓存，不重复进入文件缓存
+            self._drop_cached(path)
+            self._journal_states[collection_id] = {"snapshot": self._snapshot_stamp(path), "offset": 0, "data": testcases}
+    
+    def _discard_journal_state(self, collection_id: str):
+        """丢弃集合的测试用例日志内存状态"""
+        with self._cache_lock:
+            self._journal_states.pop(collection_id, None)
+    
+    def _schedule_compaction(self, collection_id: str):
+        """在后台线程中压缩集合的测试用例日志（同一集合同时只有一个压缩任务）"""
+        with self._cache_lock:
+            if collection_id in self._compacting:
+                return
+            self._compacting.add(collection_id)
+        thread = threading.Thread(target=self._compact_journal, args=(collection_id,),
+                                  name=f"journal-compact-{collection_id}", daemon=True)
+        thread.start()
+    
+    def _compact_journal(self, collection_id: str, force: bool = False):
+        """
+        将测试用例日志压缩进快照
         
-        return self.save_collections(collections)
+        Args:
+            collection_id: 集合ID
+            force: 为True时无论日志大小都压缩，否则日志已被其他进程压缩到阈值以下时跳过
+        """
+        path = self._testcase_path(collection_id)
+        journal_path = self._journal_path(collection_id)
+        try:
+            with self._exclusive(path):
+                if not os.path.exists(journal_path):
+                    return
+                journal_size = os.path.getsize(journal_path)
+                if not force and journal_size < self.journal_compact_bytes:
+                    return
+                testcases = self._load_journaled(collection_id)
+                self._write_testcase_snapshot(collection_id, testcases)
+                logger.info(f"测试用例日志已压缩: {journal_path} ({journal_size} 字节, {len(testcases)} 个测试用例)")
+        except Exception as e:
+            self._discard_journal_state(collection_id)
+            logger.error(f"压缩测试用例日志失败: {journal_path}: {e}")
+        finally:
+            with self._cache_lock:
+                self._compacting.discard(collection_id)
     
-    def get_all_collections(self) -> Dict[str, Any]:
+    def _fold_journals(self):
+        """将所有遗留的测试用例日志合并进快照（关闭日志模式时启动调用）"""
+        for collection_id in self._list_shards(self.testcases_dir, ".journal"):
+            if self._is_valid_id(collection_id):
+                self._compact_journal(collection_id, force=True)
+        self._journal_states.clear()
+    
+    # ------------------------------------------------------------------
+    # 测试用例
+    # ------------------------------------------------------------------
+    
+    def load_collection_testcases(self, collection_id: str) -> Dict[str, Any]:
         """
-        获取所有集合
+        加载指定集合的测试用例（只读取该集合的测试用例分片）
+        
+        注意：返回的字典与缓存共享，修改后须通过 save_testcases 等方法保存
+        
+        Args:
+            collection_id: 集合ID
         
         Returns:
-            所有集合数据
+            测试用例数据字典，键为 "{collection_id}_{interface_id}"
         """
-        return self.load_collections()
+        path = self._testcase_path(collection_id)
+        if path is None:
+            return {}
+        if self.testcase_journal:
+            return self._load_journaled(collection_id)
+        testcases = self._load_store(path, "testcases")
+        return testcases if testcases is not None else {}
     
-    def collection_exists(self, collection_id: str) -> bool:
+    def _save_collection_testcases(self, collection_id: str, testcases: Dict[str, Any]) -> bool:
+        """保存指定集合的测试用例分片，分片为空时删除文件"""
+        path = self._testcase_path(collection_id)
+        if path is None:
+            logger.warning(f"集合ID不合法，无法保存测试用例: {collection_id}")
+            return False
+        if self.testcase_journal:
+            try:
+                with self._exclusive(path):
+                    self._write_testcase_snapshot(collection_id, testcases)
+                return True
+            except Exception as e:
+                self._discard_journal_state(collection_id)
+                logger.error(f"保存测试用例快照失败: {path}: {e}")
+                return False
+        if not testcases:
+            self._delete_store(path)
+            return True
+        return self._save_store(path, "testcases", testcases)
+    
+    def get_testcase_stamp(self, collection_id: str) -> Optional[tuple]:
         """
-        检查集合是否存在
+        获取集合测试用例的变更标记（只取决于磁盘上的文件，各进程、重启前后一致），
+        标记不变说明测试用例和Python脚本记录没有被修改，可用于响应的 ETag
         
         Args:
             collection_id: 集合ID
-            
+        
         Returns:
-            是否存在
+            (分片文件标识, 日志文件标识)；分片有尚未落盘的延迟写入时返回None（磁盘上的文件还不是最新内容）
         """
-        collections = self.load_collections()
-        return collection_id in collections
-
+        path = self._testcase_path(collection_id)
+        if path is None:
+            return ()
+        with self._cache_lock:
+            if path in self._pending_writes:
+                return None
+        # 快照被原子替换后文件标识（含inode）一定变化，日志只追加，大小一定变化
+        return (self._snapshot_stamp(path), self._file_stamp(self._journal_path(collection_id)))
+    
     def load_testcases(self) -> Dict[str, Any]:
         """
-        从文件加载所有测试用例数据
+        加载所有测试用例数据（合并所有测试用例分片）
         
         Returns:
             测试用例数据字典
         """
-        if not os.path.exists(self.testcases_file):
-            logger.info("测试用例文件不存在，返回空字典")
-            return {}
-        
-        try:
-            with open(self.testcases_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                testcases = data.get('testcases', {})
-                
-                # 处理不同的数据格式
-                if isinstance(testcases, list):
-                    # 如果是数组格式，转换为字典格式
-                    logger.info(f"检测到数组格式的测试用例数据，包含 {len(testcases)} 个测试用例")
-                    # 创建一个空的字典，因为数组格式无法直接用于键值存储
-                    return {}
-                elif isinstance(testcases, dict):
-                    logger.info(f"成功加载 {len(testcases)} 个接口的测试用例")
-                    return testcases
-                else:
-                    logger.warning(f"未知的测试用例格式: {type(testcases)}")
-                    return {}
-                    
-        except Exception as e:
-            logger.error(f"加载测试用例文件失败: {e}")
-            return {}
-
+        testcases = {}
+        for collection_id in self._testcase_shards():
+            testcases.update(self.load_collection_testcases(collection_id))
+        logger.info(f"成功加载 {len(testcases)} 个接口的测试用例")
+        return testcases
+    
     def save_testcases(self, testcases: Dict[str, Any]) -> bool:
         """
-        保存测试用例数据到文件
+        保存全部测试用例数据（按集合拆分写入分片），
+        不在 testcases 中的已有测试用例分片会被删除
         
         Args:
             testcases: 测试用例数据字典
-            
+        
         Returns:
             保存是否成功
         """
         try:
-            # 添加时间戳和元数据
-            data_to_save = {
-                "_metadata": {
-                    "last_updated": datetime.now().isoformat(),
-                    "testcase_count": len(testcases)
-                },
-                "testcases": testcases
-            }
+            by_collection: Dict[str, Dict[str, Any]] = {}
+            for testcase_key, testcase in testcases.items():
+                collection_id, _ = self._split_testcase_key(testcase_key, testcase)
+                by_collection.setdefault(collection_id, {})[testcase_key] = testcase
             
-            # 写入文件
-            with open(self.testcases_file, 'w', encoding='utf-8') as f:
-                json.dump(data_to_save, f, ensure_ascii=False, indent=2)
+            success = True
+            for collection_id in set(by_collection) | set(self._testcase_shards()):
+                success = self._save_collection_testcases(collection_id, by_collection.get(collection_id, {})) and success
             
             logger.info(f"成功保存 {len(testcases)} 个接口的测试用例到文件")
-            return True
-            
+            return success
+        
         except Exception as e:
             logger.error(f"保存测试用例文件失败: {e}")
             return False
-
+        finally:
+            self._notify(TESTCASE)
+    
     def save_testcase(self, collection_id: str, interface_id: str, yaml_content: str = None, json_content: str = None, workflow_id: str = None) -> bool:
         """
         保存测试用例
@@ -265,27 +1485,57 @@ class JSONStorage:
             yaml_content: YAML内容（可选）
             json_content: JSON内容（可选）
             workflow_id: 工作流ID（可选）
-            
+        
         Returns:
             保存是否成功
         """
-        testcases = self.load_testcases()
+        path = self._testcase_path(collection_id)
+        if path is None:
+            logger.warning(f"集合ID不合法，无法保存测试用例: {collection_id}")
+            return False
         
-        # 创建测试用例键
-        testcase_key = f"{collection_id}_{interface_id}"
+        with self._exclusive(path):
+            testcases = self.load_collection_testcases(collection_id)
+            
+            # 创建测试用例键
+            testcase_key = f"{collection_id}_{interface_id}"
+            
+            testcases[testcase_key] = new_testcase_record(collection_id, interface_id, yaml_content, json_content, workflow_id)
+            
+            saved = self._save_testcase_change(collection_id, testcase_key, testcases)
+        if saved:
+            self._notify(TESTCASE, collection_id, [interface_id])
+        return saved
+    
+    def save_testcase_batch(self, collection_id: str, items: List[Dict[str, Any]]) -> bool:
+        """
+        批量保存同一集合的测试用例（只重写一次测试用例分片）
         
-        testcases[testcase_key] = {
-            "collection_id": collection_id,
-            "interface_id": interface_id,
-            "yaml_content": yaml_content or "",
-            "json_content": json_content or "",
-            "workflow_id": workflow_id,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
-        }
+        Args:
+            collection_id: 集合ID
+            items: 测试用例列表，每项包含 interface_id，以及可选的 yaml_content、json_content、workflow_id
         
-        return self.save_testcases(testcases)
-
+        Returns:
+            保存是否成功
+        """
+        path = self._testcase_path(collection_id)
+        if path is None:
+            logger.warning(f"集合ID不合法，无法保存测试用例: {collection_id}")
+            return False
+        if not items:
+            return True
+        
+        with self._exclusive(path):
+            testcases = self.load_collection_testcases(collection_id)
+            for item in items:
+                testcases[f"{collection_id}_{item['interface_id']}"] = new_testcase_record(
+                    collection_id, item["interface_id"], item.get("yaml_content"), item.get("json_content"), item.get("workflow_id")
+                )
+            saved = self._save_collection_testcases(collection_id, testcases)
+        if saved:
+            self._notify(TESTCASE, collection_id, [item["interface_id"] for item in items])
+        return saved
+    
     def get_testcase(self, collection_id: str, interface_id: str) -> Optional[Dict[str, Any]]:
         """
         获取测试用例
@@ -293,14 +1543,14 @@ class JSONStorage:
         Args:
             collection_id: 集合ID
             interface_id: 接口ID
-            
+        
         Returns:
             测试用例数据，如果不存在返回None
         """
-        testcases = self.load_testcases()
+        testcases = self.load_collection_testcases(collection_id)
         testcase_key = f"{collection_id}_{interface_id}"
         return testcases.get(testcase_key)
-
+    
     def has_testcase(self, collection_id: str, interface_id: str) -> bool:
         """
         检查是否存在测试用例
@@ -308,14 +1558,67 @@ class JSONStorage:
         Args:
             collection_id: 集合ID
             interface_id: 接口ID
-            
+        
         Returns:
             是否存在测试用例
         """
-        testcases = self.load_testcases()
+        testcases = self.load_collection_testcases(collection_id)
         testcase_key = f"{collection_id}_{interface_id}"
         return testcase_key in testcases
-
+    
+    def get_testcase_statuses(self, collection_id: str, interface_ids) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取接口的测试用例状态（只读取一次该集合的测试用例分片）
+        
+        Args:
+            collection_id: 集合ID
+            interface_ids: 接口ID列表
+        
+        Returns:
+            接口ID -> 状态字典（has_testcase、has_python_script、testcase_count、updated_at、python_generated_at）
+        """
+        testcases = self.load_collection_testcases(collection_id)
+        statuses = {}
+        for interface_id in interface_ids:
+            testcase = testcases.get(f"{collection_id}_{interface_id}")
+            has_python_script = testcase is not None and (
+                "python_code" in testcase or
+                bool(testcase.get("python_script_path")) and os.path.exists(testcase["python_script_path"])
+            )
+            statuses[interface_id] = testcase_status(testcase, has_python_script)
+        return statuses
+    
+    def list_testcases(self, collection_id: str) -> List[str]:
+        """
+        列出集合下有测试用例的接口ID（测试用例按集合分片，只读取该集合的分片）
+        
+        Args:
+            collection_id: 集合ID
+        
+        Returns:
+            接口ID列表
+        """
+        return [
+            self._split_testcase_key(testcase_key, testcase)[1]
+            for testcase_key, testcase in self.load_collection_testcases(collection_id).items()
+        ]
+    
+    def iter_testcases(self, collection_id: str) -> Iterator[Dict[str, Any]]:
+        """
+        逐条返回集合下的测试用例记录（只读取该集合的分片，不加载其他集合的测试用例）
+        
+        注意：返回的记录与缓存共享，不要修改；Python脚本内容需通过 get_python_script 读取
+        
+        Args:
+            collection_id: 集合ID
+        
+        Yields:
+            测试用例记录
+        """
+        # 复制值列表，遍历过程中其他线程保存测试用例不会影响迭代
+        for testcase in list(self.load_collection_testcases(collection_id).values()):
+            yield testcase
+    
     def delete_testcase(self, collection_id: str, interface_id: str) -> bool:
         """
         删除测试用例
@@ -323,91 +1626,125 @@ class JSONStorage:
         Args:
             collection_id: 集合ID
             interface_id: 接口ID
-            
+        
         Returns:
             删除是否成功
         """
-        testcases = self.load_testcases()
+        path = self._testcase_path(collection_id)
         testcase_key = f"{collection_id}_{interface_id}"
-        
-        if testcase_key not in testcases:
+        if path is None:
             logger.warning(f"测试用例不存在: {testcase_key}")
             return False
         
-        del testcases[testcase_key]
-        return self.save_testcases(testcases)
-
+        with self._exclusive(path):
+            testcases = self.load_collection_testcases(collection_id)
+            
+            if testcase_key not in testcases:
+                logger.warning(f"测试用例不存在: {testcase_key}")
+                return False
+            
+            del testcases[testcase_key]
+            saved = self._save_testcase_change(collection_id, testcase_key, testcases)
+        if saved:
+            self._notify(TESTCASE, collection_id, [interface_id])
+        return saved
+    
     def save_python_script(self, collection_id: str, interface_id: str, python_code: str, workflow_id: str = None) -> bool:
         """
         保存Python脚本到文件系统，确保重启服务后仍可访问
         
+        脚本内容按哈希保存在 python_scripts/objects 下，测试用例记录中只保存路径、哈希、大小和生成时间
+        
         Args:
             collection_id: 集合ID
             interface_id: 接口ID
             python_code: Python代码内容
             workflow_id: 工作流ID（可选）
-            
+        
         Returns:
             保存是否成功
         """
+        path = self._testcase_path(collection_id)
+        if path is None:
+            logger.error(f"保存Python脚本失败: 集合ID不合法 {collection_id}")
+            return False
+        
         try:
-            # 创建Python脚本存储目录
-            python_scripts_dir = os.path.join(self.storage_dir, "python_scripts")
-            if not os.path.exists(python_scripts_dir):
-                os.makedirs(python_scripts_dir)
-                logger.info(f"创建Python脚本存储目录: {python_scripts_dir}")
-            
-            # 生成Python脚本文件名
-            script_filename = f"{collection_id}_{interface_id}.py"
-            script_filepath = os.path.join(python_scripts_dir, script_filename)
-            
-            # 写入Python脚本文件
-            with open(script_filepath, 'w', encoding='utf-8') as f:
-                f.write(python_code)
-            
-            # 同时更新测试用例数据中的Python脚本信息
-            testcases = self.load_testcases()
-            testcase_key = f"{collection_id}_{interface_id}"
-            
-            if testcase_key not in testcases:
-                testcases[testcase_key] = {}
-            
-            testcases[testcase_key].update({
-                "collection_id": collection_id,
-                "interface_id": interface_id,
-                "python_code": python_code,
-                "python_script_path": script_filepath,
-                "python_workflow_id": workflow_id,
-                "python_generated_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            })
-            
-            # 保存更新后的测试用例数据
-            success = self.save_testcases(testcases)
-            
-            if success:
-                logger.info(f"成功保存Python脚本: {script_filepath} (代码长度: {len(python_code)})")
-                return True
-            else:
-                logger.error(f"保存Python脚本元数据失败")
-                return False
+            with self.script_store.lock():
+                script = self.script_store.put(python_code)
+                
+                with self._exclusive(path):
+                    # 同时更新测试用例数据中的Python脚本信息
+                    testcases = self.load_collection_testcases(collection_id)
+                    testcase_key = f"{collection_id}_{interface_id}"
+                
+                    if testcase_key not in testcases:
+                        testcases[testcase_key] = {}
                 
+                    testcase_data = testcases[testcase_key]
+                    previous = (testcase_data.get("python_script_hash"), testcase_data.get("python_script_path"))
+                    testcase_data.pop("python_code", None)
+                    testcase_data.update({
+                        "collection_id": collection_id,
+                        "interface_id": interface_id,
+                        "python_script_path": script["path"],
+                        "python_script_hash": script["hash"],
+                        "python_script_size": script["size"],
+                        "python_workflow_id": workflow_id,
+                        "python_generated_at": datetime.now().isoformat(),
+                        "updated_at": datetime.now().isoformat()
+                    })
+                
+                    # 保存更新后的测试用例数据
+                    success = self._save_testcase_change(collection_id, testcase_key, testcases)
+                
+                if not success:
+                    logger.error(f"保存Python脚本元数据失败")
+                    return False
+                self._notify(TESTCASE, collection_id, [interface_id])
+            
+                if previous[1] and previous[1] != script["path"]:
+                    self._release_python_script(*previous)
+            
+            logger.info(f"成功保存Python脚本: {script['path']} (代码长度: {len(python_code)})")
+            return True
+        
         except Exception as e:
             logger.error(f"保存Python脚本失败: {e}")
             return False
-
+    
+    def _python_script_referenced(self, script_hash: str) -> bool:
+        """检查是否还有测试用例记录引用该脚本内容"""
+        for collection_id in self._testcase_shards():
+            for testcase_data in self.load_collection_testcases(collection_id).values():
+                if testcase_data.get("python_script_hash") == script_hash:
+                    return True
+        return False
+    
+    def _release_python_script(self, script_hash: Optional[str], script_path: Optional[str]):
+        """
+        删除不再被引用的脚本文件（调用方需持有脚本存储锁，且不持有任何测试用例分片锁）
+        
+        Args:
+            script_hash: 脚本内容哈希，旧版按接口保存的脚本为None
+            script_path: 脚本文件路径
+        """
+        if script_hash and self._python_script_referenced(script_hash):
+            return
+        self.script_store.remove(script_hash, script_path)
+    
     def get_python_script(self, collection_id: str, interface_id: str) -> Optional[Dict[str, Any]]:
         """
-        获取已保存的Python脚本
+        获取已保存的Python脚本（按需从文件读取脚本内容）
         
         Args:
             collection_id: 集合ID
             interface_id: 接口ID
-            
+        
         Returns:
             Python脚本信息字典，包含代码、文件路径等信息
         """
-        testcases = self.load_testcases()
+        testcases = self.load_collection_testcases(collection_id)
         testcase_key = f"{collection_id}_{interface_id}"
         
         if testcase_key not in testcases:
@@ -415,80 +1752,439 @@ class JSONStorage:
         
         testcase_data = testcases[testcase_key]
         
-        # 检查是否已有Python脚本
+        # 旧版数据中脚本内容直接保存在测试用例记录里
         if "python_code" in testcase_data:
             return testcase_data
         
-        # 如果测试用例数据中有Python脚本路径，尝试从文件读取
-        if "python_script_path" in testcase_data:
-            script_path = testcase_data["python_script_path"]
-            if os.path.exists(script_path):
-                try:
-                    with open(script_path, 'r', encoding='utf-8') as f:
-                        python_code = f.read()
-                    
-                    # 更新数据
-                    testcase_data["python_code"] = python_code
-                    return testcase_data
-                except Exception as e:
-                    logger.error(f"读取Python脚本文件失败: {e}")
+        # 从文件读取，返回副本，避免脚本内容进入测试用例缓存
+        script_path = testcase_data.get("python_script_path")
+        if script_path:
+            python_code = self.script_store.read(script_path)
+            if python_code is not None:
+                return dict(testcase_data, python_code=python_code)
         
         return None
-
+    
     def has_python_script(self, collection_id: str, interface_id: str) -> bool:
         """
-        检查是否存在已保存的Python脚本
+        检查是否存在已保存的Python脚本（不读取脚本内容）
         
         Args:
             collection_id: 集合ID
             interface_id: 接口ID
-            
+        
         Returns:
             是否存在Python脚本
         """
-        script_info = self.get_python_script(collection_id, interface_id)
-        return script_info is not None and "python_code" in script_info
-
+        testcase_data = self.get_testcase(collection_id, interface_id)
+        if testcase_data is None:
+            return False
+        if "python_code" in testcase_data:
+            return True
+        script_path = testcase_data.get("python_script_path")
+        return bool(script_path) and os.path.exists(script_path)
+    
     def delete_python_script(self, collection_id: str, interface_id: str) -> bool:
         """
-        删除Python脚本
+        删除Python脚本（脚本内容不再被其他接口引用时删除文件）
         
         Args:
             collection_id: 集合ID
             interface_id: 接口ID
-            
+        
         Returns:
             删除是否成功
         """
+        path = self._testcase_path(collection_id)
+        if path is None:
+            return False
+        
         try:
-            testcases = self.load_testcases()
-            testcase_key = f"{collection_id}_{interface_id}"
+            with self.script_store.lock():
+                with self._exclusive(path):
+                    testcases = self.load_collection_testcases(collection_id)
+                    testcase_key = f"{collection_id}_{interface_id}"
+                
+                    if testcase_key not in testcases:
+                        return False
+                
+                    testcase_data = testcases[testcase_key]
+                    script = (testcase_data.get("python_script_hash"), testcase_data.get("python_script_path"))
+                
+                    # 清除Python脚本相关字段
+                    for field in _PYTHON_FIELDS:
+                        if field in testcase_data:
+                            del testcase_data[field]
+                
+                    # 保存更新后的数据
+                    if not self._save_testcase_change(collection_id, testcase_key, testcases):
+                        return False
+                self._notify(TESTCASE, collection_id, [interface_id])
+                
+                if script[1]:
+                    self._release_python_script(*script)
+                return True
             
-            if testcase_key not in testcases:
-                return False
+        except Exception as e:
+            logger.error(f"删除Python脚本失败: {e}")
+            return False
+
+    # ------------------------------------------------------------------
+    # 孤立数据清理
+    # ------------------------------------------------------------------
+    
+    def _delete_collection_testcases(self, collection_id: str) -> bool:
+        """删除集合的全部测试用例，以及不再被其他集合引用的Python脚本文件（级联删除集合时调用）"""
+        path = self._testcase_path(collection_id)
+        if path is None:
+            return False
+        
+        with self.script_store.lock():
+            with self._exclusive(path):
+                testcases = self.load_collection_testcases(collection_id)
+                scripts = {
+                    (testcase.get("python_script_hash"), testcase.get("python_script_path"))
+                    for testcase in testcases.values() if testcase.get("python_script_path")
+                }
+                if not self._save_collection_testcases(collection_id, {}):
+                    return False
+            
+            if scripts:
+                referenced = self._referenced_scripts()[0]
+                for script_hash, script_path in scripts:
+                    if not script_hash or script_hash not in referenced:
+                        self.script_store.remove(script_hash, script_path)
+        logger.info(f"已级联删除集合的测试用例: {collection_id} ({len(testcases)} 个)")
+        return True
+    
+    def _referenced_scripts(self, skip_orphans: bool = False) -> tuple:
+        """
+        收集测试用例记录引用的Python脚本
+        
+        Args:
+            skip_orphans: 为True时忽略集合或接口已不存在的测试用例记录
+        
+        Returns:
+            (脚本内容哈希集合, 脚本文件路径集合)
+        """
+        hashes, paths = set(), set()
+        for collection_id in self._testcase_shards():
+            if skip_orphans:
+                collection_data = self.get_collection(collection_id) or {}
+                interface_ids = {interface.get("id") for interface in collection_data.get("interfaces", [])}
+            for testcase_key, testcase in self.load_collection_testcases(collection_id).items():
+                if skip_orphans and self._split_testcase_key(testcase_key, testcase)[1] not in interface_ids:
+                    continue
+                if testcase.get("python_script_hash"):
+                    hashes.add(testcase["python_script_hash"])
+                if testcase.get("python_script_path"):
+                    paths.add(testcase["python_script_path"])
+        return hashes, paths
+    
+    def _collect_testcase_shard(self, collection_id: str, report: Dict[str, Any], dry_run: bool) -> Optional[int]:
+        """
+        删除测试用例分片中集合或接口已不存在的记录
+        
+        Args:
+            collection_id: 集合ID
+            report: 清理结果（原地累加）
+            dry_run: 为True时只统计不删除
+        
+        Returns:
+            清理前分片（含日志）的字节数，没有孤立记录时返回None
+        """
+        path = self._testcase_path(collection_id)
+        if path is None:
+            return None
+        
+        with self._exclusive(path):
+            testcases = self.load_collection_testcases(collection_id)
+            collection_path = self._collection_path(collection_id)
+            if os.path.exists(collection_path):
+                collection_data = self._load_store(collection_path, "collection")
+                if collection_data is None:
+                    logger.warning(f"集合分片无法读取，跳过清理其测试用例: {collection_id}")
+                    return None
+                interface_ids = {interface.get("id") for interface in collection_data.get("interfaces", [])}
+            else:
+                interface_ids = set()
             
-            testcase_data = testcases[testcase_key]
+            orphans = [
+                testcase_key for testcase_key, testcase in testcases.items()
+                if self._split_testcase_key(testcase_key, testcase)[1] not in interface_ids
+            ]
+            size = sum(os.path.getsize(p) for p in (path, self._journal_path(collection_id)) if os.path.exists(p))
+            if not orphans and (testcases or not size):
+                return None
             
-            # 删除Python脚本文件
-            if "python_script_path" in testcase_data:
-                script_path = testcase_data["python_script_path"]
-                if os.path.exists(script_path):
-                    os.remove(script_path)
-                    logger.info(f"删除Python脚本文件: {script_path}")
+            report["testcases"] += len(orphans)
+            if dry_run:
+                if len(orphans) == len(testcases):
+                    report["bytes_freed"] += size
+                else:
+                    report["bytes_freed"] += sum(len(codec.dumps(testcases[key], self.storage_format)) for key in orphans)
+                return None
             
-            # 清除Python脚本相关字段
-            python_fields = ["python_code", "python_script_path", "python_workflow_id", "python_generated_at"]
-            for field in python_fields:
-                if field in testcase_data:
-                    del testcase_data[field]
+            kept = {key: testcase for key, testcase in testcases.items() if key not in orphans}
+            if not self._save_collection_testcases(collection_id, kept):
+                logger.error(f"清理孤立测试用例失败: {collection_id}")
+                return None
+            logger.info(f"已清理孤立测试用例: {collection_id} ({len(orphans)} 个)")
+            return size
+    
+    def _collect_stale_files(self, report: Dict[str, Any], dry_run: bool):
+        """删除已不存在的集合的冷数据文件，以及写入中断遗留的临时文件"""
+        for collection_id in self._list_shards(self.blobs_dir, ".json.gz"):
+            collection_path = self._collection_path(collection_id)
+            if collection_path is None:
+                continue
+            with self._exclusive(collection_path):
+                blob_path = self._blob_path(collection_id)
+                if os.path.exists(collection_path) or not os.path.exists(blob_path):
+                    continue
+                report["blobs"] += 1
+                report["bytes_freed"] += os.path.getsize(blob_path)
+                if not dry_run:
+                    os.remove(blob_path)
+                    logger.info(f"删除孤立的冷数据文件: {blob_path}")
+        
+        expire_before = time.time() - ScriptStore.TEMP_FILE_AGE
+        for directory in (self.storage_dir, self.collections_dir, self.testcases_dir, self.blobs_dir):
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if not name.endswith(".tmp") or not os.path.isfile(path) or os.path.getmtime(path) > expire_before:
+                    continue
+                report["temp_files"] += 1
+                report["bytes_freed"] += os.path.getsize(path)
+                if not dry_run:
+                    os.remove(path)
+                    logger.info(f"删除遗留的临时文件: {path}")
+    
+    def collect_garbage(self, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        清理孤立数据：集合或接口已删除的测试用例记录（及空的测试用例分片）、已删除集合的冷数据文件、
+        没有被任何测试用例引用的Python脚本文件，以及写入中断遗留的临时文件
+        
+        Args:
+            dry_run: 为True时只统计不删除
+        
+        Returns:
+            清理结果 {"testcases", "python_scripts", "blobs", "temp_files", "bytes_freed", "dry_run"}
+        """
+        report = {"testcases": 0, "python_scripts": 0, "blobs": 0, "temp_files": 0, "bytes_freed": 0, "dry_run": dry_run}
+        
+        # 持有脚本存储锁，保证统计引用与删除脚本文件之间不会有新脚本保存
+        with self.script_store.lock():
+            sizes = {}
+            for collection_id in self._testcase_shards():
+                size = self._collect_testcase_shard(collection_id, report, dry_run)
+                if size is not None:
+                    sizes[collection_id] = size
             
-            # 保存更新后的数据
-            return self.save_testcases(testcases)
+            # 延迟写入模式下先落盘，再统计分片缩小的字节数
+            self.flush()
+            for collection_id, size in sizes.items():
+                remaining = sum(
+                    os.path.getsize(p) for p in (self._testcase_path(collection_id), self._journal_path(collection_id))
+                    if os.path.exists(p)
+                )
+                report["bytes_freed"] += max(size - remaining, 0)
             
+            # 预演时孤立记录尚未删除，不计入引用
+            hashes, paths = self._referenced_scripts(skip_orphans=dry_run)
+            swept = self.script_store.sweep(hashes, paths, dry_run)
+            report["python_scripts"] += swept["files"]
+            report["bytes_freed"] += swept["bytes"]
+        
+        if report["testcases"] and not dry_run:
+            self._notify(TESTCASE)
+        self._collect_stale_files(report, dry_run)
+        logger.info(f"孤立数据清理完成: {report}")
+        return report
+
+
+class JSONDataReader:
+    """
+    只读方式读取JSON存储的数据目录（分片布局、测试用例日志以及尚未拆分的旧版单文件），供迁移到其他存储后端使用
+    
+    与 JSONStorage 不同，不创建目录、不拆分旧版文件、不合并日志，也不创建锁文件，数据目录保持原样，
+    迁移后仍可直接回退到JSON存储。读取期间不应有服务进程写入该目录
+    """
+    
+    def __init__(self, storage_dir: str = "data"):
+        """
+        初始化读取器
+        
+        Args:
+            storage_dir: JSON存储目录路径
+        """
+        self.storage_dir = storage_dir
+        self.collections_dir = os.path.join(storage_dir, "collections")
+        self.testcases_dir = os.path.join(storage_dir, "testcases")
+        self.blobs_dir = os.path.join(storage_dir, "blobs")
+        self.data_file = os.path.join(storage_dir, "collections.json")
+        self.testcases_file = os.path.join(storage_dir, "testcases.json")
+        self._legacy_collections: Optional[Dict[str, Any]] = None
+    
+    def _load_legacy_collections(self) -> Dict[str, Any]:
+        """读取旧版 collections.json（不存在时为空字典）"""
+        if self._legacy_collections is None:
+            self._legacy_collections = JSONStorage._read_legacy_file(self.data_file, "collections") \
+                if os.path.exists(self.data_file) else {}
+        return self._legacy_collections
+    
+    def load_collections(self) -> Dict[str, Any]:
+        """
+        读取所有集合（旧版单文件中的集合与 JSONStorage 启动时的拆分结果一致，覆盖同ID的分片）
+        
+        Returns:
+            集合数据字典，分片中的集合不包含 raw_doc 等冷数据字段（见 get_raw_doc）
+        """
+        collections = {}
+        for collection_id in JSONStorage._list_shards(self.collections_dir):
+            path = os.path.join(self.collections_dir, f"{collection_id}.json")
+            try:
+                with open(path, 'rb') as f:
+                    data = codec.loads(f.read()).get("collection")
+            except Exception as e:
+                logger.error(f"加载数据文件失败: {path}: {e}")
+                continue
+            if isinstance(data, dict):
+                collections[collection_id] = data
+        collections.update(self._load_legacy_collections())
+        return collections
+    
+    def get_raw_doc(self, collection_id: str) -> Optional[Dict[str, Any]]:
+        """
+        读取集合的原始文档（旧版单文件中的内嵌字段优先，其次是冷数据文件）
+        
+        Args:
+            collection_id: 集合ID
+        
+        Returns:
+            原始文档，没有时返回None
+        """
+        legacy = self._load_legacy_collections().get(collection_id)
+        if legacy is not None and "raw_doc" in legacy:
+            return legacy["raw_doc"]
+        if not JSONStorage._is_valid_id(collection_id):
+            return None
+        
+        blob_path = os.path.join(self.blobs_dir, f"{collection_id}.json.gz")
+        if not os.path.exists(blob_path):
+            return None
+        try:
+            with gzip.open(blob_path, 'rb') as f:
+                return codec.loads(f.read()).get("raw_doc")
         except Exception as e:
-            logger.error(f"删除Python脚本失败: {e}")
-            return False
+            logger.error(f"读取集合冷数据失败: {blob_path}: {e}")
+            return None
+    
+    def load_testcases(self) -> Dict[str, Any]:
+        """
+        读取所有测试用例：各分片快照重放其日志后合并，旧版 testcases.json 中的记录覆盖同键的分片记录
+        
+        Returns:
+            测试用例数据字典，旧版记录可能内嵌 python_code
+        """
+        shards = set(JSONStorage._list_shards(self.testcases_dir)) | \
+            set(JSONStorage._list_shards(self.testcases_dir, ".journal"))
+        
+        testcases = {}
+        for collection_id in sorted(shards):
+            shard = JSONStorage._read_testcase_snapshot(os.path.join(self.testcases_dir, f"{collection_id}.json"))
+            journal_path = os.path.join(self.testcases_dir, f"{collection_id}.journal")
+            if os.path.exists(journal_path):
+                JSONStorage._replay_journal(journal_path, 0, shard)
+            testcases.update(shard)
+        
+        if os.path.exists(self.testcases_file):
+            testcases.update(JSONStorage._read_legacy_file(self.testcases_file, "testcases"))
+        return testcases
+
+
+def create_storage(backend: str = "json", storage_dir: str = "data", db_path: Optional[str] = None,
+                   write_behind_delay: float = 0, testcase_journal: bool = False, storage_format: str = "json",
+                   cache_max_bytes: Optional[int] = None):
+    """
+    根据配置创建存储实例
+    
+    Args:
+        backend: 存储后端，json 或 sqlite
+        storage_dir: 存储目录路径
+        db_path: SQLite数据库路径（仅sqlite后端，默认 <storage_dir>/storage.db）
+        write_behind_delay: 延迟写入窗口（秒，仅json后端）
+        testcase_journal: 是否开启测试用例日志模式（仅json后端，sqlite后端的WAL日志已是追加写入）
+        storage_format: 数据文件落盘格式 json/compact/msgpack（仅json后端）
+        cache_max_bytes: 内存缓存上限（字节，仅json后端，默认 JSONStorage.CACHE_MAX_BYTES）
+    
+    Returns:
+        JSONStorage 或 SQLiteStorage 实例
+    
+    Raises:
+        ValueError: 不支持的存储后端或落盘格式
+    """
+    if backend == "json":
+        return JSONStorage(storage_dir, write_behind_delay=write_behind_delay, testcase_journal=testcase_journal,
+                           storage_format=storage_format, cache_max_bytes=cache_max_bytes)
+    if backend == "sqlite":
+        from app.sqlite_storage import SQLiteStorage
+        return SQLiteStorage(db_path or os.path.join(storage_dir, "storage.db"), storage_dir=storage_dir)
+    raise ValueError(f"不支持的存储后端: {backend}")
+
+
+def start_garbage_collector(target, interval: float = 0, run_at_startup: bool = False) -> Optional[threading.Thread]:
+    """
+    在后台线程中清理孤立数据（见 collect_garbage）
+    
+    Args:
+        target: 存储实例（JSONStorage 或 SQLiteStorage）
+        interval: 定时清理的间隔（秒），为0时不定时清理
+        run_at_startup: 是否在启动后立即清理一次
+    
+    Returns:
+        后台线程，未启用清理时返回None
+    """
+    if interval <= 0 and not run_at_startup:
+        return None
+    
+    def run():
+        if not run_at_startup:
+            time.sleep(interval)
+        while True:
+            try:
+                target.collect_garbage()
+            except Exception as e:
+                logger.error(f"孤立数据清理失败: {e}")
+            if interval <= 0:
+                return
+            time.sleep(interval)
+    
+    thread = threading.Thread(target=run, name="storage-gc", daemon=True)
+    thread.start()
+    return thread
+
+# 默认存储实例（首次调用 get_storage 时创建，导入模块时不访问磁盘）
+_default_storage: Optional[JSONStorage] = None
+_default_storage_lock = threading.Lock()
+
+
+def get_storage() -> JSONStorage:
+    """
+    获取默认存储实例（data 目录下的JSON存储），首次调用时才创建目录并迁移旧版布局
+    
+    Returns:
+        JSONStorage 实例
+    """
+    global _default_storage
+    with _default_storage_lock:
+        if _default_storage is None:
+            _default_storage = JSONStorage()
+        return _default_storage
 
 
-# 全局存储实例
-storage = JSONStorage()
\ No newline at end of file
+def __getattr__(name: str):
+    """兼容旧代码的 `from app.storage import storage`：访问 storage 时才创建默认存储实例"""
+    if name == "storage":
+        return get_storage()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
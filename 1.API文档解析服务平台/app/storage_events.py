@@ -0,0 +1,44 @@
+"""
+存储数据变更通知
+存储在写入成功并释放锁后通知已注册的监听器，派生的内存索引（接口搜索、分面筛选）据此只更新受影响的部分，
+不需要在每次查询前对比全部集合；其他进程写入的数据仍由各索引按集合版本号或文件标识发现
+
+事件：
+    - COLLECTION: 集合被新增、替换或删除，collection_id 为None表示全部集合被替换
+    - INTERFACE: 接口被新增、更新或删除（监听器按接口ID重新读取，读取不到即已删除）
+    - TESTCASE: 测试用例或Python脚本被保存、删除，interface_ids 为None表示集合（或全部集合）的所有接口
+"""
+import logging
+from typing import Callable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "collection"
+INTERFACE = "interface"
+TESTCASE = "testcase"
+
+# listener(event, collection_id, interface_ids)
+Listener = Callable[[str, Optional[str], Optional[List[str]]], None]
+
+
+class ChangeNotifier:
+    """存储数据变更通知（JSONStorage / SQLiteStorage 共用），子类需在初始化时设置 self._listeners = []"""
+    
+    def add_listener(self, listener: Listener):
+        """
+        注册数据变更监听器（在写入数据的线程中、释放存储锁后调用，不应执行耗时操作）
+        
+        Args:
+            listener: 回调 listener(event, collection_id, interface_ids)
+        """
+        self._listeners.append(listener)
+    
+    def _notify(self, event: str, collection_id: Optional[str] = None, interface_ids: Optional[Iterable] = None):
+        """通知所有监听器，监听器抛出的异常只记录日志，不影响写入结果"""
+        if interface_ids is not None:
+            interface_ids = [str(interface_id) for interface_id in interface_ids]
+        for listener in list(self._listeners):
+            try:
+                listener(event, collection_id, interface_ids)
+            except Exception as e:
+                logger.error(f"数据变更通知处理失败: {event} {collection_id}: {e}")
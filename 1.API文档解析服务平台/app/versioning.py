@@ -0,0 +1,97 @@
+"""
+记录版本号（乐观并发控制）
+集合和接口各自带有 _version 字段，每次修改后加1，没有该字段的旧数据视为版本1；
+更新时可以传入期望的版本号，与当前版本不一致说明读取后已被其他人修改，存储层抛出 VersionConflict，
+由调用方（如 PUT /api/interface 的 If-Match）提示冲突，不同接口的修改无需互相等待
+"""
+from typing import Dict, Any, Optional, List
+
+VERSION_FIELD = "_version"
+
+
+class VersionConflict(Exception):
+    """期望的版本号与当前版本不一致"""
+    
+    def __init__(self, current_version: int, expected_version: int):
+        super().__init__(f"版本冲突: 期望版本 {expected_version}，当前版本 {current_version}")
+        self.current_version = current_version
+        self.expected_version = expected_version
+
+
+def record_version(record: Optional[Dict[str, Any]]) -> int:
+    """
+    读取集合或接口的版本号
+    
+    Args:
+        record: 集合或接口数据
+    
+    Returns:
+        版本号，缺少或不合法时视为1
+    """
+    version = record.get(VERSION_FIELD) if record else None
+    if isinstance(version, int) and not isinstance(version, bool) and version > 0:
+        return version
+    return 1
+
+
+def check_version(record: Dict[str, Any], expected_version: Optional[int]):
+    """
+    检查期望的版本号
+    
+    Args:
+        record: 当前的集合或接口数据
+        expected_version: 期望的版本号，为None时不检查
+    
+    Raises:
+        VersionConflict: 版本号不一致
+    """
+    if expected_version is None:
+        return
+    current_version = record_version(record)
+    if current_version != expected_version:
+        raise VersionConflict(current_version, expected_version)
+
+
+def bump_version(record: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> int:
+    """
+    设置修改后的版本号（原地修改）：在 previous（默认为 record 自身）的版本上加1，
+    忽略调用方传入的 _version
+    
+    Args:
+        record: 修改后的集合或接口数据
+        previous: 修改前的数据，为None时使用 record 当前的版本
+    
+    Returns:
+        新的版本号
+    """
+    version = record_version(previous if previous is not None else record) + 1
+    record[VERSION_FIELD] = version
+    return version
+
+
+def stamp_interface_versions(old_interfaces: Optional[List[Dict[str, Any]]], interfaces: List[Dict[str, Any]]):
+    """
+    整体保存集合时设置各接口的版本号（原地修改）：新增的接口为1，
+    内容有变化的接口在原版本上加1，未变化的接口保持原版本
+    
+    Args:
+        old_interfaces: 修改前的接口列表
+        interfaces: 修改后的接口列表
+    """
+    old = {str(interface.get("id")): interface for interface in old_interfaces or []}
+    for interface in interfaces:
+        previous = old.get(str(interface.get("id")))
+        if previous is None:
+            interface[VERSION_FIELD] = 1
+        elif _without_version(previous) == _without_version(interface):
+            if VERSION_FIELD in previous:
+                interface[VERSION_FIELD] = previous[VERSION_FIELD]
+            else:
+                interface.pop(VERSION_FIELD, None)
+        else:
+            bump_version(interface, previous)
+
+
+def _without_version(record: Dict[str, Any]) -> Dict[str, Any]:
+    """去掉版本号后的数据，用于比较内容是否变化"""
+    return {k: v for k, v in record.items() if k != VERSION_FIELD}
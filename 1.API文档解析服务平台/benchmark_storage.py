@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+存储落盘格式性能对比脚本
+
+对比当前格式（标准库 json 缩进2格）与 app.codec 提供的各格式的编码/解码耗时和文件大小，
+以及 JSONStorage 按各格式保存、冷启动加载全部集合的耗时
+
+用法:
+    python benchmark_storage.py                      # 生成 200 个集合 x 50 个接口的模拟数据
+    python benchmark_storage.py --collections 50 --interfaces 200
+    python benchmark_storage.py --data-dir data      # 使用已有数据目录中的集合
+"""
+import argparse
+import json
+import logging
+import shutil
+import tempfile
+import time
+
+from app import codec
+from app.storage import JSONStorage
+
+
+def build_sample(collection_count: int, interface_count: int) -> dict:
+    """生成模拟的集合数据"""
+    collections = {}
+    for c in range(collection_count):
+        interfaces = []
+        for i in range(interface_count):
+            interfaces.append({
+                "id": f"if-{c}-{i}",
+                "name": f"接口{i} 查询订单详情",
+                "method": ("GET", "POST", "PUT", "DELETE")[i % 4],
+                "path": f"/api/v1/orders/{i}/items/{{item_id}}",
+                "tags": [f"模块{i % 7}"],
+                "description": "根据订单ID查询订单详情，返回订单基本信息、商品列表和物流状态" * 3,
+                "parameters": [
+                    {"name": "item_id", "in": "path", "required": True, "type": "string", "description": "商品ID"},
+                    {"name": "page", "in": "query", "required": False, "type": "integer", "default": 1}
+                ],
+                "request_body": {"content_type": "application/json", "schema": {"type": "object", "properties": {
+                    "amount": {"type": "number", "example": 12.5}, "remark": {"type": "string"}}}},
+                "responses": {"200": {"description": "成功", "schema": {"type": "object"}}},
+                "deprecated": i % 25 == 0
+            })
+        collections[f"c{c:05d}"] = {
+            "title": f"示例集合{c}",
+            "description": "性能测试数据",
+            "version": "1.0.0",
+            "base_url": "https://api.example.com",
+            "interfaces": interfaces,
+            "_created_at": "2024-01-01T00:00:00",
+            "_updated_at": "2024-01-01T00:00:00"
+        }
+    return collections
+
+
+def timed(func, repeat: int) -> float:
+    """执行 repeat 次，返回最短耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench_codec(collections: dict, repeat: int):
+    """对比各格式编码/解码整份数据的耗时和大小"""
+    payload = {"_metadata": {"collection_count": len(collections)}, "collections": collections}
+    baseline = json.dumps(payload, ensure_ascii=False, indent=2).encode('utf-8')
+    
+    rows = [(
+        "当前格式（标准库json缩进）",
+        timed(lambda: json.dumps(payload, ensure_ascii=False, indent=2).encode('utf-8'), repeat),
+        timed(lambda: json.loads(baseline.decode('utf-8')), repeat),
+        len(baseline)
+    )]
+    for fmt in available_formats():
+        content = codec.dumps(payload, fmt)
+        rows.append((
+            f"{fmt}（{codec.msgpack_backend() if fmt == 'msgpack' else codec.json_backend()}）",
+            timed(lambda: codec.dumps(payload, fmt), repeat),
+            timed(lambda: codec.loads(content), repeat),
+            len(content)
+        ))
+    
+    print(f"\n编码/解码（{len(collections)} 个集合，取 {repeat} 次中的最短耗时）")
+    print(f"{'格式':<28}{'编码(ms)':>12}{'解码(ms)':>12}{'大小(KB)':>12}")
+    for name, dump_ms, load_ms, size in rows:
+        print(f"{name:<28}{dump_ms:>12.1f}{load_ms:>12.1f}{size / 1024:>12.1f}")
+
+
+def bench_storage(collections: dict, repeat: int):
+    """对比 JSONStorage 按各格式保存、冷启动加载全部集合的耗时"""
+    print(f"\nJSONStorage 保存/加载全部集合（取 {repeat} 次中的最短耗时）")
+    print(f"{'格式':<28}{'保存(ms)':>12}{'加载(ms)':>12}")
+    for fmt in available_formats():
+        storage_dir = tempfile.mkdtemp(prefix=f"bench_{fmt}_")
+        try:
+            target = JSONStorage(storage_dir, storage_format=fmt)
+            save_ms = timed(lambda: target.save_collections(collections), repeat)
+            # 每次使用新的实例，避免命中内存缓存
+            load_ms = timed(lambda: JSONStorage(storage_dir, storage_format=fmt).load_collections(), repeat)
+            print(f"{fmt:<28}{save_ms:>12.1f}{load_ms:>12.1f}")
+        finally:
+            shutil.rmtree(storage_dir, ignore_errors=True)
+
+
+def available_formats():
+    """当前环境可用的落盘格式"""
+    return [fmt for fmt in codec.FORMATS if fmt != "msgpack" or codec.msgpack_backend()]
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="对比存储落盘格式的性能")
+    arg_parser.add_argument("--data-dir", default=None, help="使用已有JSON数据目录中的集合（默认生成模拟数据）")
+    arg_parser.add_argument("--collections", type=int, default=200, help="模拟数据的集合数（默认: 200）")
+    arg_parser.add_argument("--interfaces", type=int, default=50, help="模拟数据每个集合的接口数（默认: 50）")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="每项测试的重复次数（默认: 3）")
+    args = arg_parser.parse_args()
+    
+    logging.disable(logging.INFO)
+    if args.data_dir:
+        sample = JSONStorage(args.data_dir).load_collections()
+    else:
+        sample = build_sample(args.collections, args.interfaces)
+    
+    print(f"JSON实现: {codec.json_backend()}，MessagePack实现: {codec.msgpack_backend() or '未安装'}")
+    bench_codec(sample, args.repeat)
+    bench_storage(sample, args.repeat)
@@ -0,0 +1,60 @@
+"""
+测试公共配置：将服务目录加入导入路径，并提供临时目录下的存储实例和Flask测试客户端
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.storage import JSONStorage
+
+
+def sample_collection(interface_count: int = 3) -> dict:
+    """构造测试用的集合数据"""
+    return {
+        "title": "示例集合",
+        "base_url": "http://example.com",
+        "interfaces": [
+            {"id": str(i), "method": "GET", "path": f"/items/{i}", "summary": f"接口{i}", "tags": ["items"]}
+            for i in range(interface_count)
+        ]
+    }
+
+
+@pytest.fixture
+def make_collection():
+    """集合数据的构造函数 make_collection(interface_count=3)"""
+    return sample_collection
+
+
+@pytest.fixture
+def storage_dir(tmp_path):
+    """临时存储目录"""
+    return str(tmp_path / "data")
+
+
+@pytest.fixture
+def journal_storage(storage_dir):
+    """开启测试用例日志模式的JSON存储"""
+    return JSONStorage(storage_dir, testcase_journal=True)
+
+
+@pytest.fixture
+def flask_app(storage_dir):
+    """使用临时存储目录的Flask应用（未配置Dify）"""
+    from app import create_app
+    return create_app({"STORAGE_DIR": storage_dir, "TESTING": True})
+
+
+@pytest.fixture
+def client(flask_app):
+    """Flask测试客户端"""
+    return flask_app.test_client()
+
+
+@pytest.fixture
+def api_storage(flask_app):
+    """Flask应用使用的存储实例"""
+    return flask_app.config["STORAGE"]
@@ -0,0 +1,89 @@
+"""
+JSON存储的内存缓存：命中、mtime失效、按大小的LRU淘汰
+"""
+import os
+
+from app import storage as storage_module
+from app.storage import JSONStorage
+
+
+def test_repeated_reads_hit_cache(storage_dir, make_collection):
+    storage = JSONStorage(storage_dir)
+    collection_id = storage.add_collection(make_collection())
+    
+    first = storage.get_collection(collection_id)
+    hits = storage.get_cache_stats()["hits"]
+    second = storage.get_collection(collection_id)
+    
+    assert second is first
+    assert storage.get_cache_stats()["hits"] == hits + 1
+
+
+def test_write_through_updates_cache(storage_dir, make_collection):
+    storage = JSONStorage(storage_dir)
+    collection_id = storage.add_collection(make_collection())
+    storage.get_collection(collection_id)
+    misses = storage.get_cache_stats()["misses"]
+    
+    assert storage.update_interface(collection_id, "1", {"method": "POST", "path": "/changed"})
+    
+    assert storage.get_interface(collection_id, "1")["path"] == "/changed"
+    # 写穿缓存，读取自己的写入不需要重新加载文件
+    assert storage.get_cache_stats()["misses"] == misses
+
+
+def test_external_write_invalidates_cache(storage_dir, make_collection):
+    reader = JSONStorage(storage_dir)
+    collection_id = reader.add_collection(make_collection())
+    assert reader.get_interface(collection_id, "1")["path"] == "/items/1"
+    
+    # 另一个实例（模拟另一个进程）修改了分片文件，mtime/size 变化后缓存失效
+    writer = JSONStorage(storage_dir)
+    writer.update_interface(collection_id, "1", {"method": "GET", "path": "/items/1/changed-by-writer"})
+    
+    assert reader.get_interface(collection_id, "1")["path"] == "/items/1/changed-by-writer"
+
+
+def test_module_storage_alias_is_lazy(storage_dir, monkeypatch):
+    default = JSONStorage(storage_dir)
+    monkeypatch.setattr(storage_module, "_default_storage", default)
+    
+    from app.storage import storage
+    
+    assert storage is default
+    assert storage_module.get_storage() is default
+
+
+def test_lru_evicts_least_recently_used_shard(storage_dir, make_collection):
+    writer = JSONStorage(storage_dir)
+    first, second, third = (writer.add_collection(make_collection(20)) for _ in range(3))
+    shard_size = os.path.getsize(writer._collection_path(first))
+    storage = JSONStorage(storage_dir, cache_max_bytes=int(shard_size * 2.5))
+    
+    storage.get_collection(first)
+    storage.get_collection(second)
+    storage.get_collection(first)
+    storage.get_collection(third)
+    
+    stats = storage.get_cache_stats()
+    assert stats["evictions"] >= 1
+    assert stats["resident_bytes"] <= stats["max_bytes"]
+    
+    # first 最近被访问过，仍在缓存中；second 最久未使用，已被淘汰
+    misses = storage.get_cache_stats()["misses"]
+    storage.get_collection(first)
+    assert storage.get_cache_stats()["misses"] == misses
+    storage.get_collection(second)
+    assert storage.get_cache_stats()["misses"] == misses + 1
+
+
+def test_file_larger_than_cache_is_not_cached(storage_dir, make_collection):
+    collection_id = JSONStorage(storage_dir).add_collection(make_collection(20))
+    storage = JSONStorage(storage_dir, cache_max_bytes=100)
+    
+    assert len(storage.get_collection(collection_id)["interfaces"]) == 20
+    assert storage.get_collection(collection_id) is not None
+    
+    stats = storage.get_cache_stats()
+    assert stats["resident_bytes"] <= 100
+    assert stats["hits"] == 0
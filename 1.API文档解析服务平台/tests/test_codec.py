@@ -0,0 +1,74 @@
+"""
+存储序列化编解码（app/codec.py）
+"""
+import pytest
+
+from app import codec
+from app.storage import JSONStorage
+
+DATA = {
+    "title": "中文标题",
+    "count": 3,
+    "ratio": 0.5,
+    "enabled": True,
+    "missing": None,
+    "tags": ["a", "标签"],
+    "nested": {"list": [1, {"key": "value"}], "empty": {}}
+}
+
+requires_msgpack = pytest.mark.skipif(codec.msgpack_backend() is None, reason="未安装 msgspec 或 msgpack")
+
+
+@pytest.mark.parametrize("fmt", ["json", "compact"])
+def test_json_round_trip(fmt):
+    content = codec.dumps(DATA, fmt)
+    
+    assert codec.detect_format(content) == "json"
+    assert codec.loads(content) == DATA
+    # 中文不转义
+    assert "中文标题".encode("utf-8") in content
+
+
+def test_compact_is_smaller_than_indented():
+    assert len(codec.dumps(DATA, "compact")) < len(codec.dumps(DATA, "json"))
+
+
+def test_loads_accepts_leading_whitespace_and_bom():
+    assert codec.loads(b"\xef\xbb\xbf \n" + codec.dumps(DATA, "compact")) == DATA
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        codec.dumps(DATA, "xml")
+    with pytest.raises(ValueError):
+        codec.check_format("xml")
+
+
+@requires_msgpack
+def test_msgpack_round_trip():
+    content = codec.dumps(DATA, "msgpack")
+    
+    assert codec.detect_format(content) == "msgpack"
+    assert codec.loads(content) == DATA
+
+
+@requires_msgpack
+def test_msgpack_falls_back_to_json_for_big_integers():
+    data = {"big": 2 ** 70}
+    content = codec.dumps(data, "msgpack")
+    
+    assert codec.detect_format(content) == "json"
+    assert codec.loads(content)["big"] == pytest.approx(2 ** 70)
+
+
+@pytest.mark.parametrize("fmt", ["json", "compact"] + (["msgpack"] if codec.msgpack_backend() else []))
+def test_storage_reads_files_written_in_another_format(storage_dir, make_collection, fmt):
+    """切换落盘格式后旧文件仍可读取"""
+    writer = JSONStorage(storage_dir, storage_format=fmt)
+    collection_id = writer.add_collection(make_collection())
+    writer.save_testcase(collection_id, "1", json_content='{"cases": []}')
+    
+    reader = JSONStorage(storage_dir, storage_format="compact" if fmt != "compact" else "json")
+    
+    assert reader.get_collection(collection_id)["interfaces"] == writer.get_collection(collection_id)["interfaces"]
+    assert reader.get_testcase(collection_id, "1")["json_content"] == '{"cases": []}'
@@ -0,0 +1,107 @@
+"""
+DifyClient 的重试配置：只重试服务端尚未处理请求的情况，502 和读超时不重新发送 POST
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.dify_client import DifyClient, RETRY_STATUS_CODES
+
+
+class FakeDifyServer:
+    """本地 HTTP 服务，按顺序返回预设的状态码（"slow" 表示超过读超时后才响应），记录收到的 POST 次数"""
+    
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.posts = 0
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                server.posts += 1
+                reply = server.replies.pop(0) if server.replies else 200
+                if reply == "slow":
+                    time.sleep(0.5)
+                    reply = 200
+                body = json.dumps({"outputs": {"text": '[{"test_case_id": "TC1"}]'}}).encode("utf-8")
+                self.send_response(reply)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if reply in RETRY_STATUS_CODES:
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/workflow"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+    
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def dify_server():
+    servers = []
+    
+    def start(*replies):
+        servers.append(FakeDifyServer(replies))
+        return servers[-1]
+    
+    yield start
+    for server in servers:
+        server.close()
+
+
+def make_client(url, **kwargs):
+    return DifyClient("key", url, "key", url, **kwargs)
+
+
+def generate(client):
+    return client.generate_json_testcases({"interface": {"id": "1"}, "collection_info": {"id": "c1"}})
+
+
+def test_retry_policy():
+    retry = make_client("http://dify.local/workflow").session.get_adapter("http://dify.local").max_retries
+    
+    assert tuple(retry.status_forcelist) == RETRY_STATUS_CODES == (429, 503)
+    assert retry.allowed_methods is None
+    assert retry.read is False
+    assert retry.is_retry("POST", 503) and retry.is_retry("POST", 429)
+    assert not retry.is_retry("POST", 502)
+
+
+def test_post_is_not_resent_on_502(dify_server):
+    server = dify_server(502)
+    
+    result = generate(make_client(server.url))
+    
+    assert result["success"] is False
+    assert server.posts == 1
+
+
+def test_post_is_resent_on_503(dify_server):
+    server = dify_server(503, 429)
+    
+    result = generate(make_client(server.url))
+    
+    assert result["success"] is True
+    assert server.posts == 3
+
+
+def test_post_is_not_resent_on_read_timeout(dify_server):
+    server = dify_server("slow")
+    
+    result = generate(make_client(server.url, read_timeout=0.1))
+    
+    assert result == {"success": False, "error": "请求超时，请稍后重试"}
+    time.sleep(0.5)
+    assert server.posts == 1
@@ -0,0 +1,102 @@
+"""
+接口分面筛选索引：筛选结果、计数与写入后的增量更新
+"""
+import os
+
+import pytest
+
+from app.facet_index import FacetIndex
+from app.sqlite_storage import SQLiteStorage
+from app.storage import JSONStorage
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def open_storage(request, storage_dir):
+    """打开同一数据目录的存储实例（多次调用相当于多个进程）"""
+    def open_instance():
+        if request.param == "sqlite":
+            return SQLiteStorage(os.path.join(storage_dir, "storage.db"), storage_dir=storage_dir)
+        return JSONStorage(storage_dir)
+    return open_instance
+
+
+def mixed_collection():
+    return {
+        "title": "订单服务",
+        "base_url": "http://example.com",
+        "interfaces": [
+            {"id": "a", "method": "GET", "path": "/orders", "tags": ["order"]},
+            {"id": "b", "method": "POST", "path": "/orders", "tags": ["order"]},
+            {"id": "c", "method": "GET", "path": "/users", "tags": ["user"], "deprecated": True},
+            {"id": "d", "method": "DELETE", "path": "/users/{id}", "tags": ["user", "admin"]}
+        ]
+    }
+
+
+def matched_ids(result):
+    return [row["interface_id"] for row in result["interfaces"]]
+
+
+def test_filters_and_counts(open_storage):
+    storage = open_storage()
+    index = FacetIndex(storage)
+    collection_id = storage.add_collection(mixed_collection())
+    
+    result = index.query(collection_id, {"method": ["get", "delete"], "tag": ["user"]})
+    
+    assert matched_ids(result) == ["c", "d"]
+    assert result["interface_count"] == 4
+    # 计数不应用该筛选项自身的条件
+    assert result["facets"]["method"] == {"GET": 1, "POST": 0, "DELETE": 1}
+    assert result["facets"]["tag"] == {"order": 1, "user": 2, "admin": 1}
+    assert result["facets"]["deprecated"] == {"true": 1, "false": 1}
+    assert index.query("missing", {}) is None
+
+
+def test_interface_writes_update_bitmaps(open_storage):
+    storage = open_storage()
+    index = FacetIndex(storage)
+    collection_id = storage.add_collection(mixed_collection())
+    index.query(collection_id, {})
+    
+    storage.delete_interface(collection_id, "a")
+    storage.update_interface(collection_id, "d", {"method": "PUT", "path": "/users/{id}", "tags": ["user"]})
+    storage.add_interface(collection_id, {"id": "e", "method": "GET", "path": "/reports", "tags": ["report"]})
+    
+    assert matched_ids(index.query(collection_id, {})) == ["b", "c", "d", "e"]
+    assert matched_ids(index.query(collection_id, {"method": ["GET"]})) == ["c", "e"]
+    assert matched_ids(index.query(collection_id, {"method": ["put"], "tag": ["user"]})) == ["d"]
+    # 已没有接口的标签不再出现
+    assert "admin" not in index.query(collection_id, {})["facets"]["tag"]
+
+
+def test_testcase_writes_update_bitmaps(open_storage):
+    storage = open_storage()
+    index = FacetIndex(storage)
+    collection_id = storage.add_collection(mixed_collection())
+    assert matched_ids(index.query(collection_id, {"has_testcase": ["true"]})) == []
+    
+    storage.save_testcase(collection_id, "b", json_content="{}")
+    storage.save_python_script(collection_id, "c", "print('c')")
+    
+    assert matched_ids(index.query(collection_id, {"has_testcase": ["true"]})) == ["b", "c"]
+    assert matched_ids(index.query(collection_id, {"has_python_script": ["yes"]})) == ["c"]
+    
+    storage.delete_testcase(collection_id, "b")
+    
+    assert matched_ids(index.query(collection_id, {"has_testcase": ["false"]})) == ["a", "b", "d"]
+
+
+def test_writes_from_other_process_are_found(open_storage):
+    storage = open_storage()
+    index = FacetIndex(storage)
+    collection_id = storage.add_collection(mixed_collection())
+    index.query(collection_id, {})
+    
+    other = open_storage()
+    other.update_interface(collection_id, "b", {"method": "PATCH", "path": "/orders", "tags": ["order"]})
+    other.save_testcase(collection_id, "a", json_content="{}")
+    
+    result = index.query(collection_id, {"method": ["PATCH"]})
+    assert matched_ids(result) == ["b"]
+    assert matched_ids(index.query(collection_id, {"has_testcase": ["true"]})) == ["a"]
@@ -0,0 +1,114 @@
+"""
+跨进程文件锁（app/file_lock.py）与多实例并发写入
+"""
+import os
+import threading
+
+import pytest
+
+from app.file_lock import FileLock
+from app.storage import JSONStorage
+
+
+@pytest.fixture
+def lock(tmp_path):
+    return FileLock(str(tmp_path / "data.json"))
+
+
+def test_shared_locks_are_held_concurrently(lock):
+    barrier = threading.Barrier(3, timeout=5)
+    
+    def reader():
+        with lock.acquire(exclusive=False):
+            # 三个线程都在共享锁内才能通过屏障
+            barrier.wait()
+    
+    threads = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    with lock.acquire(exclusive=False):
+        barrier.wait()
+    for thread in threads:
+        thread.join(5)
+    
+    assert lock.get_stats()["acquire_count"] == 3
+
+
+def test_exclusive_lock_waits_for_readers(lock):
+    events = []
+    reading = threading.Event()
+    
+    def writer():
+        reading.wait(5)
+        with lock.acquire(exclusive=True):
+            events.append("write")
+    
+    thread = threading.Thread(target=writer)
+    thread.start()
+    with lock.acquire(exclusive=False):
+        reading.set()
+        thread.join(0.2)
+        events.append("read done")
+    thread.join(5)
+    
+    assert events == ["read done", "write"]
+
+
+def test_nested_acquire_and_no_upgrade(lock):
+    with lock.acquire(exclusive=True):
+        with lock.acquire(exclusive=False):
+            with lock.acquire(exclusive=True):
+                pass
+    
+    with lock.acquire(exclusive=False):
+        with pytest.raises(RuntimeError):
+            with lock.acquire(exclusive=True):
+                pass
+    
+    # 升级失败后共享锁已释放，可以正常获取排他锁
+    with lock.acquire(exclusive=True):
+        pass
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="需要 fcntl.flock")
+def test_exclusive_lock_waits_for_other_process(lock):
+    import fcntl
+    
+    # 另外打开的文件描述符与其他进程持有的 flock 行为一致
+    fd = os.open(lock.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    fcntl.flock(fd, fcntl.LOCK_SH)
+    acquired = threading.Event()
+    
+    def writer():
+        with lock.acquire(exclusive=True):
+            acquired.set()
+    
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        assert not acquired.wait(0.2)
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+    
+    assert acquired.wait(5)
+    thread.join(5)
+    assert lock.get_stats()["max_wait_ms"] >= 100
+
+
+def test_concurrent_writers_do_not_lose_updates(storage_dir, make_collection):
+    collection_id = JSONStorage(storage_dir).add_collection(make_collection())
+    # 每个线程使用独立的存储实例，相当于各自的 gunicorn worker 进程
+    workers = [JSONStorage(storage_dir) for _ in range(4)]
+    
+    def save(worker_index):
+        for i in range(5):
+            workers[worker_index].save_testcase(collection_id, f"{worker_index}-{i}", json_content="{}")
+    
+    threads = [threading.Thread(target=save, args=(index,)) for index in range(len(workers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    
+    assert len(JSONStorage(storage_dir).list_testcases(collection_id)) == 20
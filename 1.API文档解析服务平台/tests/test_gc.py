@@ -0,0 +1,57 @@
+"""
+孤立数据清理（collect_garbage），JSON 与 SQLite 存储的统计口径一致
+"""
+import os
+
+import pytest
+
+from app.sqlite_storage import SQLiteStorage
+from app.storage import JSONStorage
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, storage_dir):
+    if request.param == "sqlite":
+        return SQLiteStorage(os.path.join(storage_dir, "storage.db"), storage_dir=storage_dir)
+    return JSONStorage(storage_dir)
+
+
+def test_orphans_of_deleted_collection_are_collected(storage, make_collection):
+    kept = storage.add_collection(make_collection(1))
+    removed = storage.add_collection(make_collection(2))
+    storage.save_testcase(kept, "0", json_content='{"kept": true}')
+    storage.save_python_script(kept, "0", "print('kept')")
+    storage.save_testcase(removed, "0", json_content='{"removed": true}')
+    storage.save_python_script(removed, "1", "print('removed')")
+    script_path = storage.get_python_script(removed, "1")["python_script_path"]
+    script_size = os.path.getsize(script_path)
+    storage.delete_collection(removed)
+    
+    preview = storage.collect_garbage(dry_run=True)
+    
+    assert preview["testcases"] == 2
+    assert preview["python_scripts"] == 1
+    # 除脚本文件外，还包括被删除的测试用例和Python脚本记录
+    assert preview["bytes_freed"] > script_size + len('{"removed": true}')
+    assert os.path.exists(script_path)
+    
+    report = storage.collect_garbage()
+    
+    assert dict(report, dry_run=True) == preview
+    assert not os.path.exists(script_path)
+    assert storage.get_python_script(kept, "0")["python_code"] == "print('kept')"
+    assert storage.collect_garbage()["bytes_freed"] == 0
+
+
+def test_deleted_script_record_is_counted(storage, make_collection):
+    collection_id = storage.add_collection(make_collection(2))
+    storage.save_python_script(collection_id, "1", "print('only a script')")
+    script_path = storage.get_python_script(collection_id, "1")["python_script_path"]
+    script_size = os.path.getsize(script_path)
+    storage.delete_interface(collection_id, "1")
+    
+    report = storage.collect_garbage()
+    
+    assert report["python_scripts"] == 1
+    # 脚本文件和引用它的记录（至少包含脚本路径）
+    assert report["bytes_freed"] >= script_size + len(script_path)
@@ -0,0 +1,83 @@
+"""
+生成结果缓存：缓存键的规范化、有效期和数量上限
+"""
+from app import generation_cache
+from app.dify_client import DifyClient
+from app.generation_cache import GenerationCache, canonicalize, canonicalize_yaml, make_cache_key
+
+
+def json_testcase_key(interface, collection_info=None, prompt_version="1", url="http://dify.local/workflow"):
+    client = DifyClient("key", url, "key", "http://dify.local/python", prompt_version=prompt_version)
+    return client._testcase_cache_key({"interface": interface, "collection_info": collection_info or {"title": "示例"}})
+
+
+def test_metadata_and_key_order_do_not_change_key():
+    interface = {"id": "1", "method": "GET", "path": "/items", "params": {"a": 1, "b": 2}}
+    reimported = {"_version": 3, "_updated_at": "2026-01-01", "params": {"b": 2, "a": 1}, "path": "/items",
+                  "method": "GET", "id": "other-id"}
+    
+    assert json_testcase_key(interface) == json_testcase_key(reimported)
+    assert json_testcase_key(interface, {"id": "c1", "title": "示例"}) == json_testcase_key(interface, {"id": "c2", "title": "示例"})
+
+
+def test_generation_inputs_change_key():
+    interface = {"method": "GET", "path": "/items"}
+    key = json_testcase_key(interface)
+    
+    assert json_testcase_key(dict(interface, path="/orders")) != key
+    assert json_testcase_key(interface, {"title": "其他集合"}) != key
+    assert json_testcase_key(interface, prompt_version="2") != key
+    assert json_testcase_key(interface, url="http://dify.local/other") != key
+    assert make_cache_key("python_script", canonicalize(interface)) != make_cache_key("json_testcases", canonicalize(interface))
+
+
+def test_yaml_formatting_and_volatile_fields_are_ignored():
+    compact = "name: 查询\nsteps: [{method: GET, url: /items}]\ngenerated_at: '2026-01-01'\n"
+    expanded = "steps:\n  - url: /items\n    method: GET\nname: 查询\ngenerated_at: '2026-02-02'\n"
+    
+    assert canonicalize_yaml(compact) == canonicalize_yaml(expanded)
+    assert canonicalize_yaml("just text") == "just text"
+    assert canonicalize_yaml("a: [unclosed") == "a: [unclosed"
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(generation_cache.time, "time", lambda: now[0])
+    cache = GenerationCache(ttl_seconds=60)
+    cache.put("key", {"success": True})
+    
+    now[0] += 59
+    assert cache.get("key") == {"success": True}
+    now[0] += 2
+    assert cache.get("key") is None
+    
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["entries"]) == (1, 1, 1, 0)
+
+
+def test_zero_ttl_never_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(generation_cache.time, "time", lambda: now[0])
+    cache = GenerationCache(ttl_seconds=0)
+    cache.put("key", {"success": True})
+    
+    now[0] += 10 ** 9
+    assert cache.get("key") == {"success": True}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = GenerationCache(max_entries=2)
+    cache.put("a", {"value": "a"})
+    cache.put("b", {"value": "b"})
+    cache.get("a")
+    
+    cache.put("c", {"value": "c"})
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == {"value": "a"}
+    assert cache.get_stats()["evictions"] == 1
+    
+    disabled = GenerationCache(max_entries=0)
+    disabled.put("a", {"value": "a"})
+    assert disabled.get("a") is None
+    assert disabled.get_stats()["entries"] == 0
@@ -0,0 +1,196 @@
+"""
+测试用例生成任务队列：任务生命周期与批量生成（失败重试和指数退避）
+"""
+import threading
+import time
+
+import pytest
+
+from app import generation_jobs
+from app.generation_jobs import GenerationJobQueue, STATUS_COMPLETED, STATUS_FAILED, STATUS_SUCCEEDED
+from app.storage import JSONStorage
+
+
+class FakeDifyClient:
+    """按接口ID返回预设结果的 Dify 客户端；release 未设置时生成调用会一直阻塞"""
+    
+    def __init__(self, results=None, blocking=False):
+        self.results = results or {}
+        self.calls = []
+        self.release = threading.Event()
+        if not blocking:
+            self.release.set()
+    
+    def generate_json_testcases(self, interface_details, force_refresh=False):
+        interface_id = interface_details["interface"]["id"]
+        self.calls.append(interface_id)
+        self.release.wait(5)
+        outcome = self.results.get(interface_id, {"success": True, "json_content": f'{{"id": "{interface_id}"}}'})
+        if isinstance(outcome, list):
+            outcome = outcome.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def storage(storage_dir):
+    return JSONStorage(storage_dir)
+
+
+@pytest.fixture
+def queue(storage):
+    queue = GenerationJobQueue(storage, max_workers=2, max_finished=2)
+    yield queue
+    queue._executor.shutdown(wait=True)
+
+
+def details(interface_id):
+    return {"interface": {"id": interface_id}, "collection_info": {}}
+
+
+def test_job_succeeds_and_saves_testcase(queue, storage, make_collection):
+    collection_id = storage.add_collection(make_collection())
+    
+    job = queue.submit(FakeDifyClient(), collection_id, "1", details("1"))
+    assert job["status"] in ("queued", "running")
+    
+    finished = queue.wait(job["job_id"], timeout=5)
+    assert finished["status"] == STATUS_SUCCEEDED
+    assert finished["result"]["saved"] is True
+    assert finished["started_at"] and finished["finished_at"]
+    assert storage.get_testcase(collection_id, "1")["json_content"] == '{"id": "1"}'
+
+
+def test_duplicate_submit_returns_active_job(queue, storage, make_collection):
+    collection_id = storage.add_collection(make_collection())
+    client = FakeDifyClient(blocking=True)
+    
+    first = queue.submit(client, collection_id, "1", details("1"))
+    second = queue.submit(client, collection_id, "1", details("1"))
+    assert second["job_id"] == first["job_id"]
+    
+    client.release.set()
+    queue.wait(first["job_id"], timeout=5)
+    # 任务结束后再次提交会创建新任务
+    third = queue.submit(client, collection_id, "1", details("1"))
+    assert third["job_id"] != first["job_id"]
+    queue.wait(third["job_id"], timeout=5)
+    assert client.calls == ["1", "1"]
+
+
+@pytest.mark.parametrize("outcome, error", [
+    (RuntimeError("Dify 超时"), "Dify 超时"),
+    ("not a dict", "生成结果格式错误: str"),
+    ({"success": True, "json_content": ""}, "生成结果为空"),
+    ({"success": False, "error": "额度不足"}, "额度不足")
+])
+def test_failed_generation_finishes_job(queue, storage, make_collection, outcome, error):
+    collection_id = storage.add_collection(make_collection())
+    
+    job = queue.submit(FakeDifyClient({"1": outcome}), collection_id, "1", details("1"))
+    finished = queue.wait(job["job_id"], timeout=5)
+    
+    assert finished["status"] == STATUS_FAILED
+    assert finished["error"] == error
+    assert storage.get_testcase(collection_id, "1") is None
+    assert queue.get_stats()["running"] == 0
+
+
+def test_finished_jobs_are_trimmed(queue, storage, make_collection):
+    collection_id = storage.add_collection(make_collection())
+    client = FakeDifyClient()
+    
+    job_ids = []
+    for i in range(3):
+        job_ids.append(queue.submit(client, collection_id, str(i), details(str(i)))["job_id"])
+        queue.wait(job_ids[-1], timeout=5)
+    
+    assert queue.get(job_ids[0]) is None
+    assert queue.get(job_ids[2])["status"] == STATUS_SUCCEEDED
+    assert queue.get_stats()["finished"] == 2
+
+
+@pytest.fixture
+def retry_delays(monkeypatch):
+    """记录批量重试的退避秒数，并立即重新提交"""
+    delays = []
+    timer_class = threading.Timer
+    
+    def immediate_timer(interval, function, args=None, kwargs=None):
+        delays.append(interval)
+        return timer_class(0, function, args=args, kwargs=kwargs)
+    
+    monkeypatch.setattr(generation_jobs.threading, "Timer", immediate_timer)
+    return delays
+
+
+def wait_batch(queue, batch_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        progress = queue.get_batch(batch_id)
+        if progress["status"] == STATUS_COMPLETED:
+            return progress
+        time.sleep(0.01)
+    raise AssertionError(f"批量任务未结束: {queue.get_batch(batch_id)}")
+
+
+def collection_interfaces(storage, collection_id):
+    return storage.get_collection(collection_id)["interfaces"]
+
+
+def test_batch_generates_and_saves_in_batches(queue, storage, make_collection):
+    collection_id = storage.add_collection(make_collection(5))
+    storage.save_testcase(collection_id, "0", json_content="{}")
+    
+    progress = queue.submit_batch(FakeDifyClient(), collection_id, {}, collection_interfaces(storage, collection_id),
+                                  batch_size=2)
+    finished = wait_batch(queue, progress["batch_id"])
+    
+    assert (finished["total"], finished["skipped"], finished["succeeded"], finished["failed"]) == (5, 1, 4, 0)
+    assert finished["saved"] == 4
+    assert finished["remaining"] == 0 and finished["running"] == 0
+    assert storage.get_testcase(collection_id, "4")["json_content"] == '{"id": "4"}'
+    assert storage.get_testcase(collection_id, "0")["json_content"] == "{}"
+    assert queue.get_stats()["batches"] == 0
+
+
+def test_batch_retries_with_exponential_backoff(queue, storage, make_collection, retry_delays):
+    collection_id = storage.add_collection(make_collection(2))
+    client = FakeDifyClient({"1": [RuntimeError("超时"), {"success": False, "error": "限流"},
+                                   {"success": True, "json_content": "{}"}]})
+    
+    progress = queue.submit_batch(client, collection_id, {}, collection_interfaces(storage, collection_id), retries=2)
+    finished = wait_batch(queue, progress["batch_id"])
+    
+    assert finished["succeeded"] == 2 and finished["failed"] == 0
+    assert client.calls.count("1") == 3
+    assert retry_delays == [GenerationJobQueue.RETRY_DELAY, GenerationJobQueue.RETRY_DELAY * 2]
+
+
+def test_batch_records_failure_after_retries(queue, storage, make_collection, retry_delays):
+    collection_id = storage.add_collection(make_collection(2))
+    client = FakeDifyClient({"0": [{"success": False, "error": "限流"}] * 2})
+    
+    progress = queue.submit_batch(client, collection_id, {}, collection_interfaces(storage, collection_id), retries=1)
+    finished = wait_batch(queue, progress["batch_id"])
+    
+    assert finished["succeeded"] == 1 and finished["failed"] == 1
+    assert finished["failures"] == [{"interface_id": "0", "error": "限流"}]
+    assert client.calls.count("0") == 2
+    assert storage.get_testcase(collection_id, "0") is None
+
+
+def test_batch_submit_returns_active_batch_and_limits_concurrency(queue, storage, make_collection):
+    collection_id = storage.add_collection(make_collection(4))
+    interfaces = collection_interfaces(storage, collection_id)
+    client = FakeDifyClient(blocking=True)
+    
+    first = queue.submit_batch(client, collection_id, {}, interfaces, max_concurrency=1)
+    again = queue.submit_batch(client, collection_id, {}, interfaces)
+    assert again["batch_id"] == first["batch_id"]
+    assert first["running"] == 1 and first["remaining"] == 4
+    
+    client.release.set()
+    assert wait_batch(queue, first["batch_id"])["succeeded"] == 4
+    assert client.calls == ["0", "1", "2", "3"]
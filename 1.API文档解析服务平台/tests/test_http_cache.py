@@ -0,0 +1,56 @@
+"""
+读接口的条件请求（ETag / Last-Modified / 304）与接口详情 ETag 的 If-Match
+"""
+
+
+def put_interface(client, collection_id, interface_id, if_match=None, path="/changed"):
+    headers = {"If-Match": if_match} if if_match is not None else {}
+    return client.put(f"/api/interface/{collection_id}/{interface_id}", headers=headers,
+                      json={"interface": {"method": "PUT", "path": path}})
+
+
+def test_interface_detail_returns_304_until_changed(client, api_storage, make_collection):
+    collection_id = api_storage.add_collection(make_collection())
+    url = f"/api/interface/{collection_id}/1"
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+    
+    cached = client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+    assert client.get(url, headers={"If-Modified-Since": first.headers["Last-Modified"]}).status_code == 304
+    
+    # 集合信息变化（其他接口被修改）后详情响应中的集合信息可能不同，缓存失效
+    put_interface(client, collection_id, "0")
+    refreshed = client.get(url, headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["ETag"] != etag
+
+
+def test_if_match_ignores_edits_to_other_interfaces(client, api_storage, make_collection):
+    collection_id = api_storage.add_collection(make_collection())
+    etag = client.get(f"/api/interface/{collection_id}/0").headers["ETag"]
+    
+    assert put_interface(client, collection_id, "1").status_code == 200
+    response = put_interface(client, collection_id, "0", if_match=etag, path="/edited")
+    
+    assert response.status_code == 200
+    assert api_storage.get_interface(collection_id, "0")["path"] == "/edited"
+    assert client.get(f"/api/interface/{collection_id}/0").headers["ETag"] == response.headers["ETag"]
+
+
+def test_collection_list_and_interface_list_etags(client, api_storage, make_collection):
+    collection = make_collection()
+    # 接口列表返回解析器输出的完整字段
+    collection["interfaces"] = [dict(interface, description="") for interface in collection["interfaces"]]
+    collection_id = api_storage.add_collection(collection)
+    for url in ("/api/collections", f"/api/collection/{collection_id}/interfaces",
+                f"/api/collection/{collection_id}/interfaces?method=GET"):
+        etag = client.get(url).headers["ETag"]
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    
+    list_etag = client.get("/api/collections").headers["ETag"]
+    api_storage.add_collection(make_collection(1))
+    
+    assert client.get("/api/collections", headers={"If-None-Match": list_etag}).status_code == 200
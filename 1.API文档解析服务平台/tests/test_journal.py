@@ -0,0 +1,110 @@
+"""
+JSON存储的测试用例日志模式：崩溃后重放与压缩
+"""
+import os
+import time
+
+from app.storage import JSONStorage
+
+
+def test_journal_is_replayed_after_restart(journal_storage, storage_dir, make_collection):
+    collection_id = journal_storage.add_collection(make_collection())
+    journal_storage.save_testcase(collection_id, "0", json_content='{"v": 1}')
+    journal_storage.save_testcase(collection_id, "1", json_content='{"v": 2}')
+    journal_storage.save_testcase(collection_id, "0", json_content='{"v": 3}')
+    journal_storage.delete_testcase(collection_id, "1")
+    
+    # 只追加日志，不生成快照
+    assert not os.path.exists(journal_storage._testcase_path(collection_id))
+    assert os.path.exists(journal_storage._journal_path(collection_id))
+    
+    # 模拟进程崩溃：不调用任何关闭逻辑，直接用新实例读取
+    restarted = JSONStorage(storage_dir, testcase_journal=True)
+    
+    assert restarted.list_testcases(collection_id) == ["0"]
+    assert restarted.get_testcase(collection_id, "0")["json_content"] == '{"v": 3}'
+
+
+def test_torn_journal_record_is_ignored_and_truncated(journal_storage, storage_dir, make_collection):
+    collection_id = journal_storage.add_collection(make_collection())
+    journal_storage.save_testcase(collection_id, "0", json_content='{"v": 1}')
+    journal_path = journal_storage._journal_path(collection_id)
+    intact_size = os.path.getsize(journal_path)
+    
+    # 模拟写入记录时崩溃：末尾留下没有换行的半条记录
+    with open(journal_path, "ab") as f:
+        f.write(b'{"op":"put","key":"' + collection_id.encode() + b'_1","value":{"json_')
+    
+    restarted = JSONStorage(storage_dir, testcase_journal=True)
+    assert restarted.list_testcases(collection_id) == ["0"]
+    
+    # 下次追加前截断半条记录，之后的记录仍可正常重放
+    restarted.save_testcase(collection_id, "2", json_content='{"v": 2}')
+    with open(journal_path, "rb") as f:
+        content = f.read()
+    assert content.count(b"\n") == 2
+    assert b"json_\n" not in content and len(content) > intact_size
+    
+    reopened = JSONStorage(storage_dir, testcase_journal=True)
+    assert sorted(reopened.list_testcases(collection_id)) == ["0", "2"]
+
+
+def test_crash_between_snapshot_and_journal_removal(journal_storage, storage_dir, make_collection):
+    """压缩时新快照已写入、旧日志尚未删除就崩溃：旧日志在新快照上重放的结果不变"""
+    collection_id = journal_storage.add_collection(make_collection())
+    journal_storage.save_testcase(collection_id, "0", json_content='{"v": 1}')
+    journal_storage.delete_testcase(collection_id, "0")
+    journal_storage.save_testcase(collection_id, "1", json_content='{"v": 2}')
+    journal_path = journal_storage._journal_path(collection_id)
+    with open(journal_path, "rb") as f:
+        journal = f.read()
+    
+    journal_storage._compact_journal(collection_id, force=True)
+    assert not os.path.exists(journal_path)
+    with open(journal_path, "wb") as f:
+        f.write(journal)
+    
+    restarted = JSONStorage(storage_dir, testcase_journal=True)
+    assert restarted.list_testcases(collection_id) == ["1"]
+    assert restarted.get_testcase(collection_id, "1")["json_content"] == '{"v": 2}'
+
+
+def test_compaction_folds_journal_into_snapshot(storage_dir, make_collection):
+    storage = JSONStorage(storage_dir, testcase_journal=True, journal_compact_bytes=1)
+    collection_id = storage.add_collection(make_collection(5))
+    for i in range(5):
+        storage.save_testcase(collection_id, str(i), json_content=f'{{"v": {i}}}')
+    storage.delete_testcase(collection_id, "4")
+    
+    # 日志超过阈值后在后台线程中压缩
+    deadline = time.time() + 5
+    while (storage._compacting or os.path.exists(storage._journal_path(collection_id))) and time.time() < deadline:
+        time.sleep(0.01)
+    
+    assert os.path.exists(storage._testcase_path(collection_id))
+    assert not os.path.exists(storage._journal_path(collection_id))
+    assert sorted(storage.list_testcases(collection_id)) == ["0", "1", "2", "3"]
+    
+    restarted = JSONStorage(storage_dir, testcase_journal=True)
+    assert sorted(restarted.list_testcases(collection_id)) == ["0", "1", "2", "3"]
+    assert restarted.get_testcase(collection_id, "3")["json_content"] == '{"v": 3}'
+
+
+def test_changes_after_compaction_are_replayed_on_new_snapshot(journal_storage, storage_dir, make_collection):
+    collection_id = journal_storage.add_collection(make_collection())
+    journal_storage.save_testcase(collection_id, "0", json_content='{"v": 1}')
+    journal_storage._compact_journal(collection_id, force=True)
+    journal_storage.save_testcase(collection_id, "1", json_content='{"v": 2}')
+    
+    restarted = JSONStorage(storage_dir, testcase_journal=True)
+    assert sorted(restarted.list_testcases(collection_id)) == ["0", "1"]
+
+
+def test_disabling_journal_folds_leftover_journal(journal_storage, storage_dir, make_collection):
+    collection_id = journal_storage.add_collection(make_collection())
+    journal_storage.save_testcase(collection_id, "0", json_content='{"v": 1}')
+    
+    plain = JSONStorage(storage_dir)
+    
+    assert not os.path.exists(plain._journal_path(collection_id))
+    assert plain.get_testcase(collection_id, "0")["json_content"] == '{"v": 1}'
@@ -0,0 +1,157 @@
+"""
+JSONStorage 迁移到 SQLiteStorage（sqlite_storage.migrate_from_json）后两者读取结果一致，
+迁移工具通过 JSONDataReader 只读方式读取数据目录，不修改原数据
+"""
+import json
+import os
+
+import pytest
+
+from app.sqlite_storage import SQLiteStorage, migrate_from_json
+from app.storage import JSONDataReader, JSONStorage
+
+
+def without_none(data: dict) -> dict:
+    """去掉值为None的字段（SQLite的可空列在JSON中可能没有对应字段）"""
+    return {key: value for key, value in data.items() if value is not None}
+
+
+@pytest.fixture
+def migrated(storage_dir, tmp_path, make_collection):
+    """写入示例数据的JSON存储及迁移后的SQLite存储"""
+    source = JSONStorage(storage_dir)
+    first = source.add_collection(dict(make_collection(4), raw_doc={"openapi": "3.0.0", "paths": {}}))
+    second = source.add_collection(make_collection(2))
+    source.update_interface(first, "1", {"method": "POST", "path": "/items", "summary": "创建", "deprecated": True})
+    source.delete_interface(first, "3")
+    source.save_testcase(first, "0", yaml_content="name: case", json_content='{"cases": [1]}', workflow_id="wf-1")
+    source.save_testcase(first, "1", json_content='{"cases": [2]}')
+    source.save_python_script(first, "1", "print('hello')", workflow_id="wf-2")
+    source.save_python_script(second, "0", "print('hello')")
+    
+    target = SQLiteStorage(str(tmp_path / "storage.db"), storage_dir=storage_dir)
+    stats = migrate_from_json(source, target)
+    return source, target, stats, (first, second)
+
+
+def test_migration_stats(migrated):
+    _, _, stats, _ = migrated
+    
+    assert stats == {"collections": 2, "interfaces": 5, "testcases": 3, "python_scripts": 2}
+
+
+def test_collections_match(migrated):
+    source, target, _, ids = migrated
+    
+    assert set(target.load_collections()) == set(source.load_collections())
+    for collection_id in ids:
+        assert without_none(target.get_collection(collection_id)) == without_none(source.get_collection(collection_id))
+        assert target.get_raw_doc(collection_id) == source.get_raw_doc(collection_id)
+        for interface in source.get_collection(collection_id)["interfaces"]:
+            assert target.get_interface(collection_id, interface["id"]) == interface
+
+
+def test_summaries_match(migrated):
+    source, target, _, ids = migrated
+    
+    for collection_id in ids:
+        expected = source.get_collection_summary(collection_id)
+        actual = target.get_collection_summary(collection_id)
+        for field in ("title", "base_url", "interface_count", "tag_counts", "method_counts", "deprecated_count",
+                      "_version", "_updated_at"):
+            assert actual.get(field) == expected.get(field), field
+
+
+def test_testcases_and_scripts_match(migrated):
+    source, target, _, ids = migrated
+    
+    for collection_id in ids:
+        assert sorted(target.list_testcases(collection_id)) == sorted(source.list_testcases(collection_id))
+        interface_ids = [interface["id"] for interface in source.get_collection(collection_id)["interfaces"]]
+        assert target.get_testcase_statuses(collection_id, interface_ids) == \
+            source.get_testcase_statuses(collection_id, interface_ids)
+        for interface_id in interface_ids:
+            expected = source.get_testcase(collection_id, interface_id)
+            actual = target.get_testcase(collection_id, interface_id)
+            if expected is None:
+                assert actual is None
+                continue
+            for field in ("yaml_content", "json_content", "workflow_id", "python_script_path", "python_workflow_id"):
+                assert actual.get(field) == expected.get(field), field
+    
+    first, second = ids
+    script = target.get_python_script(first, "1")
+    assert script["python_code"] == "print('hello')"
+    # 相同内容的脚本只保存一份文件
+    assert script["python_script_path"] == target.get_python_script(second, "0")["python_script_path"]
+    assert os.path.exists(script["python_script_path"])
+
+
+def test_migrated_storage_accepts_writes(migrated):
+    source, target, _, (first, _) = migrated
+    version = target.get_collection_summary(first)["_version"]
+    
+    assert target.update_interface(first, "0", {"method": "PUT", "path": "/items/0"}, expected_version=1)
+    assert target.get_collection_summary(first)["_version"] == version + 1
+    assert target.delete_testcase(first, "0")
+    assert "0" not in target.list_testcases(first)
+    # 迁移不修改源数据
+    assert "0" in source.list_testcases(first)
+
+
+def snapshot_dir(directory: str) -> dict:
+    """目录下所有文件的相对路径 -> 内容"""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, directory)] = f.read()
+    return files
+
+
+def write_legacy_layout(storage_dir: str, make_collection):
+    """写入旧版单文件布局（collections.json / testcases.json，脚本内容内嵌在测试用例记录中）"""
+    os.makedirs(storage_dir)
+    collection = dict(make_collection(2), _id="legacy", _created_at="2024-01-01T00:00:00",
+                      raw_doc={"swagger": "2.0"})
+    testcases = {
+        "legacy_0": {"collection_id": "legacy", "interface_id": "0", "json_content": '{"v": 0}'},
+        "legacy_1": {"collection_id": "legacy", "interface_id": "1", "python_code": "print('legacy')"}
+    }
+    with open(os.path.join(storage_dir, "collections.json"), "w", encoding="utf-8") as f:
+        json.dump({"collections": {"legacy": collection}}, f, ensure_ascii=False)
+    with open(os.path.join(storage_dir, "testcases.json"), "w", encoding="utf-8") as f:
+        json.dump({"testcases": testcases}, f, ensure_ascii=False)
+
+
+def test_reader_migrates_legacy_layout_without_touching_it(storage_dir, tmp_path, make_collection):
+    write_legacy_layout(storage_dir, make_collection)
+    before = snapshot_dir(storage_dir)
+    
+    target = SQLiteStorage(str(tmp_path / "storage.db"), storage_dir=str(tmp_path / "sqlite"))
+    stats = migrate_from_json(JSONDataReader(storage_dir), target)
+    
+    assert stats == {"collections": 1, "interfaces": 2, "testcases": 2, "python_scripts": 1}
+    assert snapshot_dir(storage_dir) == before
+    assert target.get_raw_doc("legacy") == {"swagger": "2.0"}
+    assert target.get_python_script("legacy", "1")["python_code"] == "print('legacy')"
+    assert target.get_testcase("legacy", "0")["json_content"] == '{"v": 0}'
+
+
+def test_reader_matches_json_storage_on_sharded_layout(journal_storage, storage_dir, tmp_path, make_collection):
+    collection_id = journal_storage.add_collection(dict(make_collection(3), raw_doc={"openapi": "3.0.0"}))
+    journal_storage.save_testcase(collection_id, "0", json_content='{"v": 1}')
+    journal_storage.save_testcase(collection_id, "1", json_content='{"v": 2}')
+    journal_storage.delete_testcase(collection_id, "1")
+    before = snapshot_dir(storage_dir)
+    
+    reader = JSONDataReader(storage_dir)
+    target = SQLiteStorage(str(tmp_path / "storage.db"), storage_dir=str(tmp_path / "sqlite"))
+    migrate_from_json(reader, target)
+    
+    # 日志中的修改被重放，但日志文件没有被合并或删除
+    assert snapshot_dir(storage_dir) == before
+    assert target.list_testcases(collection_id) == ["0"]
+    assert target.get_raw_doc(collection_id) == {"openapi": "3.0.0"}
+    assert without_none(target.get_collection(collection_id)) == without_none(journal_storage.get_collection(collection_id))
@@ -0,0 +1,88 @@
+"""
+列表接口的游标分页：翻页期间增删记录时不重复、不遗漏
+"""
+import pytest
+
+from app.pagination import decode_cursor, encode_cursor, paginate, parse_page_args
+
+
+def rows(*ids):
+    return [{"id": value} for value in ids]
+
+
+def page_ids(page):
+    return [row["id"] for row in page]
+
+
+def test_cursor_round_trip_and_invalid_cursor():
+    assert decode_cursor(encode_cursor("abc", 7)) == ("abc", 7)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+    assert parse_page_args({}) is None
+    with pytest.raises(ValueError):
+        parse_page_args({"limit": "0"})
+
+
+def test_insert_before_cursor_does_not_repeat_records():
+    first, cursor = paginate(rows("a", "b", "c", "d", "e"), "id", 2, None)
+    assert page_ids(first) == ["a", "b"]
+    
+    second, cursor = paginate(rows("x", "y", "a", "b", "c", "d", "e"), "id", 2, decode_cursor(cursor))
+    assert page_ids(second) == ["c", "d"]
+    
+    third, cursor = paginate(rows("x", "y", "a", "b", "c", "d", "e", "z"), "id", 2, decode_cursor(cursor))
+    assert page_ids(third) == ["e", "z"]
+    assert cursor is None
+
+
+def test_deleted_cursor_record_continues_from_its_position():
+    first, cursor = paginate(rows("a", "b", "c", "d"), "id", 2, None)
+    
+    second, cursor = paginate(rows("a", "c", "d"), "id", 2, decode_cursor(cursor))
+    
+    assert page_ids(second) == ["c", "d"]
+    assert cursor is None
+
+
+def parsed_interface(interface_id):
+    """解析器输出的完整接口结构"""
+    return {"id": interface_id, "method": "GET", "path": f"/items/{interface_id}", "summary": f"接口{interface_id}",
+            "description": "", "tags": ["items"]}
+
+
+def list_interfaces(client, collection_id, cursor=None):
+    query = f"?limit=2&cursor={cursor}" if cursor else "?limit=2"
+    body = client.get(f"/api/collection/{collection_id}/interfaces{query}").get_json()
+    return [row["interface_id"] for row in body["interfaces"]], body["next_cursor"]
+
+
+def test_interface_pages_across_inserts_and_deletes(client, api_storage, make_collection):
+    collection = dict(make_collection(), interfaces=[parsed_interface(str(i)) for i in range(5)])
+    collection_id = api_storage.add_collection(collection)
+    
+    first, cursor = list_interfaces(client, collection_id)
+    assert first == ["0", "1"]
+    
+    api_storage.delete_interface(collection_id, "1")
+    api_storage.add_interface(collection_id, parsed_interface("5"))
+    second, cursor = list_interfaces(client, collection_id, cursor)
+    assert second == ["2", "3"]
+    
+    third, cursor = list_interfaces(client, collection_id, cursor)
+    assert third == ["4", "5"]
+    assert cursor is None
+
+
+def test_collection_pages_across_inserts(client, api_storage, make_collection):
+    created = [api_storage.add_collection(make_collection(1)) for _ in range(3)]
+    
+    first = client.get("/api/collections?limit=2&fields=title").get_json()
+    assert [row["collection_id"] for row in first["collections"]] == created[:2]
+    assert set(first["collections"][0]) == {"collection_id", "title"}
+    
+    created.append(api_storage.add_collection(make_collection(1)))
+    second = client.get(f"/api/collections?limit=2&cursor={first['next_cursor']}").get_json()
+    
+    assert [row["collection_id"] for row in second["collections"]] == created[2:]
+    assert second["next_cursor"] is None
+    assert second["total"] == 4
@@ -0,0 +1,72 @@
+"""
+接口搜索倒排索引：写入后的搜索结果与增量更新
+"""
+import os
+
+import pytest
+
+from app.search_index import SearchIndex
+from app.sqlite_storage import SQLiteStorage
+from app.storage import JSONStorage
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def open_storage(request, storage_dir):
+    """打开同一数据目录的存储实例（多次调用相当于多个进程）"""
+    def open_instance():
+        if request.param == "sqlite":
+            return SQLiteStorage(os.path.join(storage_dir, "storage.db"), storage_dir=storage_dir)
+        return JSONStorage(storage_dir)
+    return open_instance
+
+
+def result_ids(result):
+    return [(item["collection_id"], str(item["interface_id"])) for item in result["results"]]
+
+
+def test_search_reflects_interface_writes(open_storage, make_collection):
+    storage = open_storage()
+    index = SearchIndex(storage)
+    collection_id = storage.add_collection(make_collection())
+    assert index.search("接口1")["total"] == 1
+    
+    storage.update_interface(collection_id, "1", {"method": "GET", "path": "/orders", "summary": "查询订单"})
+    storage.add_interface(collection_id, {"id": "9", "method": "POST", "path": "/orders", "summary": "创建订单"})
+    storage.delete_interface(collection_id, "0")
+    
+    assert index.search("接口1")["total"] == 0
+    assert result_ids(index.search("订单")) == [(collection_id, "1"), (collection_id, "9")]
+    assert index.search("接口0")["total"] == 0
+    assert result_ids(index.search("items", collection_id=collection_id)) == [(collection_id, "2")]
+    assert index.get_stats()["interfaces"] == 3
+
+
+def test_own_writes_do_not_resync_all_collections(open_storage, make_collection, monkeypatch):
+    storage = open_storage()
+    index = SearchIndex(storage)
+    collection_ids = [storage.add_collection(make_collection()) for _ in range(3)]
+    index.search("接口")
+    
+    synced = []
+    monkeypatch.setattr(index, "_sync_all", lambda: synced.append(True))
+    storage.update_interface(collection_ids[1], "2", {"method": "GET", "path": "/renamed", "summary": "改名接口"})
+    new_collection = storage.add_collection(make_collection(1))
+    
+    assert result_ids(index.search("改名")) == [(collection_ids[1], "2")]
+    assert index.search("接口0")["total"] == 4
+    assert new_collection in {cid for cid, _ in result_ids(index.search("接口0"))}
+    assert not synced
+
+
+def test_writes_from_other_process_are_found(open_storage, make_collection):
+    storage = open_storage()
+    index = SearchIndex(storage)
+    collection_id = storage.add_collection(make_collection())
+    assert index.search("接口2")["total"] == 1
+    
+    other = open_storage()
+    other.update_interface(collection_id, "2", {"method": "GET", "path": "/other", "summary": "其他进程修改"})
+    other.delete_collection(other.add_collection(make_collection(1)))
+    
+    assert index.search("接口2")["total"] == 0
+    assert result_ids(index.search("其他进程")) == [(collection_id, "2")]
@@ -0,0 +1,139 @@
+"""
+流式生成测试用例（SSE）：事件顺序与生成结果的保存
+"""
+import json
+
+import pytest
+
+from app.dify_client import DifyClient
+from app.generation_cache import GenerationCache
+
+
+class FakeStreamResponse:
+    """stream=True 的 requests 响应，按行返回 SSE 内容"""
+    
+    status_code = 200
+    
+    def __init__(self, events):
+        self.lines = []
+        for event in events:
+            self.lines += [b"event: message", f"data: {json.dumps(event, ensure_ascii=False)}".encode("utf-8"), b""]
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def raise_for_status(self):
+        pass
+    
+    def iter_lines(self):
+        return iter(self.lines)
+
+
+class FakeSession:
+    """记录请求次数的会话，每次 POST 返回相同的流式响应"""
+    
+    def __init__(self, events):
+        self.events = events
+        self.posts = 0
+    
+    def post(self, url, **kwargs):
+        self.posts += 1
+        assert kwargs["stream"] is True
+        return FakeStreamResponse(self.events)
+
+
+def text_chunk(text):
+    return {"event": "text_chunk", "workflow_run_id": "run-1", "data": {"text": text}}
+
+
+STREAMED_EVENTS = [
+    text_chunk('{"test_cases": [{"test_case_id": "TC1", "test_case_name": "查询成功"}'),
+    {"event": "ping"},
+    text_chunk(', {"test_case_id": "TC2", "test_case_name": "参数缺失"}]}'),
+    {"event": "workflow_finished", "data": {"status": "succeeded", "outputs": {}}}
+]
+
+
+@pytest.fixture
+def dify_client():
+    client = DifyClient("key", "http://dify.local/workflow", "key", "http://dify.local/python", cache=GenerationCache())
+    client.session = FakeSession(STREAMED_EVENTS)
+    return client
+
+
+def interface_details():
+    return {"interface": {"id": "1", "method": "GET", "path": "/items"}, "collection_info": {"id": "c1", "title": "示例"}}
+
+
+def test_stream_events_arrive_in_order(dify_client):
+    events = list(dify_client.stream_json_testcases(interface_details()))
+    
+    assert [event["event"] for event in events] == ["chunk", "testcase", "chunk", "testcase", "done"]
+    assert [event["test_case"]["test_case_id"] for event in events if event["event"] == "testcase"] == ["TC1", "TC2"]
+    assert [event["index"] for event in events if event["event"] == "testcase"] == [1, 2]
+    done = events[-1]
+    assert done["success"] is True and done["cached"] is False
+    assert done["workflow_id"] == "run-1"
+    assert len(done["test_cases"]) == 2
+
+
+def test_stream_result_is_cached(dify_client):
+    list(dify_client.stream_json_testcases(interface_details()))
+    
+    replayed = list(dify_client.stream_json_testcases(interface_details()))
+    
+    assert dify_client.session.posts == 1
+    assert [event["event"] for event in replayed] == ["testcase", "testcase", "done"]
+    assert replayed[-1]["cached"] is True
+    
+    list(dify_client.stream_json_testcases(interface_details(), force_refresh=True))
+    assert dify_client.session.posts == 2
+
+
+def test_failed_workflow_ends_with_error(dify_client):
+    dify_client.session = FakeSession([text_chunk("[{"), {"event": "workflow_finished", "data": {"status": "failed", "error": "节点超时"}}])
+    
+    events = list(dify_client.stream_json_testcases(interface_details()))
+    
+    assert [event["event"] for event in events] == ["chunk", "error"]
+    assert events[-1]["error"] == "节点超时"
+    assert dify_client.cache.get_stats()["entries"] == 0
+
+
+def parse_sse(body):
+    """解析 SSE 响应为 (事件名, 数据) 列表"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_stream_endpoint_forwards_events_and_saves_testcase(flask_app, client, api_storage, make_collection, dify_client):
+    flask_app.config["DIFY_CLIENT"] = dify_client
+    collection_id = api_storage.add_collection(make_collection())
+    
+    response = client.post(f"/api/generate-json-stream/{collection_id}/1")
+    
+    assert response.mimetype == "text/event-stream"
+    events = parse_sse(response.get_data(as_text=True))
+    assert [name for name, _ in events] == ["chunk", "testcase", "chunk", "testcase", "done"]
+    done = events[-1][1]
+    assert done["saved"] is True and done["testcase_count"] == 2
+    saved = api_storage.get_testcase(collection_id, "1")
+    assert saved["json_content"] == done["json_content"]
+    assert saved["workflow_id"] == "run-1"
+
+
+def test_stream_endpoint_does_not_save_on_error(flask_app, client, api_storage, make_collection, dify_client):
+    dify_client.session = FakeSession([{"event": "error", "message": "额度不足"}])
+    flask_app.config["DIFY_CLIENT"] = dify_client
+    collection_id = api_storage.add_collection(make_collection())
+    
+    events = parse_sse(client.post(f"/api/generate-json-stream/{collection_id}/1").get_data(as_text=True))
+    
+    assert events == [("error", {"success": False, "error": "额度不足"})]
+    assert api_storage.get_testcase(collection_id, "1") is None
@@ -0,0 +1,80 @@
+"""
+记录版本号与 If-Match 条件更新
+"""
+import os
+
+import pytest
+
+from app.sqlite_storage import SQLiteStorage
+from app.storage import JSONStorage
+from app.versioning import VersionConflict
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, storage_dir):
+    if request.param == "sqlite":
+        return SQLiteStorage(os.path.join(storage_dir, "storage.db"), storage_dir=storage_dir)
+    return JSONStorage(storage_dir)
+
+
+def test_update_bumps_interface_and_collection_versions(storage, make_collection):
+    collection_id = storage.add_collection(make_collection())
+    assert storage.get_interface(collection_id, "1").get("_version", 1) == 1
+    collection_version = storage.get_collection_summary(collection_id)["_version"]
+    
+    assert storage.update_interface(collection_id, "1", {"method": "PUT", "path": "/items/1"}, expected_version=1)
+    
+    assert storage.get_interface(collection_id, "1")["_version"] == 2
+    assert storage.get_interface(collection_id, "0").get("_version", 1) == 1
+    assert storage.get_collection_summary(collection_id)["_version"] == collection_version + 1
+
+
+def test_stale_expected_version_is_rejected(storage, make_collection):
+    collection_id = storage.add_collection(make_collection())
+    storage.update_interface(collection_id, "1", {"method": "PUT", "path": "/first"})
+    
+    with pytest.raises(VersionConflict) as conflict:
+        storage.update_interface(collection_id, "1", {"method": "PUT", "path": "/second"}, expected_version=1)
+    
+    assert conflict.value.current_version == 2
+    assert storage.get_interface(collection_id, "1")["path"] == "/first"
+
+
+def test_different_interfaces_do_not_conflict(storage, make_collection):
+    collection_id = storage.add_collection(make_collection())
+    
+    assert storage.update_interface(collection_id, "0", {"method": "PUT", "path": "/a"}, expected_version=1)
+    assert storage.update_interface(collection_id, "1", {"method": "PUT", "path": "/b"}, expected_version=1)
+
+
+def put_interface(client, collection_id, interface_id, if_match=None, path="/changed"):
+    headers = {"If-Match": if_match} if if_match is not None else {}
+    return client.put(f"/api/interface/{collection_id}/{interface_id}", headers=headers,
+                      json={"interface": {"method": "PUT", "path": path}})
+
+
+def test_if_match_with_current_etag_succeeds_once(client, api_storage, make_collection):
+    collection_id = api_storage.add_collection(make_collection())
+    etag = client.get(f"/api/interface/{collection_id}/1").headers["ETag"]
+    
+    first = put_interface(client, collection_id, "1", if_match=etag, path="/first")
+    assert first.status_code == 200
+    assert first.headers["ETag"] != etag
+    
+    # 同一个 ETag 再次提交：接口已被修改，返回412和当前版本，不覆盖
+    second = put_interface(client, collection_id, "1", if_match=etag, path="/second")
+    assert second.status_code == 412
+    assert second.get_json()["current_version"] == 2
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert api_storage.get_interface(collection_id, "1")["path"] == "/first"
+
+
+def test_if_match_accepts_bare_version_and_star(client, api_storage, make_collection):
+    collection_id = api_storage.add_collection(make_collection())
+    
+    assert put_interface(client, collection_id, "1", if_match='"1"').status_code == 200
+    assert put_interface(client, collection_id, "1", if_match='"1"').status_code == 412
+    assert put_interface(client, collection_id, "1", if_match='"2"').status_code == 200
+    assert put_interface(client, collection_id, "1", if_match="*").status_code == 200
+    assert put_interface(client, collection_id, "1").status_code == 200
+    assert api_storage.get_interface(collection_id, "1")["_version"] == 5
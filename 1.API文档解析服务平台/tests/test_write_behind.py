@@ -0,0 +1,72 @@
+"""
+JSON存储的原子写入与延迟写入
+"""
+import os
+import threading
+
+from app.storage import JSONStorage
+
+
+def test_failed_write_keeps_previous_file(storage_dir, make_collection, monkeypatch):
+    storage = JSONStorage(storage_dir)
+    collection_id = storage.add_collection(make_collection())
+    path = storage._collection_path(collection_id)
+    with open(path, "rb") as f:
+        before = f.read()
+    
+    def fail_replace(src, dst):
+        raise OSError("模拟写入中断")
+    
+    monkeypatch.setattr(os, "replace", fail_replace)
+    assert not storage.update_interface(collection_id, "1", {"method": "GET", "path": "/lost"})
+    monkeypatch.undo()
+    
+    with open(path, "rb") as f:
+        assert f.read() == before
+    assert not [name for name in os.listdir(os.path.dirname(path)) if name.endswith(".tmp")]
+    # 保存失败后丢弃缓存，重新读取的是磁盘上的数据
+    assert storage.get_interface(collection_id, "1")["path"] == "/items/1"
+
+
+def test_delayed_writes_are_merged_until_flush(storage_dir, make_collection):
+    storage = JSONStorage(storage_dir, write_behind_delay=60)
+    collection_id = storage.add_collection(make_collection())
+    storage.update_interface(collection_id, "1", {"method": "GET", "path": "/first"})
+    storage.update_interface(collection_id, "1", {"method": "GET", "path": "/second"})
+    
+    # 落盘前本实例读取内存中的数据，其他实例看不到
+    assert storage.get_interface(collection_id, "1")["path"] == "/second"
+    assert not os.path.exists(storage._collection_path(collection_id))
+    
+    assert storage.flush()
+    
+    assert JSONStorage(storage_dir).get_interface(collection_id, "1")["path"] == "/second"
+
+
+def test_pending_writes_stay_visible_while_flushing(storage_dir, make_collection, monkeypatch):
+    storage = JSONStorage(storage_dir, write_behind_delay=60)
+    collection_id = storage.add_collection(make_collection())
+    storage.flush()
+    storage.update_interface(collection_id, "1", {"method": "GET", "path": "/pending"})
+    
+    writing, release = threading.Event(), threading.Event()
+    atomic_write = storage._atomic_write
+    
+    def slow_write(path, content):
+        writing.set()
+        release.wait(5)
+        atomic_write(path, content)
+    
+    monkeypatch.setattr(storage, "_atomic_write", slow_write)
+    flusher = threading.Thread(target=storage.flush)
+    flusher.start()
+    try:
+        assert writing.wait(5)
+        # 刷盘进行中：数据尚未替换到磁盘，读取仍以内存中的待写入数据为准
+        assert storage.get_interface(collection_id, "1")["path"] == "/pending"
+    finally:
+        release.set()
+        flusher.join(5)
+    
+    assert not storage._pending_writes
+    assert JSONStorage(storage_dir).get_interface(collection_id, "1")["path"] == "/pending"